@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import pyvips
+
+from .synthetic_slides import SLIDE_SPECS, write_synthetic_slides
+from .suite import BENCHMARKS, SlideBenchmark, compare_results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Benchmark histopath_handler on synthetic pyramidal TIFF slides.\n"
+                    "e.g. python -m benchmarks --sizes small medium --results bench/$(git rev-parse --short HEAD).json",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--sizes", nargs="+", default=["small"], choices=list(SLIDE_SPECS),
+                        help="Synthetic slides to run on (default: small). "
+                             + ", ".join(f"{name}: {spec.width}x{spec.height}{' BigTIFF' if spec.bigtiff else ''}"
+                                         for name, spec in SLIDE_SPECS.items()))
+    parser.add_argument("--slides", nargs="*", default=[],
+                        help="Real slide files to benchmark as well.")
+    parser.add_argument("--benchmarks", nargs="+", default=BENCHMARKS, choices=BENCHMARKS,
+                        help="Benchmarks to run (default: all).")
+    parser.add_argument("--data-dir", default=os.path.join("bench_data", "slides"),
+                        help="Where synthetic slides are generated and reused (default: bench_data/slides).")
+    parser.add_argument("--work-dir", default=os.path.join("bench_data", "work"),
+                        help="Scratch directory for DeepZoom and HPZ outputs (default: bench_data/work).")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per benchmark, median reported; builds run once (default: 3).")
+    parser.add_argument("--patches", type=int, default=200,
+                        help="Random patches extracted per level (default: 200).")
+    parser.add_argument("--patch-size", type=int, default=256, help="Patch size in level pixels (default: 256).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for slide content and patch positions.")
+    parser.add_argument("--results", default=None,
+                        help="Write the results as JSON to this file (default: stdout).")
+    parser.add_argument("--compare", default=None,
+                        help="Baseline results JSON; exit with status 1 if a benchmark got slower than --threshold.")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="Slowdown ratio counted as a regression (default: 1.2).")
+    return parser
+
+
+def get_git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "libvips": ".".join(str(pyvips.version(i)) for i in range(3)),
+        "git_revision": get_git_revision(),
+    }
+
+
+def main():
+    args = build_parser().parse_args()
+
+    slides = write_synthetic_slides(args.sizes, args.data_dir, args.seed)
+    slide_paths = list(slides.values()) + args.slides
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "environment": get_environment(),
+        "results": [],
+    }
+    for slide_path in slide_paths:
+        print(f"Benchmarking {slide_path}...", file=sys.stderr)
+        benchmark = SlideBenchmark(slide_path, args.work_dir, repeat=args.repeat, patches_per_level=args.patches,
+                                   patch_size=args.patch_size, seed=args.seed)
+        for result in benchmark.run(args.benchmarks):
+            print(f"  {result['benchmark']:<20} {result['seconds']:.4f}s", file=sys.stderr)
+            report["results"].append(result)
+
+    text = json.dumps(report, indent=2)
+    if args.results:
+        os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+        with open(args.results, 'w', encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding="utf-8") as file:
+            baseline = json.load(file)
+        rows = compare_results(baseline, report, args.threshold)
+        for row in rows:
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['slide']:<20} {row['benchmark']:<20} {row['baseline_seconds']:.4f}s -> "
+                  f"{row['seconds']:.4f}s ({row['ratio']:.2f}x){flag}", file=sys.stderr)
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Timed benchmarks over one slide. Every benchmark returns a result dict:
+
+    {"slide": ..., "benchmark": ..., "seconds": median, "runs": [...], "params": {...}}
+
+libvips' operation cache is disabled so repeated runs measure real work.
+"""
+import os
+import time
+import random
+import shutil
+import statistics
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import pyvips
+
+from histopath_handler.histopath_handler import HistopathHandler
+from histopath_handler.file_loaders.loader_factory import FileLoaderFactory
+from histopath_handler._core.models import Region
+from histopath_handler._core.utils import get_basename_without_extension
+
+
+BENCHMARKS = ["open", "info", "thumbnail", "patches", "deepzoom", "hpz_pack", "hpz_build"]
+# Whole-pyramid builds run once per slide regardless of --repeat
+BUILD_BENCHMARKS = ("deepzoom", "hpz_pack", "hpz_build")
+
+
+def time_runs(func: Callable[[], Any], repeat: int) -> List[float]:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - started)
+    return runs
+
+
+class SlideBenchmark:
+
+    def __init__(self,
+                 slide_path: str,
+                 work_dir: str,
+                 repeat: int = 3,
+                 patches_per_level: int = 200,
+                 patch_size: int = 256,
+                 thumbnail_width: int = 500,
+                 seed: int = 0):
+        self.slide_path = slide_path
+        self.slide_name = get_basename_without_extension(os.path.basename(slide_path))
+        self.work_dir = os.path.join(work_dir, self.slide_name)
+        self.repeat = repeat
+        self.patches_per_level = patches_per_level
+        self.patch_size = patch_size
+        self.thumbnail_width = thumbnail_width
+        self.seed = seed
+        pyvips.cache_set_max(0)
+
+    def _result(self, benchmark: str, runs: List[float], **params) -> Dict[str, Any]:
+        return {
+            "slide": self.slide_name,
+            "benchmark": benchmark,
+            "seconds": statistics.median(runs),
+            "runs": runs,
+            "params": params,
+        }
+
+    def run(self, benchmarks: Sequence[str] = BENCHMARKS) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = []
+        for benchmark in benchmarks:
+            results.extend(getattr(self, f"bench_{benchmark}")())
+        return results
+
+    def bench_open(self) -> List[Dict[str, Any]]:
+        def open_slide():
+            loader = FileLoaderFactory.get_loader(self.slide_path)
+            loader.close_image(loader.load_image(self.slide_path))
+        return [self._result("open", time_runs(open_slide, self.repeat))]
+
+    def bench_info(self) -> List[Dict[str, Any]]:
+        loader = FileLoaderFactory.get_loader(self.slide_path)
+        slide = loader.load_image(self.slide_path)
+        try:
+            runs = time_runs(lambda: loader.get_image_info(self.slide_path, slide), self.repeat)
+        finally:
+            loader.close_image(slide)
+        return [self._result("info", runs)]
+
+    def bench_thumbnail(self) -> List[Dict[str, Any]]:
+        with HistopathHandler(self.slide_path) as handler:
+            runs = time_runs(
+                lambda: handler.get_thumbnail(max_width=self.thumbnail_width).write_to_buffer(".jpg"), self.repeat
+            )
+        return [self._result("thumbnail", runs, max_width=self.thumbnail_width)]
+
+    def _get_random_regions(self, handler: HistopathHandler, level: int) -> List[Region]:
+        info = handler.get_image_info()
+        level_width, level_height = info.level_dimensions[level]
+        downsample = info.level_downsamples[level]
+        size = min(self.patch_size, level_width, level_height)
+        rng = random.Random(self.seed + level)
+        regions = []
+        for _ in range(self.patches_per_level):
+            x, y = rng.randrange(level_width - size + 1), rng.randrange(level_height - size + 1)
+            regions.append(Region(
+                left=int(x * downsample),
+                top=int(y * downsample),
+                width=int(size * downsample),
+                height=int(size * downsample),
+                level=level
+            ))
+        return regions
+
+    def bench_patches(self) -> List[Dict[str, Any]]:
+        results = []
+        with HistopathHandler(self.slide_path) as handler:
+            for level in range(handler.get_image_info().level_count):
+                regions = self._get_random_regions(handler, level)
+                runs = time_runs(lambda: handler.extract_patches(regions, stack=False), self.repeat)
+                result = self._result(f"patches_level_{level}", runs, level=level, patches=len(regions),
+                                      patch_size=self.patch_size)
+                result["patches_per_second"] = len(regions) / result["seconds"] if result["seconds"] else None
+                results.append(result)
+        return results
+
+    def _clean_output(self, name: str) -> str:
+        output_dir = os.path.join(self.work_dir, name)
+        if os.path.exists(output_dir):
+            shutil.rmtree(output_dir)
+        os.makedirs(output_dir)
+        return output_dir
+
+    def bench_deepzoom(self) -> List[Dict[str, Any]]:
+        output_dir = self._clean_output("deepzoom")
+        with HistopathHandler(self.slide_path) as handler:
+            runs = time_runs(lambda: handler.build_deepzoom_pyramid(output_dir), 1)
+        return [self._result("deepzoom", runs, container="fs")]
+
+    def _get_deepzoom_base_path(self) -> str:
+        base_path = os.path.join(self.work_dir, "deepzoom", self.slide_name, self.slide_name)
+        if not os.path.exists(f"{base_path}.dzi"):
+            self.bench_deepzoom()
+        return base_path
+
+    def bench_hpz_pack(self) -> List[Dict[str, Any]]:
+        deepzoom_base_path = self._get_deepzoom_base_path()
+        output_path = os.path.join(self._clean_output("hpz_pack"), f"{self.slide_name}.hpz")
+        with HistopathHandler(self.slide_path) as handler:
+            runs = time_runs(lambda: handler.pack_hpz_archive(deepzoom_base_path, output_path), 1)
+        return [self._result("hpz_pack", runs, bytes=os.path.getsize(output_path))]
+
+    def bench_hpz_build(self) -> List[Dict[str, Any]]:
+        output_dir = self._clean_output("hpz_build")
+        with HistopathHandler(self.slide_path) as handler:
+            runs = time_runs(lambda: handler.build_hpz_archive(output_dir), 1)
+        output_path = os.path.join(output_dir, f"{self.slide_name}.hpz")
+        return [self._result("hpz_build", runs, bytes=os.path.getsize(output_path))]
+
+
+def compare_results(baseline: Dict[str, Any],
+                    current: Dict[str, Any],
+                    threshold: float) -> List[Dict[str, Any]]:
+    """Pair results by (slide, benchmark); a ratio above `threshold` (e.g. 1.2) is a regression."""
+    previous = {(result["slide"], result["benchmark"]): result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        before: Optional[Dict[str, Any]] = previous.get((result["slide"], result["benchmark"]))
+        if before is None or not before["seconds"]:
+            continue
+        ratio = result["seconds"] / before["seconds"]
+        rows.append({
+            "slide": result["slide"],
+            "benchmark": result["benchmark"],
+            "baseline_seconds": before["seconds"],
+            "seconds": result["seconds"],
+            "ratio": ratio,
+            "regression": ratio > threshold,
+        })
+    return rows
@@ -0,0 +1,89 @@
+"""
+Synthetic whole-slide images for the benchmarks: tiled, JPEG-compressed pyramidal
+TIFFs with tissue-like content (irregular tissue islands on bright glass, stroma
+texture and dark nuclei), so decoders and encoders see realistic data.
+"""
+import os
+import math
+from dataclasses import dataclass
+from typing import Dict, List
+
+import pyvips
+
+
+# Background glass, stroma (eosin) and nuclei (haematoxylin) colours
+GLASS_RGB = [242, 240, 244]
+STROMA_RGB = [228, 150, 190]
+NUCLEI_RGB = [92, 58, 150]
+
+# Tissue outline is drawn at 1/OUTLINE_SCALE and upscaled: islands, not noise
+OUTLINE_SCALE = 64
+NUCLEUS_CELL_SIZE = 24
+NUCLEUS_RADIUS = 5.0
+
+
+@dataclass
+class SyntheticSlideSpec:
+    name: str
+    width: int
+    height: int
+    bigtiff: bool = False
+    tile_size: int = 256
+    quality: int = 85
+    mpp: float = 0.25
+
+
+SLIDE_SPECS: Dict[str, SyntheticSlideSpec] = {
+    "small": SyntheticSlideSpec("small", 8192, 6144),
+    "medium": SyntheticSlideSpec("medium", 32768, 24576),
+    "large": SyntheticSlideSpec("large", 98304, 73728, bigtiff=True),
+}
+
+
+def make_tissue_image(width: int, height: int, seed: int = 0) -> pyvips.Image:
+    """Lazy RGB image of tissue islands; libvips renders it strip by strip while saving."""
+    outline = pyvips.Image.perlin(
+        math.ceil(width / OUTLINE_SCALE), math.ceil(height / OUTLINE_SCALE), cell_size=48, seed=seed
+    )
+    # Relational operators give 0/255 masks; resizing one softens the island edges
+    tissue = (outline > 0.05).resize(OUTLINE_SCALE, kernel="linear").crop(0, 0, width, height)
+
+    texture = pyvips.Image.perlin(width, height, cell_size=16, seed=seed + 1)
+    stroma = texture.linear([18, 22, 16], STROMA_RGB)
+
+    cells = pyvips.Image.worley(width, height, cell_size=NUCLEUS_CELL_SIZE, seed=seed + 2)
+    tissue_rgb = (cells < NUCLEUS_RADIUS).ifthenelse(NUCLEI_RGB, stroma)
+
+    glass = pyvips.Image.gaussnoise(width, height, mean=0, sigma=2).linear([1, 1, 1], GLASS_RGB)
+    return tissue.ifthenelse(tissue_rgb, glass, blend=True).cast("uchar")
+
+
+def write_synthetic_slide(spec: SyntheticSlideSpec, output_dir: str, seed: int = 0, overwrite: bool = False) -> str:
+    """Write `spec` as `<output_dir>/synthetic_<name>.tif`, reusing an existing file."""
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, f"synthetic_{spec.name}.tif")
+    if os.path.exists(output_path) and not overwrite:
+        return output_path
+
+    temp_path = f"{output_path}.tmp.tif"
+    # tiffsave takes resolution in pixels per millimetre
+    pixels_per_mm = 1000.0 / spec.mpp
+    make_tissue_image(spec.width, spec.height, seed).tiffsave(
+        temp_path,
+        tile=True,
+        tile_width=spec.tile_size,
+        tile_height=spec.tile_size,
+        pyramid=True,
+        compression="jpeg",
+        Q=spec.quality,
+        bigtiff=spec.bigtiff,
+        xres=pixels_per_mm,
+        yres=pixels_per_mm,
+        resunit="cm"
+    )
+    os.replace(temp_path, output_path)
+    return output_path
+
+
+def write_synthetic_slides(names: List[str], output_dir: str, seed: int = 0) -> Dict[str, str]:
+    return {name: write_synthetic_slide(SLIDE_SPECS[name], output_dir, seed) for name in names}
@@ -1,12 +1,16 @@
 import argparse
 import os
 import sys
-import pyvips
-import zipfile
 import json
+import logging
+from typing import Any, Dict, Optional
 
 from histopath_handler.histopath_handler import HistopathHandler
-from histopath_handler._core.models import Region
+from histopath_handler._core.models import Region, ImageInfo, VipsRuntimeConfig
+from histopath_handler._core.metrics import MetricsCollector
+from histopath_handler._core.vips_runtime import apply_vips_runtime_config
+from histopath_handler.file_loaders.metadata_cache import MetadataCache
+from histopath_handler.file_loaders.thumbnail_cache import ThumbnailCache
 from histopath_handler._core.exceptions import (
     ImageLoadingError,
     InvalidRegionError,
@@ -22,20 +26,58 @@ from histopath_handler._core.constants import (
     DEFAULT_DEEPZOOM_TILE_SUFFIX,
     DEFAULT_PATCH_OUTPUT_FORMAT,
     ROTATION_ANGLES,
-    HPZ_FILE_EXTENSION
+    HPZ_FILE_EXTENSION,
+    HPZ_ZIP_STORED,
+    HPZ_ZIP_COMPRESSION_METHODS,
+    DEFAULT_SLIDE_POOL_MAX_OPEN,
+    DEFAULT_SERVER_HOST,
+    DEFAULT_SERVER_PORT,
+    SUPPORTED_OUTPUT_FORMATS,
+    DEFAULT_TIFF_TILE_SIZE,
+    DEFAULT_TIFF_COMPRESSION,
+    TIFF_COMPRESSIONS,
+    VIPS_INTERMEDIATES
 )
 
-def main():
+# Single-slide commands that `batch` can run
+BATCH_COMMANDS = ["info", "thumbnail", "extract-patch", "extract-region", "build-deepzoom", "build-tiff", "pack-hpz"]
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description = "Histopathology Image Handler CLI Tool",
         formatter_class = argparse.RawTextHelpFormatter
     )
 
     parser.add_argument("image_path", help="Path to the histopathology image file.")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="Log progress (-v) or every step (-vv) to stderr.")
+    parser.add_argument("--metrics", default=None,
+                        help="Write per-stage timings (open, metadata, decode, rotate, encode, write, zip) of a "
+                             "single-slide command to this file: Prometheus text for .prom, JSON otherwise.")
+
+    # libvips runtime settings; batch runs apply them in every worker
+    vips_group = parser.add_argument_group("libvips runtime")
+    vips_group.add_argument("--vips-concurrency", type=int, default=None,
+                            help="Worker threads per libvips pipeline (default: number of CPUs). With batch "
+                                 "--workers N, about cores / N avoids oversubscribing the machine.")
+    vips_group.add_argument("--vips-cache-max", type=int, default=None,
+                            help="Operations kept in the libvips operation cache (libvips default: 100).")
+    vips_group.add_argument("--vips-cache-max-mem", type=int, default=None,
+                            help="Memory ceiling of the libvips operation cache in MB (libvips default: 100).")
+    vips_group.add_argument("--vips-cache-max-files", type=int, default=None,
+                            help="Files kept open by the libvips operation cache (libvips default: 100).")
+    vips_group.add_argument("--vips-intermediates", default=None, choices=VIPS_INTERMEDIATES,
+                            help="Decompress images that cannot be read in parts (PNG, JPEG, strip TIFF) "
+                                 "into memory or into temporary files on disc.")
+    vips_group.add_argument("--vips-disc-threshold", type=int, default=None,
+                            help="Images larger than this many MB are decompressed to disc (libvips default: 100).")
 
     subparsers = parser.add_subparsers(dest="command", help= "Available commands")
 
     info_parser = subparsers.add_parser("info", help="Get detailed information about the image.")
+    info_parser.add_argument("--metadata-cache", default=None,
+                             help="SQLite metadata cache file; answers from it without opening the slide "
+                                  "while the file's size and mtime are unchanged, and records new results.")
 
     # --- thumbnail commands ---
     thumbnail_parser = subparsers.add_parser("thumbnail", help="Generate a thumbnail of the image.")
@@ -43,6 +85,9 @@ def main():
                                   help="Output path for the thumbnail (e.g., thumbnail.jpg).")
     thumbnail_parser.add_argument("-w", "--max-width", type=int, default=500,
                                   help="Maximum width of the thumbnail (default: 500).")
+    thumbnail_parser.add_argument("--thumbnail-cache", default=None,
+                                  help="Directory of cached thumbnails; a slide unchanged since its thumbnail "
+                                       "was cached is not opened.")
 
 
     # --- extract-patch commands ---
@@ -54,9 +99,12 @@ def main():
     extract_patch_parser.add_argument("--level", type=int, default=0, help="Pyramid level for extraction (default: 0).")
     extract_patch_parser.add_argument("-o", "--output", required=True, help="Output path for the patch (e.g., patch.png).")
     extract_patch_parser.add_argument("-f", "--format", default=DEFAULT_PATCH_OUTPUT_FORMAT,
-                                      choices=['png', 'jpg', 'tif'], help="Output format (default: png).")
+                                      choices=SUPPORTED_OUTPUT_FORMATS, help="Output format (default: png).")
     extract_patch_parser.add_argument("-q", "--quality", type=int, default=DEFAULT_JPEG_QUALITY,
-                                      help="JPEG quality (1-100) for JPG format (default: 90).")
+                                      help="Quality (1-100) for jpg, webp, avif and jxl (default: 90).")
+    extract_patch_parser.add_argument("--effort", type=int, default=None,
+                                      help="Encoder effort for webp (0-6), avif (0-9) and jxl (1-9); higher is smaller "
+                                           "but slower (default: 4, 4, 7).")
     extract_patch_parser.add_argument("-r", "--rotate", type=int, default=0,
                                       choices=ROTATION_ANGLES, help="Rotation angle (0, 90, 180, 270 degrees).")
 
@@ -70,9 +118,12 @@ def main():
     extract_region_parser.add_argument("--level", type=int, default=0, help="Pyramid level for extraction (default: 0).")
     extract_region_parser.add_argument("-o", "--output", required=True, help="Output path for the region (e.g., region.tif).")
     extract_region_parser.add_argument("-f", "--format", default=DEFAULT_PATCH_OUTPUT_FORMAT,
-                                      choices=['png', 'jpg', 'tif'], help="Output format (default: png).")
+                                      choices=SUPPORTED_OUTPUT_FORMATS, help="Output format (default: png).")
     extract_region_parser.add_argument("-q", "--quality", type=int, default=DEFAULT_JPEG_QUALITY,
-                                      help="JPEG quality (1-100) for JPG format (default: 90).")
+                                      help="Quality (1-100) for jpg, webp, avif and jxl (default: 90).")
+    extract_region_parser.add_argument("--effort", type=int, default=None,
+                                      help="Encoder effort for webp (0-6), avif (0-9) and jxl (1-9); higher is smaller "
+                                           "but slower (default: 4, 4, 7).")
     extract_region_parser.add_argument("-r", "--rotate", type=int, default=0,
                                       choices=ROTATION_ANGLES, help="Rotation angle (0, 90, 180, 270 degrees).")
 
@@ -86,9 +137,15 @@ def main():
     build_deepzoom_parser.add_argument("--overlap", type=int, default=DEFAULT_TILE_OVERLAP,
                                        help="Overlap of tiles in pixels (default: 1).")
     build_deepzoom_parser.add_argument("--suffix", default=DEFAULT_DEEPZOOM_TILE_SUFFIX,
-                                       help="Filename suffix for tiles (e.g., .jpg, .png) (default: .jpg).")
+                                       help="Filename suffix for tiles (e.g., .jpg, .png, .webp, .avif, .jxl, or with "
+                                            "libvips options such as .webp[smart_subsample=true]) (default: .jpg).")
     build_deepzoom_parser.add_argument("-q", "--quality", type=int, default=DEFAULT_JPEG_QUALITY,
-                                       help="JPEG quality (1-100) for JPG tiles (default: 90).")
+                                       help="Quality (1-100) for jpg, webp, avif and jxl tiles (default: 90).")
+    build_deepzoom_parser.add_argument("--effort", type=int, default=None,
+                                       help="Encoder effort for webp (0-6), avif (0-9) and jxl (1-9) tiles.")
+    build_deepzoom_parser.add_argument("--target-tile-bytes", type=int, default=None,
+                                       help="Choose the highest quality whose mean tile size, measured on sampled "
+                                            "full-resolution tiles, stays within this many bytes; overrides -q.")
     build_deepzoom_parser.add_argument("-a", "--angle", type=int, default=0,
                                        choices=ROTATION_ANGLES, help="Rotate image during save (0, 90, 180, 270 degrees).")
     build_deepzoom_parser.add_argument("-c", "--container", default='fs', choices=['fs', 'zip'],
@@ -99,6 +156,24 @@ def main():
                                        help="Background color as R G B values (e.g., 255 255 255 for white).")
     build_deepzoom_parser.add_argument("--centre", action="store_true",
                                        help="If set, center image in tile.")
+    build_deepzoom_parser.add_argument("--checkpoint", action="store_true",
+                                       help="Record finished tile rows next to the output so an interrupted build "
+                                            "resumes where it stopped when rerun with the same options (fs container only).")
+
+    # --- build-tiff commands ---
+    build_tiff_parser = subparsers.add_parser("build-tiff", help="Convert the image into a tiled, multi-resolution (OME-)TIFF.")
+    build_tiff_parser.add_argument("-o", "--output-dir", required=True,
+                                   help="Directory for the output; writes <name>.tif, or <name>.ome.tif with --ome.")
+    build_tiff_parser.add_argument("-s", "--tile-size", type=int, default=DEFAULT_TIFF_TILE_SIZE,
+                                   help=f"Tile size in pixels, a multiple of 16 (default: {DEFAULT_TIFF_TILE_SIZE}).")
+    build_tiff_parser.add_argument("--compression", default=DEFAULT_TIFF_COMPRESSION, choices=TIFF_COMPRESSIONS,
+                                   help=f"Tile compression (default: {DEFAULT_TIFF_COMPRESSION}).")
+    build_tiff_parser.add_argument("-q", "--quality", type=int, default=DEFAULT_JPEG_QUALITY,
+                                   help="Quality (1-100) for jpeg, webp and jp2k compression (default: 90).")
+    build_tiff_parser.add_argument("--bigtiff", action=argparse.BooleanOptionalAction, default=None,
+                                   help="Force BigTIFF on or off (default: on for images of 2 GiB or more uncompressed).")
+    build_tiff_parser.add_argument("--ome", action="store_true",
+                                   help="Write OME-TIFF: OME-XML description with the levels as SubIFDs.")
 
     # --- pack-hpz commands ---
     pack_hpz_parser = subparsers.add_parser("pack-hpz", help="Pack an existing DeepZoom output into an HPZ archive.")
@@ -109,102 +184,281 @@ def main():
                                  help="Full path for the output .hpz archive (e.g., output/my_packed_deepzoom.hp).")
     pack_hpz_parser.add_argument("-m", "--meta-data-json",
                                  help="Path to a JSON file containing metadata to include in the HPZ archive.")
-    pack_hpz_parser.add_argument("--zip-compression", type=int, default=zipfile.ZIP_DEFLATED,
-                                 choices=[zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED, zipfile.ZIP_BZIP2, zipfile.ZIP_LZMA],
-                                 help=f"ZIP compression method (default: {zipfile.ZIP_DEFLATED}). "
-                                      f"Choices: {zipfile.ZIP_STORED} (no comp.), {zipfile.ZIP_DEFLATED} (default), "
-                                      f"{zipfile.ZIP_BZIP2}, {zipfile.ZIP_LZMA}.")
+    pack_hpz_parser.add_argument("--zip-compression", type=int, default=HPZ_ZIP_STORED,
+                                 choices=list(HPZ_ZIP_COMPRESSION_METHODS),
+                                 help=f"ZIP compression method for tiles (default: {HPZ_ZIP_STORED}, tiles are already compressed). "
+                                      "Choices: " + ", ".join(f"{method} ({name})" for method, name in HPZ_ZIP_COMPRESSION_METHODS.items()) + ".")
+
+
+    # --- serve commands ---
+    serve_parser = subparsers.add_parser("serve", help="Serve DZI descriptors, tiles, thumbnails and regions over HTTP. "
+                                                       "image_path is a directory of slides and .hpz archives.")
+    serve_parser.add_argument("--host", default=DEFAULT_SERVER_HOST, help=f"Interface to bind (default: {DEFAULT_SERVER_HOST}).")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_SERVER_PORT, help=f"Port to listen on (default: {DEFAULT_SERVER_PORT}).")
+    serve_parser.add_argument("--workers", type=int, default=None,
+                              help="Render threads (default: number of CPUs).")
+    serve_parser.add_argument("-s", "--tile-size", type=int, default=DEFAULT_TILE_SIZE,
+                              help="Tile size for slides rendered on demand (default: 256).")
+    serve_parser.add_argument("--overlap", type=int, default=DEFAULT_TILE_OVERLAP,
+                              help="Tile overlap for slides rendered on demand (default: 1).")
+    serve_parser.add_argument("--suffix", default=DEFAULT_DEEPZOOM_TILE_SUFFIX,
+                              help="Tile suffix for slides rendered on demand (default: .jpg).")
+    serve_parser.add_argument("-q", "--quality", type=int, default=DEFAULT_JPEG_QUALITY,
+                              help="Quality (1-100) for rendered tiles and regions (default: 90).")
+    serve_parser.add_argument("--effort", type=int, default=None,
+                              help="Encoder effort for webp, avif and jxl tiles and regions.")
+    serve_parser.add_argument("--max-open-slides", type=int, default=DEFAULT_SLIDE_POOL_MAX_OPEN,
+                              help=f"Slides kept open at once (default: {DEFAULT_SLIDE_POOL_MAX_OPEN}).")
+    serve_parser.add_argument("--thumbnail-cache", default=None,
+                              help="Directory to keep rendered slide thumbnails in across restarts (default: none).")
+
+
+    # --- batch commands ---
+    batch_parser = subparsers.add_parser("batch", help="Run a command over many slides in one worker pool. image_path is a "
+                                                       "directory, a glob (quote it), or a .csv/.jsonl manifest with an "
+                                                       "'image_path' column.\n"
+                                                       "e.g. 'slides/*.svs' batch --workers 8 build-deepzoom -o out/{stem}")
+    batch_parser.add_argument("--workers", type=int, default=None,
+                              help="Worker processes (default: number of CPUs).")
+    batch_parser.add_argument("--results", default=None,
+                              help="File to write one JSON result line per slide to (default: stdout).")
+    batch_parser.add_argument("--max-memory-mb", type=int, default=None,
+                              help="Overall resident memory cap for the workers; no new slide is started while "
+                                   "they use more than this (default: no cap).")
+    batch_parser.add_argument("batch_command", choices=BATCH_COMMANDS,
+                              help="Command to run for every slide.")
+    batch_parser.add_argument("command_args", nargs=argparse.REMAINDER,
+                              help="Arguments of the command. {stem}, {name}, {dir} and manifest columns are "
+                                   "replaced per slide, e.g. -o out/{stem}.jpg")
+
+    return parser
+
+
+def get_info_result(image_info: ImageInfo) -> Dict[str, Any]:
+    return {
+        "file_path": image_info.file_path,
+        "width": image_info.width_l0,
+        "height": image_info.height_l0,
+        "level_count": image_info.level_count,
+        "level_dimensions": [list(dimensions) for dimensions in image_info.level_dimensions],
+        "level_downsamples": image_info.level_downsamples,
+        "mpp": image_info.get_mpp(),
+        "metadata": image_info.metadata
+    }
+
+
+def get_vips_config(args: argparse.Namespace) -> Optional[VipsRuntimeConfig]:
+    """The libvips runtime settings given on the command line, or None if there are none."""
+    megabyte = 1024 * 1024
+    config = VipsRuntimeConfig(
+        concurrency=args.vips_concurrency,
+        cache_max_operations=args.vips_cache_max,
+        cache_max_mem=args.vips_cache_max_mem * megabyte if args.vips_cache_max_mem is not None else None,
+        cache_max_files=args.vips_cache_max_files,
+        intermediates=args.vips_intermediates,
+        disc_threshold=args.vips_disc_threshold * megabyte if args.vips_disc_threshold is not None else None
+    )
+    return config if config != VipsRuntimeConfig() else None
+
+
+def write_thumbnail(thumbnail_vips_image: Any, output_path: str) -> Dict[str, Any]:
+    output_ext = os.path.splitext(output_path)[1].lower().lstrip('.')
+    if output_ext not in SUPPORTED_OUTPUT_FORMATS + ['jpeg', 'tiff']:
+        raise UnsupportedOperationError(f"Unsupported thumbnail output format '{output_ext}'. "
+                                        f"Supported formats are: {', '.join(SUPPORTED_OUTPUT_FORMATS)}.")
+
+    thumbnail_vips_image.write_to_file(output_path)
+    return {"output": output_path}
+
 
+def run_image_command(args: argparse.Namespace) -> Dict[str, Any]:
+    """Open the slide, unless a cached answer will do, and run the command on it."""
+    if args.command == "info" and args.metadata_cache:
+        with MetadataCache(args.metadata_cache) as metadata_cache:
+            return get_info_result(metadata_cache.get_image_info(args.image_path))
 
+    thumbnail_cache = None
+    if args.command == "thumbnail" and args.thumbnail_cache:
+        thumbnail_cache = ThumbnailCache(args.thumbnail_cache)
+        thumbnail = thumbnail_cache.get(args.image_path, args.max_width)
+        if thumbnail is not None:
+            return write_thumbnail(thumbnail, args.output)
+
+    handler = HistopathHandler(args.image_path, thumbnail_cache=thumbnail_cache)
+    try:
+        return run_command(handler, args)
+    finally:
+        handler.close()
+
+
+def run_command(handler: HistopathHandler, args: argparse.Namespace) -> Dict[str, Any]:
+    """Run one single-slide command and return its result as a JSON-serialisable dict."""
+    if args.command == "info":
+        return get_info_result(handler.get_image_info())
+
+    elif args.command == "thumbnail":
+        return write_thumbnail(handler.get_thumbnail(max_width=args.max_width), args.output)
+
+    elif args.command in ("extract-patch", "extract-region"):
+        region = handler.create_region(args.left, args.top, args.width, args.height, args.level)
+        extract = handler.extract_patch if args.command == "extract-patch" else handler.extract_region
+        extracted = extract(
+            region=region,
+            output_path=args.output,
+            output_format=args.format,
+            quality=args.quality,
+            rotate=args.rotate,
+            effort=args.effort
+        )
+        return {"output": extracted.data, "region": str(region)}
+
+    elif args.command == "build-deepzoom":
+        output_path = handler.build_deepzoom_pyramid(
+            output_dir=args.output_base_path,
+            tile_size=args.tile_size,
+            overlap=args.overlap,
+            suffix=args.suffix,
+            quality=args.quality,
+            angle=args.angle,
+            container=args.container,
+            compression_method=args.vips_compression,
+            background=tuple(args.background) if args.background else None,
+            centre=args.centre,
+            checkpoint=args.checkpoint,
+            effort=args.effort,
+            target_tile_bytes=args.target_tile_bytes
+        )
+        return {"output": output_path}
+
+    elif args.command == "build-tiff":
+        output_path = handler.build_tiff_pyramid(
+            output_dir=args.output_dir,
+            tile_size=args.tile_size,
+            compression=args.compression,
+            quality=args.quality,
+            bigtiff=args.bigtiff,
+            ome=args.ome
+        )
+        return {"output": output_path}
+
+    elif args.command == "pack-hpz":
+        meta_data = None
+        if args.meta_data_json:
+            if not os.path.exists(args.meta_data_json):
+                raise FileNotFoundError(f"Metadata JSON file not found: {args.meta_data_json}")
+            with open(args.meta_data_json, 'r') as f:
+                meta_data = json.load(f)
+
+        output_hpz_path = handler.pack_hpz_archive(
+            deepzoom_base_path=args.source_deepzoom_base_path,
+            output_hpz_path=args.output_hpz_path,
+            meta_data=meta_data,
+            tile_compression=args.zip_compression
+        )
+        return {"output": output_hpz_path}
+
+    raise UnsupportedOperationError(f"Unknown command '{args.command}'.")
+
+
+def print_result(command: str, result: Dict[str, Any]):
+    if command == "info":
+        print("\n--- Image Information ---")
+        print(f"File Path: {result['file_path']}")
+        print(f"Dimensions (L0): {result['width']}x{result['height']}")
+        print(f"Pyramid Levels Count: {result['level_count']}")
+        print(f"All Dimensions: {result['level_dimensions']}")
+        print(f"Level Downsamples: {result['level_downsamples']}")
+        print(f"MPP Info: {result['mpp']}")
+        print(f"Metadata: {json.dumps(result['metadata'], indent=2)}")
+    elif command == "thumbnail":
+        print(f"Thumbnail '{result['output']}' created successfully.")
+    elif command == "extract-patch":
+        print(f"Patch '{result['output']}' extracted successfully.")
+    elif command == "extract-region":
+        print(f"Region '{result['output']}' extracted successfully.")
+    elif command == "build-deepzoom":
+        print(f"DeepZoom pyramid created successfully at: {result['output']}")
+    elif command == "build-tiff":
+        print(f"Tiled TIFF pyramid created successfully at: {result['output']}")
+    elif command == "pack-hpz":
+        print(f"HPZ archive created successfully at: {result['output']}")
+
+
+def write_metrics(collector: MetricsCollector, output_path: str):
+    text = collector.to_prometheus() if output_path.endswith(".prom") else collector.to_json()
+    with open(output_path, 'w', encoding="utf-8") as file:
+        file.write(text)
+
+
+def main():
+    parser = build_parser()
     args = parser.parse_args()
 
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose > 1 else logging.INFO if args.verbose else logging.WARNING,
+        format="%(levelname)s: %(message)s"
+    )
+
     if not args.command:
         parser.print_help()
         sys.exit(1)
 
-
-    handler = None
-
     try:
-        handler = HistopathHandler(args.image_path)
-
-        if args.command == "info":
-            image_info = handler.get_image_info()
-            print("\n--- Image Information ---")
-            print(f"File Path: {image_info.file_path}")
-            print(f"Dimensions (L0): {image_info.width_l0}x{image_info.height_l0}")
-            print(f"Pyramid Levels Count: {image_info.level_count}")
-            print(f"All Dimensions: {image_info.all_dimensions}")
-            print(f"MPP Info: {image_info.get_mpp()}")
-            print(f"Metadata: {json.dumps(image_info.metadata, indent=2)}")
-
-
-        elif args.command == "thumbnail":
-            thumbnail_vips_image = handler.get_thumbnail(max_width=args.max_width)
-            output_ext = os.path.splitext(args.output)[1].lower().lstrip('.')
-
-            if output_ext not in ['jpg',  'jpeg', 'png', 'tif', 'tiff']:
-                print(f"Error: Unsupported thumbnail output format '{output_ext} '. Supported formats are: jpg, png, tif.")
-                sys.exit(1)
-            
-            thumbnail_vips_image.write_to_file(args.output)
-            print(f"Thumbnail '{args.output}' created successfully.")
-
-        elif args.command == "extract-patch":
-            region = handler.create_region(args.left, args.top, args.width, args.height, args.level)
-            extracted_patch_info = handler.extract_patch(
-                region=region,
-                output_path=args.output,
-                output_format=args.format,
-                quality=args.quality,
-                rotate=args.rotate
-            )
-            print(f"Patch '{extracted_patch_info.data}' extracted successfully.")
-
-        elif args.command == "extract-region":
-            region = handler.create_region(args.left, args.top, args.width, args.height, args.level)
-            extracted_region_info = handler.extract_region(
-                region=region,
-                output_path=args.output,
-                output_format=args.format,
-                quality=args.quality,
-                rotate=args.rotate
-            )
-            print(f"Region '{extracted_region_info.data}' extracted successfully.")
+        vips_config = get_vips_config(args)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
 
-        elif args.command == "build-deepzoom":
-            output_path = handler.build_deepzoom_pyramid(
-                output_base_path=args.output_base_path,
+    if vips_config is not None and args.command != "batch":
+        apply_vips_runtime_config(vips_config)
+
+    if args.command == "serve":
+        # Imported here so one-shot commands do not pay for the server's imports
+        from histopath_handler.tile_server import run_server
+        try:
+            run_server(
+                args.image_path,
+                host=args.host,
+                port=args.port,
+                workers=args.workers,
                 tile_size=args.tile_size,
                 overlap=args.overlap,
                 suffix=args.suffix,
                 quality=args.quality,
-                angle=args.angle,
-                container=args.container,
-                compression_method=args.vips_compression,
-                background=tuple(args.background) if args.background else None,
-                centre=args.centre
-            )
-
-            print(f"DeepZoom pyramid created successfully at: {output_path}")
-
-        elif args.command == "pack-hpz":
-            meta_data = None
-            if args.meta_data_json:
-                if not os.path.exists(args.meta_data_json):
-                    raise FileNotFoundError(f"Metadata JSON file not found: {args.meta_data_json}")
-                with open(args.meta_data_json, 'r') as f:
-                    meta_data = json.load(f)
-
-            output_hpz_path = handler.build_hpz_archive(
-                deepzoom_output_base_path=args.source_deepzoom_base_path,
-                output_hpz_path=args.output_hpz_path,
-                meta_data=meta_data,
-                compression_level_zip=args.zip_compression
+                effort=args.effort,
+                max_open_slides=args.max_open_slides,
+                thumbnail_cache=ThumbnailCache(args.thumbnail_cache) if args.thumbnail_cache else None
             )
-            print(f"HPZ archive created successfully at: {output_hpz_path}")
-
-            sys.exit(0)
+        except FileNotFoundError as e:
+            print(f"File not found: {e}")
+            sys.exit(1)
+        sys.exit(0)
+
+    if args.command == "batch":
+        from histopath_handler.batch_runner import BatchRunner, iter_batch_inputs
+        command_argv = [args.batch_command] + [arg for arg in args.command_args if arg != "--"]
+        try:
+            # Fail fast on bad command options instead of once per slide
+            parser.parse_args([args.image_path] + command_argv)
+            runner = BatchRunner(command_argv, workers=args.workers, max_memory_mb=args.max_memory_mb,
+                                 vips_config=vips_config)
+            succeeded, failed = runner.run(iter_batch_inputs(args.image_path), args.results)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Batch finished: {succeeded} succeeded, {failed} failed.", file=sys.stderr)
+        sys.exit(1 if failed else 0)
+
+
+    collector = MetricsCollector() if args.metrics else None
+    try:
+        if collector is None:
+            result = run_image_command(args)
+        else:
+            with collector:
+                result = run_image_command(args)
+            write_metrics(collector, args.metrics)
+        print_result(args.command, result)
 
     except (ImageLoadingError, InvalidRegionError, ExtractionError, UnsupportedOperationError) as e:
         print(f"Error: {e}")
@@ -218,9 +472,5 @@ def main():
         print(f"An unexpected error occurred: {e}")
         sys.exit(1)
 
-    finally:
-        if handler:
-            handler.close_image()
-
 if __name__ == "__main__":
     main()
@@ -0,0 +1,138 @@
+from __future__ import annotations
+import re
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from histopath_handler._core.constants import (
+    SUPPORTED_OUTPUT_FORMATS,
+    CODEC_QUALITY_FORMATS,
+    DEFAULT_CODEC_EFFORT,
+    CODEC_EFFORT_RANGES,
+    CODEC_MIN_QUALITY,
+    CODEC_MAX_QUALITY
+)
+from histopath_handler._core.utils import LazyModule
+
+pyvips = LazyModule("pyvips")
+
+
+FORMAT_ALIASES = {"jpeg": "jpg", "tiff": "tif"}
+
+# '.webp[effort=6,smart_subsample=true]' -> ('.webp', 'effort=6,smart_subsample=true')
+SUFFIX_PATTERN = re.compile(r"^(?P<suffix>[^\[\]]+)(?:\[(?P<options>[^\[\]]*)\])?$")
+
+
+def normalize_format(output_format: str) -> str:
+    """'JPEG', '.jpg' -> 'jpg'; raises ValueError for formats without a codec here."""
+    name = output_format.lower().lstrip('.')
+    name = FORMAT_ALIASES.get(name, name)
+    if name not in SUPPORTED_OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}. "
+                         f"Supported formats are: {', '.join(SUPPORTED_OUTPUT_FORMATS)}.")
+    return name
+
+
+def split_suffix(suffix: str) -> Tuple[str, Dict[str, str]]:
+    """Split a libvips save suffix into the file suffix and its options."""
+    match = SUFFIX_PATTERN.match(suffix.strip())
+    if match is None:
+        raise ValueError(f"Invalid tile suffix '{suffix}'; expected e.g. '.webp' or '.webp[effort=6]'.")
+    plain = match["suffix"] if match["suffix"].startswith('.') else f".{match['suffix']}"
+    options: Dict[str, str] = {}
+    for option in filter(None, (match["options"] or "").split(",")):
+        name, _, value = option.partition("=")
+        options[name.strip()] = value.strip()
+    return plain, options
+
+
+def format_suffix(suffix: str, options: Dict[str, Any]) -> str:
+    if not options:
+        return suffix
+    return f"{suffix}[{','.join(f'{name}={value}' for name, value in options.items())}]"
+
+
+def remove_suffix_option(suffix: str, name: str) -> str:
+    """'.webp[Q=80,effort=6]' without `name`, e.g. 'Q' -> '.webp[effort=6]'."""
+    plain, options = split_suffix(suffix)
+    options.pop(name, None)
+    return format_suffix(plain, options)
+
+
+def get_save_options(output_format: str, quality: int, effort: Optional[int] = None) -> Dict[str, Any]:
+    """
+    libvips save options for `output_format`: Q for lossy codecs and `effort` for WebP,
+    AVIF and JPEG-XL (their default when None). `effort` is ignored by other formats.
+    """
+    name = normalize_format(output_format)
+    save_options: Dict[str, Any] = {}
+    if name in CODEC_QUALITY_FORMATS:
+        save_options['Q'] = quality
+    if name in CODEC_EFFORT_RANGES:
+        low, high = CODEC_EFFORT_RANGES[name]
+        effort = DEFAULT_CODEC_EFFORT[name] if effort is None else effort
+        if not low <= effort <= high:
+            raise ValueError(f"Invalid {name} effort: {effort}. Must be between {low} and {high}.")
+        save_options['effort'] = effort
+    if name == "avif":
+        save_options['compression'] = "av1"
+    return save_options
+
+
+def build_save_suffix(suffix: str, quality: int, effort: Optional[int] = None) -> str:
+    """
+    Turn a tile suffix into a libvips save string, e.g. '.webp' -> '.webp[Q=90,effort=4]'.
+    Options already written in the suffix ('.webp[effort=6]') win over the computed ones;
+    unknown formats are passed through for libvips to handle.
+    """
+    plain, given_options = split_suffix(suffix)
+    try:
+        save_options = get_save_options(plain, quality, effort)
+    except ValueError:
+        return suffix
+    save_options.update(given_options)
+    return format_suffix(plain, save_options)
+
+
+def choose_quality_for_budget(tiles: Sequence[pyvips.Image],
+                              suffix: str,
+                              target_bytes: int,
+                              effort: Optional[int] = None) -> Tuple[int, float]:
+    """
+    Highest quality at which the mean encoded size of `tiles` stays within `target_bytes`,
+    found by bisection; returns (quality, mean bytes). If even CODEC_MIN_QUALITY is too
+    large, that quality is returned with its size and the caller decides what to do.
+    """
+    if not tiles:
+        raise ValueError("At least one sample tile is needed to fit a size budget.")
+    plain, given_options = split_suffix(suffix)
+    if normalize_format(plain) not in CODEC_QUALITY_FORMATS:
+        raise ValueError(f"'{plain}' tiles have no quality setting to fit a size budget.")
+    # The searched quality replaces any Q written in the suffix
+    base_suffix = remove_suffix_option(suffix, 'Q')
+
+    def get_mean_size(quality: int) -> float:
+        save_suffix = build_save_suffix(base_suffix, quality, effort)
+        return sum(len(tile.write_to_buffer(save_suffix)) for tile in tiles) / len(tiles)
+
+    low, high = CODEC_MIN_QUALITY, CODEC_MAX_QUALITY
+    best = (low, get_mean_size(low))
+    if best[1] > target_bytes:
+        return best
+    # Invariant: `low` fits the budget
+    while low < high:
+        middle = (low + high + 1) // 2
+        mean_size = get_mean_size(middle)
+        if mean_size <= target_bytes:
+            low, best = middle, (middle, mean_size)
+        else:
+            high = middle - 1
+    return best
+
+
+def apply_suffix_effort(suffix: str, effort: Optional[int]) -> str:
+    """Add `effort` to a WebP/AVIF/JPEG-XL tile suffix unless it already sets one; other formats are returned unchanged."""
+    plain, options = split_suffix(suffix)
+    name = FORMAT_ALIASES.get(plain.lower().lstrip('.'), plain.lower().lstrip('.'))
+    if effort is None or name not in CODEC_EFFORT_RANGES:
+        return suffix
+    options.setdefault('effort', effort)
+    return format_suffix(plain, options)
@@ -8,6 +8,46 @@ DEFAULT_JPEG_QUALITY = 90
 # DEFAULT VIPS compression quality ( 0-9 ) for internal tile compression like JPEG
 DEFAULT_VIPS_COMPRESSION_METHOD = 9
 
+# Grid patch iteration: widest strip (in level pixels) decoded in one go
+DEFAULT_GRID_STRIP_MAX_WIDTH = 16384
+
+# Parallel patch extraction: regions sent to a worker per task
+DEFAULT_PARALLEL_CHUNK_SIZE = 64
+
+# Slide pool: open handlers kept by the process-wide pool
+DEFAULT_SLIDE_POOL_MAX_OPEN = 64
+
+# Decoded tile cache used by the extractors
+DEFAULT_TILE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_TILE_CACHE_TILE_SIZE = 512
+# Reads spanning more cache tiles than this bypass the cache and crop lazily in libvips
+TILE_CACHE_MAX_REGION_TILES = 4
+
+# Tile server
+DEFAULT_SERVER_HOST = "127.0.0.1"
+DEFAULT_SERVER_PORT = 8000
+DEFAULT_SERVER_CACHE_MAX_AGE = 86400 # seconds; responses are keyed by file size and mtime via ETag
+MAX_SERVER_THUMBNAIL_WIDTH = 2048
+MAX_SERVER_REGION_PIXELS = 4096 * 4096
+
+# Tissue detection
+DEFAULT_TISSUE_MASK_WIDTH = 1024
+DEFAULT_MIN_TISSUE_FRACTION = 0.5
+DEFAULT_TISSUE_MIN_SATURATION = 20 # Otsu threshold floor (0-255) so blank glass is never tissue
+DEFAULT_TISSUE_MORPHOLOGY_RADIUS = 2 # Mask pixels used by the closing/opening cleanup
+
+# Image codecs for patches and tiles; jpeg/tiff are accepted as aliases of jpg/tif
+SUPPORTED_OUTPUT_FORMATS = ["png", "jpg", "tif", "webp", "avif", "jxl"]
+CODEC_QUALITY_FORMATS = ["jpg", "webp", "avif", "jxl"] # formats with a libvips Q option
+# libvips `effort` per codec: default and accepted range (higher is smaller but slower)
+DEFAULT_CODEC_EFFORT = {"webp": 4, "avif": 4, "jxl": 7}
+CODEC_EFFORT_RANGES = {"webp": (0, 6), "avif": (0, 9), "jxl": (1, 9)}
+
+# Tile size budgets: quality search bounds and level-0 tiles sampled to measure it
+CODEC_MIN_QUALITY = 10
+CODEC_MAX_QUALITY = 100
+DEFAULT_TILE_BUDGET_SAMPLES = 16
+
 # DEFAULT Output Format
 DEFAULT_PATCH_OUTPUT_FORMAT = "png"
 DEFAULT_DEEPZOOM_TILE_SUFFIX = ".jpg"
@@ -15,10 +55,86 @@ DEFAULT_DEEPZOOM_TILE_SUFFIX = ".jpg"
 # HPZ Archive Settings
 HPZ_FILE_EXTENSION = ".hpz"
 HPZ_META_JSON_FILENAME = "meta.json"
+# zipfile compression method ids, kept here so callers need not import zipfile
+HPZ_ZIP_STORED = 0 # zipfile.ZIP_STORED; tiles are already compressed images
+HPZ_ZIP_COMPRESSION_METHODS = {0: "stored", 8: "deflated", 12: "bzip2", 14: "lzma"}
+
+# Tiled pyramidal TIFF / OME-TIFF output (see TiledTiffPyramidBuilder)
+TIFF_PYRAMID_FILE_EXTENSION = ".tif"
+OME_TIFF_FILE_EXTENSION = ".ome.tif"
+DEFAULT_TIFF_TILE_SIZE = 512
+DEFAULT_TIFF_COMPRESSION = "jpeg"
+TIFF_COMPRESSIONS = ["jpeg", "deflate", "lzw", "zstd", "webp", "jp2k", "none"]
+# Compressions that take a quality (Q) setting
+TIFF_QUALITY_COMPRESSIONS = ["jpeg", "webp", "jp2k"]
+# Uncompressed size from which BigTIFF is used when not forced either way; classic
+# TIFF offsets stop at 4 GiB and poorly compressing tiles can come close to raw size
+TIFF_BIGTIFF_MIN_BYTES = 2 ** 31
+
+# Resumable pyramid builds
+CHECKPOINT_DIR_SUFFIX = ".checkpoint"
+CHECKPOINT_MANIFEST_FILENAME = "manifest.json"
+CHECKPOINT_JOURNAL_FILENAME = "journal.jsonl"
+CHECKPOINT_FORMAT_VERSION = 1
+
+# Persistent ImageInfo cache (SQLite)
+METADATA_CACHE_QUERY_BATCH_SIZE = 500 # paths per IN (...) query, below SQLite's variable limit
+METADATA_CACHE_BUSY_TIMEOUT = 30.0 # seconds a writer waits for another process's lock
+# Stored as SQLite user_version; bump when cached ImageInfo values change meaning so
+# older entries are dropped (2: MPP read from libvips xres/yres in pixels per millimetre)
+METADATA_CACHE_FORMAT_VERSION = 2
+
+# Thumbnail disk cache; libvips' native format loads by memory map
+THUMBNAIL_CACHE_FILE_SUFFIX = ".v"
+
+# Loader backend per file extension (see FileLoaderFactory). OpenSlide serves region
+# reads of these vendor formats without libvips' openslideload layer in between.
+DEFAULT_LOADER_BACKENDS = {
+    ".svs": "pyvips",
+    ".tif": "pyvips",
+    ".tiff": "pyvips",
+    ".png": "pyvips",
+    ".jpg": "pyvips",
+    ".jpeg": "pyvips",
+    ".ndpi": "openslide",
+    ".mrxs": "openslide",
+    ".scn": "openslide",
+    ".bif": "openslide",
+    ".vms": "openslide",
+}
+# Path of a JSON {extension: backend} table that overrides the defaults
+LOADER_BACKENDS_ENV_VAR = "HISTOPATH_LOADER_BACKENDS"
+
+# Slide files picked up when scanning a directory (tile server, batch runs)
+SLIDE_FILE_EXTENSIONS = (".svs", ".tif", ".tiff", ".ndpi", ".mrxs", ".scn", ".bif", ".vms", ".png", ".jpg", ".jpeg")
+
+# libvips runtime settings (see VipsRuntimeConfig): where images that cannot be read
+# in parts (PNG, plain JPEG, strip TIFF) are decompressed to when opened
+VIPS_INTERMEDIATES = ["memory", "disc"]
+# Read by libvips once, at the first such open; sizes like "500m" are accepted
+VIPS_DISC_THRESHOLD_ENV_VAR = "VIPS_DISC_THRESHOLD"
+
+# Batch runs
+BATCH_MEMORY_POLL_INTERVAL = 0.5 # seconds between resident-memory checks while over the cap
+
+# Pipeline stages reported to metrics hooks (see _core/metrics.py)
+METRIC_STAGE_OPEN = "open"
+METRIC_STAGE_METADATA = "metadata"
+METRIC_STAGE_DECODE = "decode"
+METRIC_STAGE_ROTATE = "rotate"
+METRIC_STAGE_ENCODE = "encode"
+METRIC_STAGE_WRITE = "write"
+METRIC_STAGE_ZIP = "zip"
+METRIC_STAGE_PYRAMID = "pyramid" # a whole dzsave run, which decodes, encodes and writes internally
+METRICS_PROMETHEUS_PREFIX = "histopath"
 
 # Image Rotation Angles
 ROTATION_ANGLES = [0, 90, 180, 270]
 
+# Extraction at a target resolution: a stored level counts as at or finer than the
+# target if its downsample is within this ratio (stored downsamples are rarely exact)
+LEVEL_DOWNSAMPLE_TOLERANCE = 0.01
+
 
 
 # Metadata Property Names (standardize keys for image properties)
@@ -24,4 +24,12 @@ class UnsupportedOperationError(HistopathFileHandlerError):
 
 class ExtractionError(HistopathFileHandlerError):
     """Raised when an error occurs during data extraction."""
-    pass
\ No newline at end of file
+    pass
+
+class OperationCancelledError(HistopathFileHandlerError):
+    """Raised when a long-running operation is stopped through its cancel event."""
+    pass
+
+class HandlerBusyError(HistopathFileHandlerError):
+    """Raised when an async handler already has its limit of requests waiting."""
+    pass
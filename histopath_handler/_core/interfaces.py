@@ -1,9 +1,93 @@
+from __future__ import annotations
 from abc import ABC, abstractmethod
+import threading
 from typing import Any, Dict, List, Tuple, Optional
-import pyvips
-import openslide
-from histopath_handler._core.models import Region, ImageInfo, Patch
-from histopath_handler._core.exceptions import UnsupportedOperationError
+from histopath_handler._core.models import Region, ImageInfo, Patch, TissueMask
+from histopath_handler._core.exceptions import UnsupportedOperationError, InvalidRegionError
+from histopath_handler._core.utils import LazyModule
+
+pyvips = LazyModule("pyvips")
+
+
+class ISlideHandle(ABC):
+    """
+    An open slide exposing every pyramid level stored in the file.
+    Level images are opened on first use; regions are given in level-0 coordinates.
+    """
+    file_path: str
+
+    @property
+    @abstractmethod
+    def level_count(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def level_dimensions(self) -> List[Tuple[int, int]]:
+        pass
+
+    @property
+    @abstractmethod
+    def level_downsamples(self) -> List[float]:
+        pass
+
+    @abstractmethod
+    def get_level_image(self, level: int) -> pyvips.Image:
+        """Return the stored image for `level`, opening it on first access."""
+        pass
+
+    @abstractmethod
+    def close(self):
+        pass
+
+    @property
+    def width(self) -> int:
+        return self.level_dimensions[0][0]
+
+    @property
+    def height(self) -> int:
+        return self.level_dimensions[0][1]
+
+    def get_best_level_for_downsample(self, downsample: float) -> int:
+        """Return the smallest stored level whose downsample does not exceed `downsample`."""
+        best_level = 0
+        for level, level_downsample in enumerate(self.level_downsamples):
+            if level_downsample <= downsample:
+                best_level = level
+        return best_level
+
+    def get_scaled_region(self, region: Region) -> Region:
+        """Map a level-0 region onto pixel coordinates of the stored level `region.level`."""
+        if not (0 <= region.level < self.level_count):
+            raise InvalidRegionError(
+                f"Level {region.level} is out of bounds; the slide stores {self.level_count} level(s)."
+            )
+        if (region.left < 0 or region.top < 0 or
+            region.left + region.width > self.width or
+            region.top + region.height > self.height):
+            raise InvalidRegionError(
+                f"Requested region {region} is out of bounds for image "
+                f"dimensions {self.width}x{self.height} at level 0."
+            )
+
+        scaled_region = region.get_scaled_region_at_level(region.level, self.level_downsamples[region.level])
+
+        # Rounding the size may push the far edge one pixel past the stored level
+        level_width, level_height = self.level_dimensions[region.level]
+        scaled_region.width = max(1, min(scaled_region.width, level_width - scaled_region.left))
+        scaled_region.height = max(1, min(scaled_region.height, level_height - scaled_region.top))
+        return scaled_region
+
+    def read_level_area(self, level: int, left: int, top: int, width: int, height: int) -> pyvips.Image:
+        """Crop an area given in pixel coordinates of the stored `level`."""
+        return self.get_level_image(level).extract_area(left, top, width, height)
+
+    def read_region(self, region: Region) -> pyvips.Image:
+        """Crop `region` from its stored level without touching level 0."""
+        scaled_region = self.get_scaled_region(region)
+        return self.read_level_area(
+            region.level, scaled_region.left, scaled_region.top, scaled_region.width, scaled_region.height
+        )
 
 
 class IFileLoader(ABC):
@@ -38,7 +122,8 @@ class IImageExtractor(ABC):
                        output_path: str,
                        output_format: str,
                        quality: int = 90,
-                       rotate: int = 0) -> Patch:
+                       rotate: int = 0,
+                       effort: Optional[int] = None) -> Patch:
         pass
 
 
@@ -53,10 +138,18 @@ class IPyramidBuilder(ABC):
                                container: str,
                                compression_method: int,
                                background: Optional[Tuple[float, ...]] = None,
-                               centre: bool = False) -> str:
+                               centre: bool = False,
+                               cancel_event: Optional[threading.Event] = None) -> str:
         
         pass
 
+
+class ITissueDetector(ABC):
+    @abstractmethod
+    def detect_tissue(self, thumbnail: pyvips.Image, width_l0: int, height_l0: int) -> TissueMask:
+        """Build a tissue mask from a thumbnail of an image whose level 0 is width_l0 x height_l0."""
+        pass
+
    
 class IMetadataParser(ABC):
     @abstractmethod
@@ -0,0 +1,116 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from histopath_handler._core.models import StageMetric
+from histopath_handler._core.constants import METRICS_PROMETHEUS_PREFIX
+
+
+MetricsHook = Callable[[StageMetric], None]
+
+# Replaced, never mutated, so the hot path can read it without the lock
+_hooks: List[MetricsHook] = []
+_hooks_lock = threading.Lock()
+
+
+def add_metrics_hook(hook: MetricsHook):
+    """Call `hook` with a StageMetric after every measured stage, from the thread that ran it."""
+    global _hooks
+    with _hooks_lock:
+        _hooks = _hooks + [hook]
+
+
+def remove_metrics_hook(hook: MetricsHook):
+    global _hooks
+    with _hooks_lock:
+        _hooks = [installed for installed in _hooks if installed is not hook]
+
+
+def metrics_enabled() -> bool:
+    return bool(_hooks)
+
+
+def record_stage(metric: StageMetric):
+    for hook in _hooks:
+        hook(metric)
+
+
+@contextmanager
+def measure_stage(stage: str, file_path: Optional[str] = None) -> Iterator[StageMetric]:
+    """
+    Time the enclosed block as `stage`; the block may fill in `bytes` and `pixels` of the
+    yielded metric. Nothing is timed while no hook is installed, and a block that raises
+    is not reported.
+    """
+    metric = StageMetric(stage, file_path=file_path)
+    if not _hooks:
+        yield metric
+        return
+    started = time.perf_counter()
+    yield metric
+    metric.seconds = time.perf_counter() - started
+    record_stage(metric)
+
+
+class MetricsCollector:
+    """
+    In-process totals per stage (calls, seconds, slowest call, bytes, pixels), exported
+    as JSON or Prometheus text. It is a metrics hook itself; `with MetricsCollector() as
+    collector:` installs it for the block.
+    """
+
+    FIELDS = ("calls", "seconds", "max_seconds", "bytes", "pixels")
+
+    def __init__(self, prefix: str = METRICS_PROMETHEUS_PREFIX):
+        self.prefix = prefix
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, metric: StageMetric):
+        with self._lock:
+            totals = self._stages.get(metric.stage)
+            if totals is None:
+                totals = self._stages[metric.stage] = dict.fromkeys(self.FIELDS, 0)
+            totals["calls"] += 1
+            totals["seconds"] += metric.seconds
+            totals["max_seconds"] = max(totals["max_seconds"], metric.seconds)
+            totals["bytes"] += metric.bytes
+            totals["pixels"] += metric.pixels
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {stage: dict(totals) for stage, totals in sorted(self._stages.items())}
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format, one series per stage for each field."""
+        families = [
+            ("calls", "stage_calls_total", "counter", "Measured stage runs."),
+            ("seconds", "stage_seconds_total", "counter", "Wall time spent in the stage."),
+            ("max_seconds", "stage_seconds_max", "gauge", "Slowest single run of the stage."),
+            ("bytes", "stage_bytes_total", "counter", "Bytes produced or consumed by the stage."),
+            ("pixels", "stage_pixels_total", "counter", "Pixels processed by the stage."),
+        ]
+        snapshot = self.snapshot()
+        lines = []
+        for field, name, metric_type, description in families:
+            lines.append(f"# HELP {self.prefix}_{name} {description}")
+            lines.append(f"# TYPE {self.prefix}_{name} {metric_type}")
+            for stage, totals in snapshot.items():
+                lines.append(f'{self.prefix}_{name}{{stage="{stage}"}} {totals[field]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+    def __enter__(self):
+        add_metrics_hook(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        remove_metrics_hook(self)
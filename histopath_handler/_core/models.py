@@ -1,7 +1,8 @@
+import math
 from dataclasses import dataclass, field
 from typing import Dict, Any, Optional, List, Tuple
 from .utils import calculate_scaled_coords, calculate_scaled_dimensions
-from .constants import METADATA_PROPERTY_MPP_X, METADATA_PROPERTY_MPP_Y
+from .constants import METADATA_PROPERTY_MPP_X, METADATA_PROPERTY_MPP_Y, VIPS_INTERMEDIATES
 
 
 @dataclass
@@ -13,12 +14,12 @@ class Region:
     level: int = 0
 
 
-    def get_scaled_region_at_level(self, target_level: int) -> 'Region':
+    def get_scaled_region_at_level(self, target_level: int, downsample: Optional[float] = None) -> 'Region':
         if target_level < 0:
             raise ValueError("Target level must be a non-negative integer.")
         
-        scaled_left, scaled_top = calculate_scaled_coords(self.left, self.top, target_level)
-        scaled_width, scaled_height = calculate_scaled_dimensions(self.width, self.height, target_level)
+        scaled_left, scaled_top = calculate_scaled_coords(self.left, self.top, target_level, downsample)
+        scaled_width, scaled_height = calculate_scaled_dimensions(self.width, self.height, target_level, downsample)
 
         return Region(
             left=scaled_left,
@@ -43,6 +44,7 @@ class ImageInfo:
     mpp_x : Optional[float] = None
     mpp_y : Optional[float] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
+    level_downsamples: List[float] = field(default_factory=list)
 
     def get_filename(self) -> str:
         return self.file_path.split('/')[-1] if '/' in self.file_path else self.file_path
@@ -51,13 +53,155 @@ class ImageInfo:
         if not (0 <= level < self.level_count):
             raise IndexError(f"Level {level} is out of bounds for this image.")
         return self.level_dimensions[level]
+
+    def get_downsample_at_level(self, level: int) -> float:
+        if not (0 <= level < self.level_count):
+            raise IndexError(f"Level {level} is out of bounds for this image.")
+        if level < len(self.level_downsamples):
+            return self.level_downsamples[level]
+        return float(2 ** level)
+
+    def get_best_level_for_downsample(self, downsample: float, tolerance: float = 0.0) -> int:
+        """
+        The smallest stored level that still has at least the detail of `downsample`,
+        i.e. the largest level downsample not above it (`tolerance` allows e.g. 4.0003
+        to count as 4). Level 0 if every level is coarser.
+        """
+        best_level = 0
+        for level in range(self.level_count):
+            if self.get_downsample_at_level(level) <= downsample * (1 + tolerance):
+                if self.get_downsample_at_level(level) > self.get_downsample_at_level(best_level):
+                    best_level = level
+        return best_level
+
     def get_mpp(self) -> Dict[str, Optional[float]]:
         return {METADATA_PROPERTY_MPP_X: self.mpp_x, METADATA_PROPERTY_MPP_Y: self.mpp_y}
 
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-compatible form; `from_dict` restores it."""
+        return {
+            "file_path": self.file_path,
+            "width_l0": self.width_l0,
+            "height_l0": self.height_l0,
+            "level_count": self.level_count,
+            "level_dimensions": [list(dimensions) for dimensions in self.level_dimensions],
+            "mpp_x": self.mpp_x,
+            "mpp_y": self.mpp_y,
+            "metadata": dict(self.metadata),
+            "level_downsamples": list(self.level_downsamples),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ImageInfo':
+        return cls(
+            file_path=data["file_path"],
+            width_l0=int(data["width_l0"]),
+            height_l0=int(data["height_l0"]),
+            level_count=int(data["level_count"]),
+            level_dimensions=[(int(width), int(height)) for width, height in data.get("level_dimensions", [])],
+            mpp_x=data.get("mpp_x"),
+            mpp_y=data.get("mpp_y"),
+            metadata=dict(data.get("metadata", {})),
+            level_downsamples=[float(downsample) for downsample in data.get("level_downsamples", [])],
+        )
+
 
 @dataclass
 class Patch:
     data: Any
     region: Region
     format: str
-    metadata: Dict[str, Any] = field(default_factory=dict)
\ No newline at end of file
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class PatchExtractionResult:
+    """Outcome of extracting one region in a batch; exactly one of `data`/`error` is set."""
+    region: Region
+    data: Any = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class TissueMask:
+    """
+    Low-resolution boolean tissue mask (H, W ndarray) covering the whole level-0 image.
+    Regions at any level are mapped onto it through the level dimensions.
+    """
+    mask: Any
+    width_l0: int
+    height_l0: int
+    threshold: Optional[float] = None
+
+    @property
+    def mask_dimensions(self) -> Tuple[int, int]:
+        return self.mask.shape[1], self.mask.shape[0]
+
+    def get_scale_at_level(self, level_dimensions: Tuple[int, int]) -> Tuple[float, float]:
+        """Mask pixels per pixel of a level with the given (width, height)."""
+        mask_width, mask_height = self.mask_dimensions
+        return mask_width / level_dimensions[0], mask_height / level_dimensions[1]
+
+    def get_tissue_fraction_at_level(self,
+                                     left: int,
+                                     top: int,
+                                     width: int,
+                                     height: int,
+                                     level_dimensions: Tuple[int, int]) -> float:
+        scale_x, scale_y = self.get_scale_at_level(level_dimensions)
+        mask_width, mask_height = self.mask_dimensions
+
+        x0 = min(int(left * scale_x), mask_width - 1)
+        y0 = min(int(top * scale_y), mask_height - 1)
+        x1 = max(x0 + 1, min(int(math.ceil((left + width) * scale_x)), mask_width))
+        y1 = max(y0 + 1, min(int(math.ceil((top + height) * scale_y)), mask_height))
+
+        window = self.mask[y0:y1, x0:x1]
+        return float(window.mean()) if window.size else 0.0
+
+    def get_tissue_fraction(self, region: Region) -> float:
+        """Fraction of tissue under a region given in level-0 coordinates."""
+        return self.get_tissue_fraction_at_level(
+            region.left, region.top, region.width, region.height, (self.width_l0, self.height_l0)
+        )
+
+
+@dataclass
+class StageMetric:
+    """One timed pipeline step, as handed to metrics hooks (see _core/metrics.py)."""
+    stage: str
+    seconds: float = 0.0
+    bytes: int = 0
+    pixels: int = 0
+    file_path: Optional[str] = None
+
+
+@dataclass
+class VipsRuntimeConfig:
+    """
+    libvips settings applied by `apply_vips_runtime_config` (see _core/vips_runtime.py).
+    None leaves the libvips default in place. Apart from the load options, these are
+    process-wide in libvips, so handlers in one process share the last applied values.
+    """
+    concurrency: Optional[int] = None          # worker threads per libvips pipeline
+    cache_max_operations: Optional[int] = None # operations kept in the libvips operation cache
+    cache_max_mem: Optional[int] = None        # bytes held by cached operations
+    cache_max_files: Optional[int] = None      # files kept open by cached operations
+    intermediates: Optional[str] = None        # "memory" or "disc", see VIPS_INTERMEDIATES
+    disc_threshold: Optional[int] = None       # bytes; larger images go to disc unless intermediates is "memory"
+
+    def __post_init__(self):
+        if self.intermediates is not None and self.intermediates not in VIPS_INTERMEDIATES:
+            raise ValueError(f"Invalid intermediates '{self.intermediates}'. Must be one of {VIPS_INTERMEDIATES}.")
+        for name in ("concurrency", "cache_max_operations", "cache_max_mem", "cache_max_files", "disc_threshold"):
+            value = getattr(self, name)
+            if value is not None and value < 0:
+                raise ValueError(f"{name} must not be negative, got {value}.")
+
+    def get_load_options(self) -> Dict[str, Any]:
+        """Extra `new_from_file` options: `memory=True` decompresses into RAM whatever the size."""
+        return {"memory": True} if self.intermediates == "memory" else {}
@@ -1,7 +1,38 @@
 import os 
 import json
 import math
-from typing import Dict, Any, Tuple
+import importlib
+import threading
+from types import ModuleType
+from typing import Dict, Any, Optional, Tuple
+from .exceptions import OperationCancelledError
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access, e.g.
+    `np = LazyModule("numpy")`. Modules using it need `from __future__ import annotations`
+    so signatures like `-> np.ndarray` do not trigger the import.
+    """
+
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__["_module"]
+        if module is None:
+            module = importlib.import_module(self.__dict__["_name"])
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._load(), attribute)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
 
 
 def validate_file_path(file_path: str):
@@ -13,21 +44,32 @@ def read_json_file(file_path: str) -> Dict[str, Any]:
     with open(file_path, 'r') as file:
         return json.load(file)
     
-def calculate_scaled_dimensions(width_l0: int, height_l0: int, level: int) -> Tuple[int, int]:
+def calculate_scaled_dimensions(width_l0: int,
+                                height_l0: int,
+                                level: int,
+                                downsample: Optional[float] = None) -> Tuple[int, int]:
     if level < 0:
         raise ValueError("Level must be a non-negative integer.")
     
-    scale_factor = 2 ** level
-    
-    return width_l0 // scale_factor, height_l0 // scale_factor
+    if downsample is None:
+        # Fall back to a power-of-two pyramid when the stored downsample is unknown
+        scale_factor = 2 ** level
+        return width_l0 // scale_factor, height_l0 // scale_factor
+
+    # Stored downsamples are rarely exact (e.g. 4.0003 on SVS), so round instead of
+    # truncating to keep a 1024px level-0 span at 256px on a 4x level.
+    return max(1, int(round(width_l0 / downsample))), max(1, int(round(height_l0 / downsample)))
 
-def calculate_scaled_coords(left_l0: int, top_l0: int, level: int) -> Tuple[int, int]:
+def calculate_scaled_coords(left_l0: int,
+                            top_l0: int,
+                            level: int,
+                            downsample: Optional[float] = None) -> Tuple[int, int]:
     if level < 0:
         raise ValueError("Level must be a non-negative integer.")
     
-    scale_factor = 2 ** level
+    scale_factor = downsample if downsample is not None else 2 ** level
     
-    return left_l0 // scale_factor, top_l0 // scale_factor
+    return int(left_l0 // scale_factor), int(top_l0 // scale_factor)
 
 def get_basename_without_extension(file_path: str) -> str:
     validate_file_path(file_path)
@@ -53,10 +95,27 @@ def write_json_file(file_path: str, data: Dict[str, Any]):
         json.dump(data, file, indent=4)
 
 
-import os
-import zipfile
+def stop_on_cancel(image: Any, cancel_event: Optional[threading.Event]) -> Any:
+    """
+    Return a copy of the pyvips `image` whose computation (e.g. dzsave, tiffsave) is
+    killed at the next progress update once `cancel_event` is set; the save then fails
+    with pyvips.Error. The original image, possibly shared, is left untouched.
+    """
+    if cancel_event is None:
+        return image
+    image = image.copy()
+    image.set_progress(True)
+    image.signal_connect("eval", lambda image, progress: image.set_kill(True) if cancel_event.is_set() else None)
+    return image
+
+
+def raise_if_cancelled(cancel_event: Optional[threading.Event], operation: str):
+    if cancel_event is not None and cancel_event.is_set():
+        raise OperationCancelledError(f"{operation} was cancelled.")
+
 
 def zip_directory(folder_path, zip_path):
+    import zipfile
     with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
         for root, _, files in os.walk(folder_path):
             for file in files:
@@ -0,0 +1,54 @@
+from __future__ import annotations
+import os
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from histopath_handler._core.models import VipsRuntimeConfig
+from histopath_handler._core.constants import VIPS_DISC_THRESHOLD_ENV_VAR
+from histopath_handler._core.utils import LazyModule
+
+pyvips = LazyModule("pyvips")
+
+logger = logging.getLogger(__name__)
+
+
+_config: Optional[VipsRuntimeConfig] = None
+_config_lock = threading.Lock()
+
+
+def apply_vips_runtime_config(config: VipsRuntimeConfig):
+    """
+    Apply `config` to libvips for this process. Settings left as None keep their current
+    value. The disc threshold is only picked up if no image has been decompressed yet,
+    so apply the config before the first slide is opened.
+    """
+    global _config
+    with _config_lock:
+        if config.disc_threshold is not None:
+            os.environ[VIPS_DISC_THRESHOLD_ENV_VAR] = str(config.disc_threshold)
+        elif config.intermediates == "disc":
+            # Everything that cannot be read in parts is unpacked to a temporary file
+            os.environ[VIPS_DISC_THRESHOLD_ENV_VAR] = "0"
+
+        if config.concurrency is not None:
+            pyvips.concurrency_set(config.concurrency)
+        if config.cache_max_operations is not None:
+            pyvips.cache_set_max(config.cache_max_operations)
+        if config.cache_max_mem is not None:
+            pyvips.cache_set_max_mem(config.cache_max_mem)
+        if config.cache_max_files is not None:
+            pyvips.cache_set_max_files(config.cache_max_files)
+
+        _config = config
+    logger.debug("Applied libvips runtime config: %s", config)
+
+
+def get_vips_runtime_config() -> Optional[VipsRuntimeConfig]:
+    return _config
+
+
+def get_vips_load_options() -> Dict[str, Any]:
+    """Load options implied by the applied config, for loaders that open files with libvips."""
+    config = _config
+    return config.get_load_options() if config is not None else {}
@@ -0,0 +1,230 @@
+from __future__ import annotations
+import os
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple, Union
+
+from histopath_handler.histopath_handler import HistopathHandler
+from histopath_handler._core.models import ImageInfo, Region, Patch, TissueMask
+from histopath_handler._core.exceptions import HandlerBusyError, ImageLoadingError
+from histopath_handler.pyramid_builders.deepzoom_tile_source import DeepZoomTileSource
+from histopath_handler._core.utils import LazyModule
+
+np = LazyModule("numpy")
+
+# Returned by next() on the executor when the wrapped iterator is exhausted
+_EXHAUSTED = object()
+
+
+class AsyncHistopathHandler:
+    """
+    asyncio façade over `HistopathHandler`: each public method has an awaitable
+    equivalent with the same arguments, run on a thread pool so the event loop never
+    blocks on libvips. Open one with `await AsyncHistopathHandler.open(path)`.
+
+    Backpressure: at most `max_concurrent` calls of this handler run at once. Further
+    calls wait on a semaphore without handing work to the executor. With `max_waiting`,
+    a call that would wait behind that many others fails at once with HandlerBusyError,
+    so a service can answer 503 instead of queueing decode work without bound.
+
+    Cancellation: cancelling a pyramid build sets its cancel event. dzsave and tiffsave
+    then stop at their next progress update, and row-by-row builds stop after the
+    current row, keeping their checkpoint. Other calls cannot be interrupted
+    mid-decode; the awaiting task is cancelled at once, but the call keeps its slot
+    until its thread finishes.
+    """
+
+    def __init__(self,
+                 handler: HistopathHandler,
+                 executor: Optional[Executor] = None,
+                 max_concurrent: Optional[int] = None,
+                 max_waiting: Optional[int] = None):
+        self._validate_limits(max_concurrent, max_waiting)
+
+        self._handler = handler
+        self._max_concurrent = max_concurrent if max_concurrent else os.cpu_count() or 1
+        # A private pool matches the concurrency limit; a shared one is left to its owner
+        self._owns_executor = executor is None
+        self._executor = executor if executor else ThreadPoolExecutor(max_workers=self._max_concurrent)
+        self._max_waiting = max_waiting
+        self._semaphore = asyncio.Semaphore(self._max_concurrent)
+        self._waiting = 0
+        self._closed = False
+
+    @staticmethod
+    def _validate_limits(max_concurrent: Optional[int], max_waiting: Optional[int]):
+        if max_concurrent is not None and max_concurrent <= 0:
+            raise ValueError("max_concurrent must be positive.")
+        if max_waiting is not None and max_waiting < 0:
+            raise ValueError("max_waiting must not be negative.")
+
+    @classmethod
+    async def open(cls,
+                   file_path: str,
+                   executor: Optional[Executor] = None,
+                   max_concurrent: Optional[int] = None,
+                   max_waiting: Optional[int] = None,
+                   **handler_options) -> AsyncHistopathHandler:
+        """Open `file_path` off the event loop; `handler_options` go to HistopathHandler."""
+        cls._validate_limits(max_concurrent, max_waiting)
+        pool = executor if executor else ThreadPoolExecutor(max_workers=max_concurrent or os.cpu_count() or 1)
+
+        future = asyncio.get_running_loop().run_in_executor(
+            pool, functools.partial(HistopathHandler, file_path, **handler_options)
+        )
+        try:
+            handler = await asyncio.shield(future)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                # The open cannot be interrupted; close the slide once it arrives
+                future.add_done_callback(
+                    lambda done: done.result().close() if not done.cancelled() and done.exception() is None else None
+                )
+            if executor is None:
+                pool.shutdown(wait=False)
+            raise
+
+        async_handler = cls(handler, pool, max_concurrent, max_waiting)
+        async_handler._owns_executor = executor is None
+        return async_handler
+
+    @property
+    def handler(self) -> HistopathHandler:
+        """The wrapped synchronous handler."""
+        return self._handler
+
+    @property
+    def pending(self) -> int:
+        """Calls currently waiting for a free slot."""
+        return self._waiting
+
+    async def _run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        return await self._submit(functools.partial(func, *args, **kwargs))
+
+    async def _run_cancellable(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        # Cancelling the awaiting task sets the event, which the builders poll
+        cancel_event = threading.Event()
+        return await self._submit(functools.partial(func, *args, cancel_event=cancel_event, **kwargs), cancel_event)
+
+    async def _submit(self, call: Callable[[], Any], cancel_event: Optional[threading.Event] = None) -> Any:
+        if self._closed:
+            raise ImageLoadingError("The handler is closed.")
+        if self._max_waiting is not None and self._semaphore.locked() and self._waiting >= self._max_waiting:
+            raise HandlerBusyError(
+                f"{self._waiting} request(s) already waiting for one of {self._max_concurrent} slot(s)."
+            )
+
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        if self._closed:
+            self._semaphore.release()
+            raise ImageLoadingError("The handler is closed.")
+
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._executor, call)
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+        def on_done(done: asyncio.Future):
+            # The slot is freed when the thread finishes, not when the caller stops waiting
+            self._semaphore.release()
+            if not done.cancelled():
+                done.exception() # retrieved, so an abandoned call's error is not logged as unhandled
+
+        future.add_done_callback(on_done)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if cancel_event is not None:
+                cancel_event.set()
+            raise
+
+    async def get_image_info(self) -> ImageInfo:
+        # Read once when the slide was opened
+        return self._handler.get_image_info()
+
+    async def get_thumbnail(self, *args, **kwargs) -> Any:
+        return await self._run(self._handler.get_thumbnail, *args, **kwargs)
+
+    async def get_tissue_mask(self, *args, **kwargs) -> TissueMask:
+        return await self._run(self._handler.get_tissue_mask, *args, **kwargs)
+
+    def create_region(self, *args, **kwargs) -> Region:
+        # Coordinate arithmetic only; nothing to run off the loop
+        return self._handler.create_region(*args, **kwargs)
+
+    async def extract_patch(self, *args, **kwargs) -> Patch:
+        return await self._run(self._handler.extract_patch, *args, **kwargs)
+
+    async def extract_patches(self, *args, **kwargs) -> Union[np.ndarray, List[np.ndarray]]:
+        return await self._run(self._handler.extract_patches, *args, **kwargs)
+
+    async def extract_at_mpp(self, *args, **kwargs) -> np.ndarray:
+        return await self._run(self._handler.extract_at_mpp, *args, **kwargs)
+
+    async def iter_patches(self, *args, **kwargs) -> AsyncIterator[Tuple[Region, np.ndarray]]:
+        """Async version of `iter_patches`; each step decodes on the executor, in order."""
+        iterator = self._handler.iter_patches(*args, **kwargs)
+        while True:
+            item = await self._run(next, iterator, _EXHAUSTED)
+            if item is _EXHAUSTED:
+                return
+            yield item
+
+    async def extract_region(self, *args, **kwargs) -> Patch:
+        return await self._run(self._handler.extract_region, *args, **kwargs)
+
+    async def extract_region_buffer(self, *args, **kwargs) -> bytes:
+        return await self._run(self._handler.extract_region_buffer, *args, **kwargs)
+
+    async def choose_tile_quality(self, *args, **kwargs) -> int:
+        return await self._run(self._handler.choose_tile_quality, *args, **kwargs)
+
+    async def get_deepzoom_tile_source(self, *args, **kwargs) -> DeepZoomTileSource:
+        return await self._run(self._handler.get_deepzoom_tile_source, *args, **kwargs)
+
+    async def build_deepzoom_pyramid(self, *args, **kwargs) -> str:
+        return await self._run_cancellable(self._handler.build_deepzoom_pyramid, *args, **kwargs)
+
+    async def build_hpz_archive(self, *args, **kwargs) -> str:
+        return await self._run_cancellable(self._handler.build_hpz_archive, *args, **kwargs)
+
+    async def pack_hpz_archive(self, *args, **kwargs) -> str:
+        return await self._run(self._handler.pack_hpz_archive, *args, **kwargs)
+
+    async def build_tiff_pyramid(self, *args, **kwargs) -> str:
+        return await self._run_cancellable(self._handler.build_tiff_pyramid, *args, **kwargs)
+
+    def _shutdown_executor(self):
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+    async def close(self):
+        """Close the slide once running calls are done with it."""
+        if self._closed:
+            return
+        self._closed = True
+        acquired = 0
+        try:
+            # Taking every slot waits for in-flight work to finish
+            for _ in range(self._max_concurrent):
+                await self._semaphore.acquire()
+                acquired += 1
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._handler.close)
+        finally:
+            # Calls still waiting then wake up, find the handler closed and fail
+            for _ in range(acquired):
+                self._semaphore.release()
+            self._shutdown_executor()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
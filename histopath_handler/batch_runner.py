@@ -0,0 +1,206 @@
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stdout
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from histopath_handler._core.models import VipsRuntimeConfig
+from histopath_handler._core.constants import SLIDE_FILE_EXTENSIONS, BATCH_MEMORY_POLL_INTERVAL
+from histopath_handler._core.vips_runtime import apply_vips_runtime_config
+
+
+def iter_batch_inputs(source: str) -> Iterator[Dict[str, str]]:
+    """
+    Slides of a batch run as dicts with an 'image_path' key. `source` is a directory
+    (every slide file in it), a .csv/.jsonl manifest whose other columns become extra
+    placeholders for the command, or a glob pattern. Manifest paths are relative to the manifest.
+    """
+    if os.path.isdir(source):
+        for entry in sorted(os.listdir(source)):
+            path = os.path.join(source, entry)
+            if os.path.isfile(path) and os.path.splitext(entry)[1].lower() in SLIDE_FILE_EXTENSIONS:
+                yield {"image_path": path}
+        return
+
+    extension = os.path.splitext(source)[1].lower()
+    if extension in (".csv", ".jsonl") and os.path.isfile(source):
+        base_dir = os.path.dirname(source)
+        with open(source, 'r', encoding="utf-8", newline="") as file:
+            if extension == ".csv":
+                rows: Iterable[Dict[str, Any]] = csv.DictReader(file)
+            else:
+                rows = (json.loads(line) for line in file if line.strip())
+            for row in rows:
+                if not row.get("image_path"):
+                    raise ValueError(f"Manifest '{source}' has a row without an 'image_path': {row}")
+                item = {key: str(value) for key, value in row.items() if key is not None}
+                item["image_path"] = os.path.join(base_dir, item["image_path"])
+                yield item
+        return
+
+    paths = sorted(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+    if not paths:
+        raise FileNotFoundError(f"No slides match '{source}'.")
+    for path in paths:
+        yield {"image_path": path}
+
+
+def format_command(command_argv: List[str], item: Dict[str, str]) -> List[str]:
+    """Fill {stem}, {name}, {dir} and manifest columns into a command's arguments."""
+    image_path = item["image_path"]
+    fields = {
+        "stem": os.path.splitext(os.path.basename(image_path))[0],
+        "name": os.path.basename(image_path),
+        "dir": os.path.dirname(image_path),
+        **item
+    }
+    return [arg.format_map(fields) for arg in command_argv]
+
+
+def _run_batch_item(item: Dict[str, str], command_argv: List[str]) -> Dict[str, Any]:
+    # Imported here: workers are spawned and the CLI module imports this one lazily
+    from histopath_handler.__main__ import build_parser, run_image_command
+
+    started = time.perf_counter()
+    result: Dict[str, Any] = {"image_path": item["image_path"], "command": command_argv[0]}
+    try:
+        # Keep stdout for the JSON result lines
+        with redirect_stdout(sys.stderr):
+            args = build_parser().parse_args([item["image_path"]] + format_command(command_argv, item))
+            result["result"] = run_image_command(args)
+        result["status"] = "ok"
+    except (Exception, SystemExit) as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def _get_resident_bytes(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/statm", 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class BatchRunner:
+    """
+    Runs one CLI command over many slides in a process pool, so each worker pays the
+    import cost once and opens slides one after another.
+
+    Every slide produces one JSON line (status, result or error, elapsed seconds) and a
+    failing slide never stops the run. A worker that dies (e.g. killed for memory)
+    breaks the pool: the slides it was running are reported as failed and a new pool
+    is started for the rest. With `max_memory_mb`, no new slide is started while the
+    workers' combined resident memory is above the cap (Linux only, read from /proc).
+    """
+
+    def __init__(self,
+                 command_argv: List[str],
+                 workers: Optional[int] = None,
+                 max_memory_mb: Optional[int] = None,
+                 mp_context: str = "spawn",
+                 vips_config: Optional[VipsRuntimeConfig] = None):
+        if not command_argv:
+            raise ValueError("A command to run is required.")
+        if max_memory_mb is not None and max_memory_mb <= 0:
+            raise ValueError("max_memory_mb must be positive.")
+
+        self._command_argv = list(command_argv)
+        self._workers = workers if workers else os.cpu_count() or 1
+        self._max_memory_bytes = max_memory_mb * 1024 * 1024 if max_memory_mb else None
+        self._mp_context = multiprocessing.get_context(mp_context)
+        # Applied in every worker before its first slide, e.g. concurrency = cores / workers
+        self._vips_config = vips_config
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        if self._vips_config is None:
+            return ProcessPoolExecutor(max_workers=self._workers, mp_context=self._mp_context)
+        return ProcessPoolExecutor(max_workers=self._workers, mp_context=self._mp_context,
+                                   initializer=apply_vips_runtime_config, initargs=(self._vips_config,))
+
+    def _get_workers_resident_bytes(self) -> Optional[int]:
+        total = 0
+        for process in multiprocessing.active_children():
+            resident = _get_resident_bytes(process.pid)
+            if resident is None:
+                return None
+            total += resident
+        return total
+
+    def _has_memory_headroom(self, running: int) -> bool:
+        # A single slide always runs, even if it alone exceeds the cap
+        if self._max_memory_bytes is None or running == 0:
+            return True
+        resident = self._get_workers_resident_bytes()
+        return resident is None or resident < self._max_memory_bytes
+
+    def _failure(self, item: Dict[str, str], error: str) -> Dict[str, Any]:
+        return {"image_path": item["image_path"], "command": self._command_argv[0], "status": "error", "error": error}
+
+    def run(self, inputs: Iterable[Dict[str, str]], results_path: Optional[str] = None) -> Tuple[int, int]:
+        """Process every input and write its JSON line; returns (succeeded, failed)."""
+        output = open(results_path, 'w', encoding="utf-8") if results_path else sys.stdout
+        succeeded = failed = 0
+
+        def record(result: Dict[str, Any]):
+            nonlocal succeeded, failed
+            if result["status"] == "ok":
+                succeeded += 1
+            else:
+                failed += 1
+            output.write(json.dumps(result, default=str) + "\n")
+            output.flush()
+
+        inputs = iter(inputs)
+        exhausted = False
+        pending: Dict[Future, Dict[str, str]] = {}
+        executor = self._create_executor()
+        try:
+            while True:
+                while not exhausted and len(pending) < self._workers and self._has_memory_headroom(len(pending)):
+                    item = next(inputs, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    pending[executor.submit(_run_batch_item, item, self._command_argv)] = item
+
+                if not pending:
+                    break
+
+                # Poll while capped so freed memory lets the next slide start
+                timeout = BATCH_MEMORY_POLL_INTERVAL if self._max_memory_bytes else None
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                broken = False
+                for future in done:
+                    item = pending.pop(future)
+                    try:
+                        record(future.result())
+                    except BrokenProcessPool:
+                        broken = True
+                        record(self._failure(item, "Worker process died while processing this slide."))
+
+                if broken:
+                    # Slides still on the broken pool fail the same way unless they already finished
+                    for future, item in pending.items():
+                        try:
+                            record(future.result())
+                        except BrokenProcessPool:
+                            record(self._failure(item, "Worker process died while processing this slide."))
+                    pending.clear()
+                    executor.shutdown(wait=False)
+                    executor = self._create_executor()
+        finally:
+            executor.shutdown(wait=True)
+            if output is not sys.stdout:
+                output.close()
+
+        return succeeded, failed
@@ -0,0 +1,165 @@
+from __future__ import annotations
+import os
+import re
+import json
+import mmap
+import struct
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Optional, Tuple
+
+from histopath_handler._core.exceptions import ImageLoadingError
+from histopath_handler._core.constants import HPZ_META_JSON_FILENAME
+from histopath_handler.pyramid_builders.deepzoom_layout import DeepZoomLayout
+from histopath_handler._core.utils import LazyModule
+
+zipfile = LazyModule("zipfile")
+
+
+ZIP_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+ZIP_LOCAL_HEADER_SIZE = 30
+DZI_NAMESPACE = "{http://schemas.microsoft.com/deepzoom/2008}"
+
+# (local header offset in the archive, stored size, zip member) of a tile
+TileEntry = Tuple[int, int, "zipfile.ZipInfo"]
+
+
+class HpzReader:
+    """
+    Random-access reader for .hpz archives.
+
+    On open the central directory is turned into a (level, col, row) -> (offset, size)
+    index without touching the tiles themselves. A tile's local header is read the
+    first time the tile is served and its data offset cached, so later reads cost one
+    page-cache read and no decompression. Stored tiles are sliced from a read-only mmap
+    of the archive; deflated members fall back to zipfile.
+    """
+
+    def __init__(self, hpz_path: str):
+        if not os.path.exists(hpz_path):
+            raise FileNotFoundError(f"HPZ archive not found at: {hpz_path}")
+
+        self.hpz_path = hpz_path
+        self._file = open(hpz_path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._zip = zipfile.ZipFile(self._file)
+            self._build_index()
+        except (OSError, ValueError, zipfile.BadZipFile, ET.ParseError, KeyError) as e:
+            self.close()
+            raise ImageLoadingError(f"Failed to open HPZ archive '{hpz_path}': {e}")
+
+    def _build_index(self):
+        members = self._zip.infolist()
+
+        dzi_members = [info for info in members if info.filename.endswith(".dzi") and "/" not in info.filename]
+        if len(dzi_members) != 1:
+            raise ValueError(f"expected exactly one .dzi descriptor, found {len(dzi_members)}")
+
+        self.basename = dzi_members[0].filename[:-len(".dzi")]
+        self.layout = self._parse_dzi(self._zip.read(dzi_members[0]).decode("utf-8"))
+
+        tile_pattern = re.compile(
+            rf"^{re.escape(self.basename)}_files/(\d+)/(\d+)_(\d+){re.escape(self.layout.suffix)}$"
+        )
+
+        self._tiles: Dict[Tuple[int, int, int], TileEntry] = {}
+        # header offset -> data offset, filled as tiles are first served
+        self._data_offsets: Dict[int, int] = {}
+        self._members: Dict[str, zipfile.ZipInfo] = {}
+        for info in members:
+            match = tile_pattern.match(info.filename)
+            if match:
+                level, col, row = (int(group) for group in match.groups())
+                self._tiles[(level, col, row)] = (info.header_offset, info.compress_size, info)
+            else:
+                self._members[info.filename] = info
+
+        self.meta_data: Dict[str, Any] = {}
+        if HPZ_META_JSON_FILENAME in self._members:
+            self.meta_data = json.loads(self._zip.read(self._members[HPZ_META_JSON_FILENAME]))
+
+    def _get_data_offset(self, header_offset: int, info: zipfile.ZipInfo) -> int:
+        data_offset = self._data_offsets.get(header_offset)
+        if data_offset is not None:
+            return data_offset
+        # The local header's extra field may differ from the central directory's, so read it
+        if self._mmap[header_offset:header_offset + 4] != ZIP_LOCAL_HEADER_SIGNATURE:
+            raise ImageLoadingError(f"Corrupt local header for member '{info.filename}' in {self.hpz_path}.")
+        name_length, extra_length = struct.unpack_from("<HH", self._mmap, header_offset + 26)
+        data_offset = header_offset + ZIP_LOCAL_HEADER_SIZE + name_length + extra_length
+        self._data_offsets[header_offset] = data_offset
+        return data_offset
+
+    def _get_entry(self, level: int, col: int, row: int) -> TileEntry:
+        entry = self._tiles.get((level, col, row))
+        if entry is None:
+            raise KeyError(f"Tile {level}/{col}_{row} is not in {self.hpz_path}.")
+        return entry
+
+    def _parse_dzi(self, dzi_xml: str) -> DeepZoomLayout:
+        root = ET.fromstring(dzi_xml)
+        size = root.find(f"{DZI_NAMESPACE}Size")
+        if size is None:
+            size = root.find("Size")
+        return DeepZoomLayout(
+            width=int(size.attrib["Width"]),
+            height=int(size.attrib["Height"]),
+            tile_size=int(root.attrib["TileSize"]),
+            overlap=int(root.attrib["Overlap"]),
+            suffix=f".{root.attrib['Format']}"
+        )
+
+    @property
+    def tile_count(self) -> int:
+        return len(self._tiles)
+
+    def get_dzi(self) -> str:
+        return self.layout.get_dzi_xml()
+
+    def has_tile(self, level: int, col: int, row: int) -> bool:
+        return (level, col, row) in self._tiles
+
+    def get_tile_view(self, level: int, col: int, row: int) -> memoryview:
+        """
+        Zero-copy view of a stored tile into the archive's mmap. Every view must be
+        released (`view.release()` or a `with` block) before `close()`, which otherwise
+        raises BufferError; use `get_tile` for bytes that outlive the reader.
+        """
+        header_offset, size, info = self._get_entry(level, col, row)
+        if info.compress_type != zipfile.ZIP_STORED:
+            return memoryview(self._zip.read(info))
+        offset = self._get_data_offset(header_offset, info)
+        return memoryview(self._mmap)[offset:offset + size]
+
+    def get_tile(self, level: int, col: int, row: int) -> bytes:
+        header_offset, size, info = self._get_entry(level, col, row)
+        if info.compress_type != zipfile.ZIP_STORED:
+            return self._zip.read(info)
+        offset = self._get_data_offset(header_offset, info)
+        return self._mmap[offset:offset + size]
+
+    def get_member(self, name: str) -> Optional[bytes]:
+        info = self._members.get(name)
+        if info is None:
+            return None
+        return self._zip.read(info)
+
+    def get_thumbnail(self) -> Optional[bytes]:
+        return self.get_member(f"{self.basename}_thumb.jpg")
+
+    def close(self):
+        if getattr(self, "_zip", None) is not None:
+            self._zip.close()
+            self._zip = None
+        if getattr(self, "_mmap", None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        if getattr(self, "_file", None) is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,62 +1,85 @@
+import os
+import json
+import logging
+import importlib.util
 from typing import Type, Dict
 from histopath_handler._core.interfaces import IFileLoader
 from histopath_handler._core.exceptions import UnsupportedFileFormatError
+from histopath_handler._core.constants import DEFAULT_LOADER_BACKENDS, LOADER_BACKENDS_ENV_VAR
 from histopath_handler._core.utils import get_file_extension
 from .pyvips_loader import PyVipsLoader
 from .openslide_loader import OpenSlideLoader
 
+logger = logging.getLogger(__name__)
+
 
 class FileLoaderFactory:
+    """
+    Picks a loader per file extension. Each extension maps to a backend name
+    ("pyvips", "openslide"), starting from DEFAULT_LOADER_BACKENDS. A JSON table such as
+    {".ndpi": "pyvips"}, e.g. written from benchmark results, overrides it when named by
+    the HISTOPATH_LOADER_BACKENDS environment variable or passed to `load_backend_table`.
+    """
 
     _loaders: Dict[str, Type[IFileLoader]] = {}
+    _backends: Dict[str, Type[IFileLoader]] = {"pyvips": PyVipsLoader, "openslide": OpenSlideLoader}
+    _backend_table_loaded = False
 
     @classmethod
     def register_loader(cls, file_extension: str, loader_class: Type[IFileLoader]):
 
         cls._loaders[file_extension.lower()] = loader_class
 
+    @classmethod
+    def register_backend(cls, name: str, loader_class: Type[IFileLoader]):
+        cls._backends[name] = loader_class
+
+    @classmethod
+    def set_backend(cls, file_extension: str, backend: str):
+        if backend not in cls._backends:
+            raise UnsupportedFileFormatError(
+                f"Unknown loader backend '{backend}'. Available backends: {', '.join(cls._backends)}."
+            )
+        cls.register_loader(file_extension, cls._backends[backend])
+
+    @classmethod
+    def load_backend_table(cls, table_path: str):
+        """Apply an {extension: backend} JSON table on top of the current mapping."""
+        with open(table_path, 'r', encoding="utf-8") as file:
+            table = json.load(file)
+        for file_extension, backend in table.items():
+            cls.set_backend(file_extension, backend)
+
+    @classmethod
+    def _register_default_loaders(cls):
+        # OpenSlide is optional; without it every format stays on libvips
+        has_openslide = importlib.util.find_spec("openslide") is not None
+        for file_extension, backend in DEFAULT_LOADER_BACKENDS.items():
+            if backend == "openslide" and not has_openslide:
+                backend = "pyvips"
+            cls.set_backend(file_extension, backend)
+
     @classmethod
     def get_loader(cls, file_path: str) -> IFileLoader:
 
         file_ext = get_file_extension(file_path)
 
         if not cls._loaders:
-            cls.register_loader(".tiff", PyVipsLoader)
-            cls.register_loader(".tif", PyVipsLoader)
-            cls.register_loader(".svs", PyVipsLoader)
-            cls.register_loader(".png", PyVipsLoader)
-            cls.register_loader(".jpg", PyVipsLoader)
-            cls.register_loader(".jpeg", PyVipsLoader)
-
-        loader_class =None
-
-
-        if file_ext in [".svs"] and file_ext in cls._loaders:
-            loader_class = cls._loaders[file_ext]
-        elif file_ext in [".tiff", ".tif", ".png", ".jpg", ".jpeg"] and file_ext in cls._loaders:
-            loader_class = cls._loaders[file_ext]
-        else:
-            print(f"No specific loader found for {file_ext}, using default PyVipsLoader")
+            cls._register_default_loaders()
+
+        if not cls._backend_table_loaded:
+            cls._backend_table_loaded = True
+            table_path = os.environ.get(LOADER_BACKENDS_ENV_VAR)
+            if table_path:
+                cls.load_backend_table(table_path)
+
+        loader_class = cls._loaders.get(file_ext)
+        if loader_class is None:
+            logger.warning("No specific loader found for %s, using default PyVipsLoader", file_ext)
             loader_class = PyVipsLoader
-        if loader_class:
-            return loader_class() 
-        
-        else:
-            raise UnsupportedFileFormatError(f"No suitable loader found for file type: {file_ext}")
-        
+        return loader_class()
+
 
-    
 
 # Register default loaders
-FileLoaderFactory.register_loader(".tiff", PyVipsLoader)
-FileLoaderFactory.register_loader(".tif", PyVipsLoader)
-FileLoaderFactory.register_loader(".svs", PyVipsLoader)
-FileLoaderFactory.register_loader(".png", PyVipsLoader)
-FileLoaderFactory.register_loader(".jpg", PyVipsLoader)
-FileLoaderFactory.register_loader(".jpeg", PyVipsLoader)
-
-        
-"""
-real 278.91
-user 2109.01
-sys 5890.37"""
\ No newline at end of file
+FileLoaderFactory._register_default_loaders()
@@ -0,0 +1,197 @@
+import os
+import json
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from histopath_handler._core.models import ImageInfo
+from histopath_handler._core.exceptions import ImageLoadingError
+from histopath_handler._core.constants import (
+    METADATA_CACHE_QUERY_BATCH_SIZE,
+    METADATA_CACHE_BUSY_TIMEOUT,
+    METADATA_CACHE_FORMAT_VERSION
+)
+from histopath_handler._core.utils import LazyModule
+
+sqlite3 = LazyModule("sqlite3")
+
+
+METADATA_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_info (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    info TEXT NOT NULL
+)
+"""
+
+# (size, mtime_ns) of a file, the cache's validity key
+FileStamp = Tuple[int, int]
+
+
+def _get_file_stamp(path: str) -> Optional[FileStamp]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class MetadataCache:
+    """
+    Persistent `ImageInfo` cache in a SQLite file, keyed by absolute path and checked
+    against the file's (size, mtime). A hit costs one `stat` and no slide open; an entry
+    whose file changed or disappeared is dropped on lookup.
+
+    One instance may be shared between threads. Several processes can use the same
+    database file (WAL journal); concurrent writers wait up to the busy timeout.
+    """
+
+    def __init__(self, db_path: str):
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        try:
+            self._connection = sqlite3.connect(db_path, timeout=METADATA_CACHE_BUSY_TIMEOUT, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != METADATA_CACHE_FORMAT_VERSION:
+                # Entries written by another format version may hold stale values
+                self._connection.execute("DROP TABLE IF EXISTS image_info")
+                self._connection.execute(f"PRAGMA user_version = {METADATA_CACHE_FORMAT_VERSION}")
+            self._connection.execute(METADATA_CACHE_SCHEMA)
+            self._connection.commit()
+        except sqlite3.Error as e:
+            raise ImageLoadingError(f"Failed to open metadata cache '{db_path}': {e}")
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _get_key(path: str) -> str:
+        return os.path.abspath(path)
+
+    def get(self, path: str) -> Optional[ImageInfo]:
+        """Cached info for `path`, or None when it is missing or the file has changed."""
+        return self.get_many([path])[path]
+
+    def get_many(self, paths: Iterable[str]) -> Dict[str, Optional[ImageInfo]]:
+        """Bulk lookup, a few SQL queries for any number of paths; misses map to None."""
+        paths = list(paths)
+        stamps = {path: _get_file_stamp(path) for path in paths}
+        keys = {path: self._get_key(path) for path in paths}
+
+        rows: Dict[str, Tuple[int, int, str]] = {}
+        unique_keys = list(dict.fromkeys(keys.values()))
+        with self._lock:
+            for start in range(0, len(unique_keys), METADATA_CACHE_QUERY_BATCH_SIZE):
+                batch = unique_keys[start:start + METADATA_CACHE_QUERY_BATCH_SIZE]
+                query = f"SELECT path, size, mtime_ns, info FROM image_info WHERE path IN ({','.join('?' * len(batch))})"
+                for key, size, mtime_ns, info in self._connection.execute(query, batch):
+                    rows[key] = (size, mtime_ns, info)
+
+        results: Dict[str, Optional[ImageInfo]] = {}
+        stale: List[str] = []
+        for path in paths:
+            row = rows.get(keys[path])
+            if row is None:
+                results[path] = None
+            elif stamps[path] != (row[0], row[1]):
+                results[path] = None
+                stale.append(keys[path])
+            else:
+                info = ImageInfo.from_dict(json.loads(row[2]))
+                # Report the path the caller asked for, as an uncached open would
+                info.file_path = path
+                results[path] = info
+
+        if stale:
+            self._delete(stale)
+
+        with self._lock:
+            hits = sum(1 for info in results.values() if info is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put(self, info: ImageInfo):
+        """Store `info` for `info.file_path` under the file's current size and mtime."""
+        self.put_many([info])
+
+    def put_many(self, infos: Iterable[ImageInfo]):
+        records = []
+        for info in infos:
+            stamp = _get_file_stamp(info.file_path)
+            if stamp is None:
+                continue
+            records.append((self._get_key(info.file_path), stamp[0], stamp[1],
+                            json.dumps(info.to_dict(), default=str)))
+        if not records:
+            return
+        with self._lock:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO image_info (path, size, mtime_ns, info) VALUES (?, ?, ?, ?)", records
+                )
+
+    def invalidate(self, path: str):
+        self._delete([self._get_key(path)])
+
+    def _delete(self, keys: List[str]):
+        with self._lock:
+            with self._connection:
+                self._connection.executemany("DELETE FROM image_info WHERE path = ?", [(key,) for key in keys])
+
+    def prune(self) -> int:
+        """Drop entries whose file changed or no longer exists; returns how many were removed."""
+        with self._lock:
+            rows = self._connection.execute("SELECT path, size, mtime_ns FROM image_info").fetchall()
+        stale = [key for key, size, mtime_ns in rows if _get_file_stamp(key) != (size, mtime_ns)]
+        if stale:
+            self._delete(stale)
+        return len(stale)
+
+    def get_image_info(self, path: str) -> ImageInfo:
+        """Cached info, opening the slide only on a miss (and caching the result)."""
+        return self.get_image_infos([path])[path]
+
+    def get_image_infos(self, paths: Iterable[str]) -> Dict[str, ImageInfo]:
+        """Bulk `get_image_info`: one cache query, then each missing slide is opened once."""
+        # Imported here: the factory pulls in the loaders, which a pure cache hit never needs
+        from .loader_factory import FileLoaderFactory
+
+        results = self.get_many(paths)
+        loaded = []
+        for path, info in results.items():
+            if info is not None:
+                continue
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Image file not found at: {path}")
+            loader = FileLoaderFactory.get_loader(path)
+            image_object = loader.load_image(path)
+            try:
+                info = loader.get_image_info(path, image_object)
+            finally:
+                loader.close_image(image_object)
+            results[path] = info
+            loaded.append(info)
+
+        self.put_many(loaded)
+        return results
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM image_info").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
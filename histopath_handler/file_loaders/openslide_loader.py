@@ -1,37 +1,104 @@
-import openslide
-import numpy as np
-import pyvips # For converting OpenSlide thumbnail to pyvips.Image
-
-from typing import Any, Tuple, Optional, Dict
-from histopath_handler._core.interfaces import IFileLoader
+from __future__ import annotations
+import threading
+from typing import Any, Tuple, Optional, Dict, List
+from histopath_handler._core.interfaces import IFileLoader, ISlideHandle
 from histopath_handler._core.models import ImageInfo
-from histopath_handler._core.exceptions import ImageLoadingError
+from histopath_handler._core.exceptions import ImageLoadingError, InvalidRegionError
 from histopath_handler._core.constants import METADATA_PROPERTY_MPP_X, METADATA_PROPERTY_MPP_Y
+from histopath_handler._core.utils import LazyModule
+
+openslide = LazyModule("openslide")
+pyvips = LazyModule("pyvips")
+
+
+class OpenSlideSlide(ISlideHandle):
+    """
+    Slide handle backed by OpenSlide. Region reads call `read_region` on their stored
+    level and wrap the returned RGBA pixels as a vips image, flattened onto white like
+    `PyVipsLoader` does. Whole-level images (DeepZoom builds, grid iteration) come from
+    libvips' openslideload and are opened on first use.
+    """
+
+    def __init__(self, file_path: str, openslide_object: openslide.OpenSlide):
+        self.file_path = file_path
+        self.openslide = openslide_object
+        self._level_dimensions: List[Tuple[int, int]] = list(openslide_object.level_dimensions)
+        self._level_downsamples: List[float] = list(openslide_object.level_downsamples)
+        self._level_images: Dict[int, pyvips.Image] = {}
+        self._level_lock = threading.Lock()
+
+    @property
+    def level_count(self) -> int:
+        return len(self._level_dimensions)
+
+    @property
+    def level_dimensions(self) -> List[Tuple[int, int]]:
+        return self._level_dimensions
+
+    @property
+    def level_downsamples(self) -> List[float]:
+        return self._level_downsamples
+
+    def _check_level(self, level: int):
+        if not (0 <= level < self.level_count):
+            raise InvalidRegionError(
+                f"Level {level} is out of bounds; the slide stores {self.level_count} level(s)."
+            )
+
+    def get_level_image(self, level: int) -> pyvips.Image:
+        self._check_level(level)
+        level_image = self._level_images.get(level)
+        if level_image is None:
+            # Imported here: only whole-level pipelines need libvips for this backend
+            from .pyvips_loader import PyVipsLoader
+            with self._level_lock:
+                level_image = self._level_images.get(level)
+                if level_image is None:
+                    try:
+                        level_image = PyVipsLoader.open_level(self.file_path, {"level": level})
+                    except pyvips.Error as e:
+                        raise ImageLoadingError(f"Failed to load level {level} from {self.file_path}: {str(e)}")
+                    self._level_images[level] = level_image
+        return level_image
 
+    def read_level_area(self, level: int, left: int, top: int, width: int, height: int) -> pyvips.Image:
+        self._check_level(level)
+        downsample = self._level_downsamples[level]
+        # OpenSlide takes the top-left corner in level-0 coordinates and the size in level pixels
+        rgba = self.openslide.read_region((int(left * downsample), int(top * downsample)), level, (width, height))
+        # One copy out of PIL; np.array(PIL) followed by new_from_array would take two
+        area = pyvips.Image.new_from_memory(rgba.tobytes(), width, height, 4, "uchar")
+        return area.flatten(background=[255, 255, 255])
+
+    def close(self):
+        self._level_images.clear()
+        self.openslide.close()
 
 
 class OpenSlideLoader(IFileLoader):
 
-    def load_image(self, file_path:str) -> Any:
+    def load_image(self, file_path:str) -> OpenSlideSlide:
         try:
-            return openslide.OpenSlide(file_path)
+            return OpenSlideSlide(file_path, openslide.OpenSlide(file_path))
         except openslide.OpenSlideError as e:
             raise ImageLoadingError(f"Failed to load image from {file_path}: {str(e)}")
         except Exception as e:
             raise ImageLoadingError(f"An unexpected error occurred while loading image: {str(e)}")
-        
 
-    
-    def get_image_info(self, file_path: str, image_object: openslide.OpenSlide) -> ImageInfo:
-        width_l0, height_l0 = image_object.dimensions
 
-        level_count = image_object.level_count
-        level_dimensions= image_object.level_dimensions
 
-        mpp_x, mpp_y = self._get_mpp_from_openslide_properties(image_object.properties)
-        
+    def get_image_info(self, file_path: str, image_object: OpenSlideSlide) -> ImageInfo:
+        slide = image_object.openslide
+        width_l0, height_l0 = slide.dimensions
+
+        level_count = slide.level_count
+        level_dimensions= list(slide.level_dimensions)
+        level_downsamples = list(slide.level_downsamples)
+
+        mpp_x, mpp_y = self._get_mpp_from_openslide_properties(slide.properties)
 
-        metadata = dict(image_object.properties)
+
+        metadata = dict(slide.properties)
 
         return ImageInfo(
             file_path=file_path,
@@ -41,9 +108,10 @@ class OpenSlideLoader(IFileLoader):
             level_dimensions=level_dimensions,
             mpp_x=mpp_x,
             mpp_y=mpp_y,
-            metadata=metadata
+            metadata=metadata,
+            level_downsamples=level_downsamples
         )
-    
+
     def _get_mpp_from_openslide_properties(self, properties: Dict[str, str]) -> Tuple[Optional[float], Optional[float]]:
         mpp_x, mpp_y = None, None
         if openslide.PROPERTY_NAME_MPP_X in properties:
@@ -51,15 +119,15 @@ class OpenSlideLoader(IFileLoader):
         if openslide.PROPERTY_NAME_MPP_Y in properties:
             mpp_y = float(properties[openslide.PROPERTY_NAME_MPP_Y])
         return mpp_x, mpp_y
-    
+
     def get_dimensions(self, image_object: Any) -> Tuple[int, int]:
-        if isinstance(image_object, openslide.OpenSlide):
-            return image_object.dimensions
+        if isinstance(image_object, OpenSlideSlide):
+            return image_object.openslide.dimensions
         else:
-            raise TypeError("Expected an OpenSlide object to get dimensions.")
+            raise TypeError("Expected an OpenSlideSlide object to get dimensions.")
 
     def get_thumbnail(self, image_object: Any, max_width: int) -> pyvips.Image:
-        
+
         width_l0, height_l0 = self.get_dimensions(image_object)
         if width_l0 <= max_width:
             size = (width_l0, height_l0)
@@ -67,14 +135,13 @@ class OpenSlideLoader(IFileLoader):
             scale = max_width / width_l0
             size = (max_width, int(height_l0 * scale))
 
-        thumbnail = image_object.get_thumbnail(size)
-        # Convert OpenSlide thumbnail (PIL Image) to pyvips.Image
-        thumbnail_np = np.array(thumbnail)
-        thumbnail_vips = pyvips.Image.new_from_array(thumbnail_np)
+        # OpenSlide reads the best level for `size`; its RGB pixels are wrapped without a NumPy copy
+        thumbnail = image_object.openslide.get_thumbnail(size).convert("RGB")
+        thumbnail_vips = pyvips.Image.new_from_memory(thumbnail.tobytes(), thumbnail.width, thumbnail.height, 3, "uchar")
         return thumbnail_vips
-    
+
     def close_image(self, image_object: Any):
         if image_object:
             image_object.close()
 
-            
\ No newline at end of file
+
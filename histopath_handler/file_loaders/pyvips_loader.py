@@ -1,46 +1,258 @@
-import math
-import pyvips
-import os 
+from __future__ import annotations
+import os
+import logging
+import threading
 from typing import Any, Tuple, Dict, List, Optional
 
-from histopath_handler._core.interfaces import IFileLoader
+from histopath_handler._core.interfaces import IFileLoader, ISlideHandle
 from histopath_handler._core.models import ImageInfo
-from histopath_handler._core.exceptions import ImageLoadingError
+from histopath_handler._core.exceptions import ImageLoadingError, InvalidRegionError
 from histopath_handler._core.constants import METADATA_PROPERTY_MPP_X, METADATA_PROPERTY_MPP_Y
-from histopath_handler._core.utils import calculate_scaled_dimensions
-from histopath_handler._core.utils import get_file_extension
-from .openslide_loader import OpenSlideLoader
+from histopath_handler._core.vips_runtime import get_vips_load_options
+from histopath_handler._core.utils import get_file_extension, LazyModule
+
+pyvips = LazyModule("pyvips")
+
+logger = logging.getLogger(__name__)
+
+# Two pages belong to the same pyramid if their x/y downsamples agree within this ratio
+LEVEL_ASPECT_TOLERANCE = 0.02
+
+# Slide properties openslideload copies onto the image, under OpenSlide's own names
+OPENSLIDE_PROPERTY_MPP_X = "openslide.mpp-x"
+OPENSLIDE_PROPERTY_MPP_Y = "openslide.mpp-y"
+# Comma-separated names of a slide's associated images, and the one that shows the whole slide
+OPENSLIDE_ASSOCIATED_IMAGES = "slide-associated-images"
+OPENSLIDE_ASSOCIATED_THUMBNAIL = "thumbnail"
+
+
+class VipsSlide(ISlideHandle):
+    """
+    Slide handle backed by pyvips. Every stored pyramid level is opened on first
+    use with the matching `level`/`page`/`subifd` load option and kept for reuse.
+    `thumbnail_load_options` points at a stored overview of the whole slide (an SVS
+    thumbnail page, OpenSlide's associated thumbnail) that is not part of the pyramid.
+    """
+
+    def __init__(self,
+                 file_path: str,
+                 base_image: pyvips.Image,
+                 level_dimensions: List[Tuple[int, int]],
+                 level_downsamples: List[float],
+                 level_load_options: List[Dict[str, Any]],
+                 level_images: Optional[Dict[int, pyvips.Image]] = None,
+                 thumbnail_load_options: Optional[Dict[str, Any]] = None):
+        self.file_path = file_path
+        self._level_dimensions = level_dimensions
+        self._level_downsamples = level_downsamples
+        self._level_load_options = level_load_options
+        self._level_images: Dict[int, pyvips.Image] = dict(level_images or {})
+        self._level_images[0] = base_image
+        self.thumbnail_load_options = thumbnail_load_options
+        self._thumbnail_image: Optional[pyvips.Image] = None
+        # Handles may be shared between request threads (see SlidePool)
+        self._level_lock = threading.Lock()
+
+    @property
+    def level_count(self) -> int:
+        return len(self._level_dimensions)
+
+    @property
+    def level_dimensions(self) -> List[Tuple[int, int]]:
+        return self._level_dimensions
+
+    @property
+    def level_downsamples(self) -> List[float]:
+        return self._level_downsamples
+
+    @property
+    def base_image(self) -> pyvips.Image:
+        return self._level_images[0]
+
+    def get_level_image(self, level: int) -> pyvips.Image:
+        if not (0 <= level < self.level_count):
+            raise InvalidRegionError(
+                f"Level {level} is out of bounds; the slide stores {self.level_count} level(s)."
+            )
+
+        level_image = self._level_images.get(level)
+        if level_image is None:
+            with self._level_lock:
+                level_image = self._level_images.get(level)
+                if level_image is None:
+                    try:
+                        level_image = PyVipsLoader.open_level(self.file_path, self._level_load_options[level])
+                    except pyvips.Error as e:
+                        raise ImageLoadingError(f"Failed to load level {level} from {self.file_path}: {str(e)}")
+                    self._level_images[level] = level_image
+        return level_image
+
+    def get_thumbnail_image(self) -> Optional[pyvips.Image]:
+        """The stored overview image, or None when the slide has none or it cannot be read."""
+        if self.thumbnail_load_options is None:
+            return None
+        if self._thumbnail_image is None:
+            with self._level_lock:
+                if self._thumbnail_image is None:
+                    try:
+                        self._thumbnail_image = PyVipsLoader.open_level(self.file_path, self.thumbnail_load_options)
+                    except pyvips.Error:
+                        # Optional; thumbnails then come from the pyramid
+                        self.thumbnail_load_options = None
+                        return None
+        return self._thumbnail_image
+
+    def close(self):
+        self._level_images.clear()
+        self._thumbnail_image = None
+
 
 class PyVipsLoader(IFileLoader):
-    def load_image(self, file_path: str) -> pyvips.Image:
+    def load_image(self, file_path: str) -> VipsSlide:
         try:
-            return pyvips.Image.new_from_file(file_path)
+            base_image = pyvips.Image.new_from_file(file_path, **get_vips_load_options())
+            return self._build_slide(file_path, self._prepare_level(base_image))
         except pyvips.Error as e:
             raise ImageLoadingError(f"Failed to load image from {file_path}: {str(e)}")
-        
-    
-    def get_image_info(self, file_path: str, image_object: pyvips.Image) -> ImageInfo:
-        
-        width_l0, height_l0 = image_object.width, image_object.height
 
+    @staticmethod
+    def open_level(file_path: str, load_options: Dict[str, Any]) -> pyvips.Image:
+        return PyVipsLoader._prepare_level(
+            pyvips.Image.new_from_file(file_path, **get_vips_load_options(), **load_options)
+        )
+
+    @staticmethod
+    def _prepare_level(level_image: pyvips.Image) -> pyvips.Image:
+        # openslideload returns premultiplied RGBA; slides have no meaningful alpha
+        if PyVipsLoader._get_loader_name(level_image).startswith("openslideload") and level_image.hasalpha():
+            return level_image.flatten(background=[255, 255, 255])
+        return level_image
+
+    @staticmethod
+    def _get_loader_name(image_object: pyvips.Image) -> str:
+        if image_object.get_typeof("vips-loader") != 0:
+            return image_object.get("vips-loader")
+        return ""
+
+    def _build_slide(self, file_path: str, base_image: pyvips.Image) -> VipsSlide:
+        loader_name = self._get_loader_name(base_image)
+
+        if loader_name.startswith("openslideload"):
+            return self._build_openslide_slide(file_path, base_image)
+
+        if loader_name.startswith("tiffload"):
+            if base_image.get_typeof("n-subifds") != 0 and base_image.get("n-subifds") > 0:
+                candidates = [({"subifd": -1}, base_image)]
+                for subifd in range(base_image.get("n-subifds")):
+                    candidates.append(self._open_candidate(file_path, {"subifd": subifd}))
+                return self._build_slide_from_candidates(file_path, base_image, candidates)
+
+            if base_image.get_typeof("n-pages") != 0 and base_image.get("n-pages") > 1:
+                candidates = [({"page": 0}, base_image)]
+                for page in range(1, base_image.get("n-pages")):
+                    candidates.append(self._open_candidate(file_path, {"page": page}))
+                return self._build_slide_from_candidates(file_path, base_image, candidates)
+
+        # Flat images (PNG, JPEG, single-page TIFF) store only level 0
+        return VipsSlide(file_path, base_image, [(base_image.width, base_image.height)], [1.0], [{}])
+
+    def _open_candidate(self,
+                        file_path: str,
+                        load_options: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[pyvips.Image]]:
+        # Only the page header is read here; pixels are decoded when a region is requested
+        try:
+            return load_options, pyvips.Image.new_from_file(file_path, **get_vips_load_options(), **load_options)
+        except pyvips.Error:
+            return load_options, None
+
+    def _build_openslide_slide(self, file_path: str, base_image: pyvips.Image) -> VipsSlide:
+        level_count = int(base_image.get("openslide.level-count"))
 
-        level_count = int(math.ceil(math.log2(max(width_l0, height_l0)))) + 1
         level_dimensions: List[Tuple[int, int]] = []
-        
+        level_downsamples: List[float] = []
         for level in range(level_count):
-            lvl_width, lvl_height = calculate_scaled_dimensions(width_l0, height_l0, level)
-            level_dimensions.append((lvl_width, lvl_height))
+            level_dimensions.append((int(base_image.get(f"openslide.level[{level}].width")),
+                                     int(base_image.get(f"openslide.level[{level}].height"))))
+            level_downsamples.append(float(base_image.get(f"openslide.level[{level}].downsample")))
+
+        load_options = [{"level": level} for level in range(level_count)]
+
+        thumbnail_load_options = None
+        if base_image.get_typeof(OPENSLIDE_ASSOCIATED_IMAGES) != 0:
+            if OPENSLIDE_ASSOCIATED_THUMBNAIL in base_image.get(OPENSLIDE_ASSOCIATED_IMAGES).split(","):
+                thumbnail_load_options = {"associated": OPENSLIDE_ASSOCIATED_THUMBNAIL}
+
+        return VipsSlide(file_path, base_image, level_dimensions, level_downsamples, load_options,
+                         thumbnail_load_options=thumbnail_load_options)
+
+    def _build_slide_from_candidates(self,
+                                     file_path: str,
+                                     base_image: pyvips.Image,
+                                     candidates: List[Tuple[Dict[str, Any], Optional[pyvips.Image]]]) -> VipsSlide:
+        """
+        Keep the pages/subifds that form a reduced-resolution pyramid of `base_image`.
+        Label and macro images fail the aspect check; an SVS thumbnail stored ahead of
+        larger levels is left out of the pyramid, because it must shrink in file order,
+        and kept as the slide's thumbnail image instead.
+        """
+        width_l0, height_l0 = base_image.width, base_image.height
+
+        pyramid = []
+        for load_options, image in candidates:
+            if image is None or not self._has_aspect(image, width_l0, height_l0):
+                continue
+            downsample = (width_l0 / image.width + height_l0 / image.height) / 2
+            pyramid.append((load_options, image, downsample))
+
+        kept = [
+            all(level[1].width > later[1].width for later in pyramid[index + 1:])
+            for index, level in enumerate(pyramid)
+        ]
+        levels = [level for level, is_level in zip(pyramid, kept) if is_level]
+        overviews = [level for level, is_level in zip(pyramid, kept) if not is_level]
+        thumbnail_load_options = min(overviews, key=lambda level: level[1].width)[0] if overviews else None
+
+        level_images = {level: image for level, (_, image, _) in enumerate(levels)}
+        return VipsSlide(
+            file_path,
+            base_image,
+            [(image.width, image.height) for _, image, _ in levels],
+            [downsample for _, _, downsample in levels],
+            [load_options for load_options, _, _ in levels],
+            level_images,
+            thumbnail_load_options,
+        )
 
-        mpp_x, mpp_y = self._get_mpp_from_vips_metadata(image_object)
+    @staticmethod
+    def _has_aspect(image: pyvips.Image, width_l0: int, height_l0: int) -> bool:
+        """Whether `image` shows the whole level-0 area, i.e. its x/y downsamples agree."""
+        downsample_x = width_l0 / image.width
+        downsample_y = height_l0 / image.height
+        return abs(downsample_x - downsample_y) / downsample_x <= LEVEL_ASPECT_TOLERANCE
+
+    def get_image_info(self, file_path: str, image_object: VipsSlide) -> ImageInfo:
+
+        base_image = image_object.base_image
+        width_l0, height_l0 = base_image.width, base_image.height
+
+        mpp_x, mpp_y = self._get_mpp_from_openslide_properties(base_image)
+        if mpp_x is None or mpp_y is None:
+            mpp_x, mpp_y = self._get_mpp_from_vips_metadata(base_image)
 
         # Attempt to gather other relevant metadata directly from pyvips
         metadata = {}
         try:
-            for key in ["bands", "format", "xres", "yres", "resolution-unit", "vips-loader"]:
+            keys = ["bands", "format", "xres", "yres", "resolution-unit", "vips-loader"]
+            if self._get_loader_name(base_image).startswith("openslideload"):
+                # Same property dict OpenSlide would give, read from the already open handle
+                keys += [key for key in base_image.get_fields() if "." in key]
+            for key in keys:
                 # Check if property exists before trying to get it
-                if image_object.get_typeof(key) != 0:
-                    metadata[key] = image_object.get(key)
-        
+                if base_image.get_typeof(key) != 0:
+                    value = base_image.get(key)
+                    if not isinstance(value, (bytes, pyvips.Image)):
+                        metadata[key] = value
+
         except pyvips.Error:
             pass # Ignore if metadata key not found
 
@@ -48,13 +260,25 @@ class PyVipsLoader(IFileLoader):
             file_path=file_path,
             width_l0=width_l0,
             height_l0=height_l0,
-            level_count=level_count,
-            level_dimensions=level_dimensions,
+            level_count=image_object.level_count,
+            level_dimensions=list(image_object.level_dimensions),
             mpp_x=mpp_x,
             mpp_y=mpp_y,
-            metadata=metadata
+            metadata=metadata,
+            level_downsamples=list(image_object.level_downsamples)
         )
-    
+
+    def _get_mpp_from_openslide_properties(self, image_object: pyvips.Image) -> Tuple[Optional[float], Optional[float]]:
+        mpp_x, mpp_y = None, None
+        try:
+            if image_object.get_typeof(OPENSLIDE_PROPERTY_MPP_X) != 0:
+                mpp_x = float(image_object.get(OPENSLIDE_PROPERTY_MPP_X))
+            if image_object.get_typeof(OPENSLIDE_PROPERTY_MPP_Y) != 0:
+                mpp_y = float(image_object.get(OPENSLIDE_PROPERTY_MPP_Y))
+        except (pyvips.Error, ValueError):
+            return None, None
+        return mpp_x, mpp_y
+
     def _get_mpp_from_vips_metadata(self, image_object: pyvips.Image) -> Tuple[Optional[float],Optional[float]]:
 
         mpp_x, mpp_y = None, None
@@ -64,30 +288,49 @@ class PyVipsLoader(IFileLoader):
             res_unit = image_object.get("resolution-unit") # e.g., "cm", "inch"
 
             if xres and yres and res_unit:
-                # Convert pixels per unit to microns per pixel
-                if res_unit == "cm":
-                    mpp_x = (1 / xres) * 10000 # 1 cm = 10000 microns
-                    mpp_y = (1 / yres) * 10000
-                elif res_unit == "inch":
-                    mpp_x = (1 / xres) * 25400 # 1 inch = 25400 microns
-                    mpp_y = (1 / yres) * 25400
+                # libvips converts xres/yres to pixels per millimetre whatever the file's
+                # unit; resolution-unit only records that unit for saving
+                mpp_x = 1000 / xres # 1 mm = 1000 microns
+                mpp_y = 1000 / yres
         except pyvips.Error:
-            print("Warning: Failed to retrieve MPP from image metadata. Using default values.")
-            ## print metadata keys
+            logger.warning("Failed to retrieve MPP from image metadata. Using default values.")
             try:
-                print("Available metadata keys:", image_object.get_fields())
+                logger.debug("Available metadata keys: %s", image_object.get_fields())
             except pyvips.Error:
                 pass
             pass # Metadata might not exist or be in an unexpected format
         return mpp_x, mpp_y
 
-    def get_thumbnail(self, image_object: pyvips.Image, max_width: int) -> pyvips.Image:
+    def get_thumbnail(self, image_object: VipsSlide, max_width: int) -> pyvips.Image:
+        """
+        Fit the slide into a `max_width` square, shrinking the smallest stored image that
+        is still wide enough: a pyramid level or the slide's own thumbnail, so level 0 of
+        a pyramid is never decoded. Flat files go through `pyvips.Image.thumbnail`, which
+        shrinks while decoding (JPEG, WebP) instead of after.
+        """
+        base_image = image_object.base_image
+        if (image_object.level_count == 1 and image_object.thumbnail_load_options is None
+                and not self._get_loader_name(base_image).startswith("openslideload")):
+            try:
+                return pyvips.Image.thumbnail(image_object.file_path, max_width)
+            except pyvips.Error as e:
+                raise ImageLoadingError(f"Failed to create a thumbnail of {image_object.file_path}: {str(e)}")
+
+        level = image_object.level_count - 1
+        while level > 0 and image_object.level_dimensions[level][0] < max_width:
+            level -= 1
+        source = image_object.get_level_image(level)
+
+        stored_thumbnail = image_object.get_thumbnail_image()
+        if (stored_thumbnail is not None and max_width <= stored_thumbnail.width < source.width
+                and self._has_aspect(stored_thumbnail, base_image.width, base_image.height)):
+            source = stored_thumbnail
+        return source.thumbnail_image(max_width)
 
-        return image_object.thumbnail_image(max_width)
-    
-    def get_dimensions(self, image_object: pyvips.Image) -> Tuple[int, int]:
+    def get_dimensions(self, image_object: VipsSlide) -> Tuple[int, int]:
         return image_object.width, image_object.height
 
-    def close_image(self, image_object: pyvips.Image):
+    def close_image(self, image_object: VipsSlide):
 
-        pass
\ No newline at end of file
+        if image_object:
+            image_object.close()
@@ -0,0 +1,85 @@
+from __future__ import annotations
+import os
+import hashlib
+import threading
+from typing import Optional
+
+from histopath_handler._core.exceptions import ImageLoadingError
+from histopath_handler._core.constants import THUMBNAIL_CACHE_FILE_SUFFIX
+from histopath_handler._core.utils import LazyModule
+
+pyvips = LazyModule("pyvips")
+
+
+class ThumbnailCache:
+    """
+    Thumbnails memoized on disk, one file per (slide, max_width) in libvips' native
+    format so a hit is a memory map rather than a decode. The file name hashes the
+    slide's absolute path, size and mtime, so a changed slide simply misses; `clear`
+    removes everything.
+
+    Files are written under a temporary name and renamed into place, so threads and
+    processes may share one directory.
+    """
+
+    def __init__(self, cache_dir: str):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _get_cache_path(self, file_path: str, max_width: int) -> Optional[str]:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        key = f"{os.path.abspath(file_path)}\0{stat.st_size}\0{stat.st_mtime_ns}\0{max_width}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}{THUMBNAIL_CACHE_FILE_SUFFIX}")
+
+    def get(self, file_path: str, max_width: int) -> Optional[pyvips.Image]:
+        """The cached thumbnail of `file_path`, or None if there is none for its current version."""
+        cache_path = self._get_cache_path(file_path, max_width)
+        thumbnail = None
+        if cache_path is not None and os.path.exists(cache_path):
+            try:
+                thumbnail = pyvips.Image.vipsload(cache_path)
+            except pyvips.Error:
+                # A damaged entry is re-rendered and replaced by the next put
+                thumbnail = None
+
+        with self._lock:
+            if thumbnail is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return thumbnail
+
+    def put(self, file_path: str, max_width: int, thumbnail: pyvips.Image) -> pyvips.Image:
+        """Render `thumbnail` into the cache and return the stored copy."""
+        cache_path = self._get_cache_path(file_path, max_width)
+        if cache_path is None:
+            return thumbnail
+
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            thumbnail.vipssave(temp_path)
+            os.replace(temp_path, cache_path)
+            return pyvips.Image.vipsload(cache_path)
+        except (pyvips.Error, OSError) as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise ImageLoadingError(f"Failed to cache the thumbnail of '{file_path}': {e}")
+
+    def clear(self) -> int:
+        """Delete every cached thumbnail; returns how many files were removed."""
+        removed = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(THUMBNAIL_CACHE_FILE_SUFFIX):
+                    os.remove(os.path.join(root, name))
+                    removed += 1
+        return removed
@@ -1,24 +1,48 @@
+from __future__ import annotations
 import os
-from typing import Any, Dict, Optional, Tuple
-import shutil
-import zipfile
+import logging
+import hashlib
+import threading
+from dataclasses import replace
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 # _core
-from histopath_handler._core.models import ImageInfo, Region, Patch
-from histopath_handler._core.exceptions import ImageLoadingError, InvalidRegionError, ExtractionError
+from histopath_handler._core.models import ImageInfo, Region, Patch, TissueMask, VipsRuntimeConfig
+from histopath_handler._core.exceptions import (
+    ImageLoadingError, InvalidRegionError, ExtractionError, UnsupportedOperationError
+)
 from histopath_handler._core.constants import (
     DEFAULT_TILE_SIZE, DEFAULT_TILE_OVERLAP, DEFAULT_JPEG_QUALITY,
     DEFAULT_VIPS_COMPRESSION_METHOD, DEFAULT_DEEPZOOM_TILE_SUFFIX,
     DEFAULT_PATCH_OUTPUT_FORMAT, ROTATION_ANGLES, HPZ_FILE_EXTENSION,
-
+    DEFAULT_TISSUE_MASK_WIDTH, DEFAULT_MIN_TISSUE_FRACTION, CHECKPOINT_DIR_SUFFIX,
+    HPZ_ZIP_STORED, METRIC_STAGE_OPEN, METRIC_STAGE_METADATA,
+    DEFAULT_TILE_BUDGET_SAMPLES, DEFAULT_TIFF_TILE_SIZE, DEFAULT_TIFF_COMPRESSION,
+    TIFF_PYRAMID_FILE_EXTENSION, OME_TIFF_FILE_EXTENSION, LEVEL_DOWNSAMPLE_TOLERANCE,
 )
-
-from histopath_handler.file_loaders.loader_factory import FileLoaderFactory, OpenSlideLoader
-from histopath_handler._core.interfaces import IFileLoader, IPyramidBuilder, IImageExtractor # Arayüzler
+from histopath_handler._core.metrics import measure_stage
+from histopath_handler._core.codecs import apply_suffix_effort, choose_quality_for_budget, remove_suffix_option
+from histopath_handler._core.vips_runtime import apply_vips_runtime_config
+
+from histopath_handler.file_loaders.loader_factory import FileLoaderFactory
+from histopath_handler.file_loaders.openslide_loader import OpenSlideLoader, OpenSlideSlide
+from histopath_handler.file_loaders.metadata_cache import MetadataCache
+from histopath_handler.file_loaders.thumbnail_cache import ThumbnailCache
+from histopath_handler._core.interfaces import IFileLoader, IPyramidBuilder, IImageExtractor, ITissueDetector, ISlideHandle # Arayüzler
 from histopath_handler.pyramid_builders.deepzoom_builder import DeepZoomBuilder
+from histopath_handler.pyramid_builders.hpz_builder import HpzBuilder
+from histopath_handler.pyramid_builders.resumable_deepzoom_builder import ResumableDeepZoomBuilder
+from histopath_handler.pyramid_builders.tiled_tiff_builder import TiledTiffPyramidBuilder
+from histopath_handler.pyramid_builders.deepzoom_tile_source import DeepZoomTileSource
 from histopath_handler.image_extractors.patch_extractor import PatchExtractor
 from histopath_handler.image_extractors.region_extractor import RegionExtractor
-from histopath_handler._core.utils import get_file_extension, get_basename_without_extension, write_json_file, zip_directory
+from histopath_handler.image_extractors.tile_cache import TileCache
+from histopath_handler.tissue_detectors.otsu_tissue_detector import OtsuTissueDetector, apply_tissue_mask
+from histopath_handler._core.utils import get_basename_without_extension, LazyModule
+
+np = LazyModule("numpy")
+
+logger = logging.getLogger(__name__)
 
 
 class HistopathHandler:
@@ -32,53 +56,109 @@ class HistopathHandler:
                  loader: Optional[IFileLoader] = None,
                  deepzoom_builder: Optional[IPyramidBuilder] = None,
                  patch_extractor: Optional[IImageExtractor] = None,
-                 region_extractor: Optional[IImageExtractor] = None):
+                 region_extractor: Optional[IImageExtractor] = None,
+                 tissue_detector: Optional[ITissueDetector] = None,
+                 tile_cache: Optional[TileCache] = None,
+                 hpz_builder: Optional[HpzBuilder] = None,
+                 metadata_cache: Optional[MetadataCache] = None,
+                 thumbnail_cache: Optional[ThumbnailCache] = None,
+                 tiff_builder: Optional[TiledTiffPyramidBuilder] = None,
+                 vips_config: Optional[VipsRuntimeConfig] = None):
 
 
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Image file not found at: {file_path}")
 
+        # libvips settings are process-wide; apply them before anything is opened
+        if vips_config is not None:
+            apply_vips_runtime_config(vips_config)
+
         self._file_path = file_path
         self._loaded_image_object = None # The underlying pyvips.Image or openslide.OpenSlide object
         self._image_info: Optional[ImageInfo] = None # Cached image information
 
         # Dependency Injection: Use provided implementations or default ones
         self._loader = loader if loader else FileLoaderFactory.get_loader(file_path)
-        ext = get_file_extension(file_path)
-
-        if ext in [".svs"]:
-            self._info_loader = OpenSlideLoader()
-        else:
-            self._info_loader = self._loader
-
-
+        # A second backend is only opened on demand, see `openslide_object`
+        self._openslide_loader: Optional[OpenSlideLoader] = None
+        self._openslide_object = None
 
         self._deepzoom_builder = deepzoom_builder if deepzoom_builder else DeepZoomBuilder()
-        self._patch_extractor = patch_extractor if patch_extractor else PatchExtractor()
-        self._region_extractor = region_extractor if region_extractor else RegionExtractor()
+        self._hpz_builder = hpz_builder if hpz_builder else HpzBuilder()
+        self._resumable_deepzoom_builder = ResumableDeepZoomBuilder()
+        self._tiff_builder = tiff_builder if tiff_builder else TiledTiffPyramidBuilder()
+        # A tile cache is handed to the default extractors; pass one TileCache to several
+        # handlers to share its budget across slides
+        self._patch_extractor = patch_extractor if patch_extractor else PatchExtractor(tile_cache=tile_cache)
+        self._region_extractor = region_extractor if region_extractor else RegionExtractor(tile_cache=tile_cache)
+        self._tissue_detector = tissue_detector if tissue_detector else OtsuTissueDetector()
+        self._thumbnail_cache = thumbnail_cache
 
         # Load the image upon initialization
         try:
-            self._loaded_image_object = self._loader.load_image(file_path)
-            self._info_loaded_image_object = self._info_loader.load_image(file_path)
-            # Cache image info after successful load
-            self._image_info = self._info_loader.get_image_info(file_path, self._info_loaded_image_object)
-            print(f"[{self._file_path}] Image loaded and info retrieved.")
+            with measure_stage(METRIC_STAGE_OPEN, file_path):
+                self._loaded_image_object = self._loader.load_image(file_path)
+            # Cache image info after successful load; metadata comes from the same handle
+            with measure_stage(METRIC_STAGE_METADATA, file_path):
+                if metadata_cache is not None:
+                    # A hit is checked against the file's size and mtime, so it matches this handle
+                    self._image_info = metadata_cache.get(file_path)
+                if self._image_info is None:
+                    self._image_info = self._loader.get_image_info(file_path, self._loaded_image_object)
+                    if metadata_cache is not None:
+                        metadata_cache.put(self._image_info)
+            logger.debug("[%s] Image loaded and info retrieved.", self._file_path)
         except Exception as e:
             raise ImageLoadingError(f"Failed to load image '{file_path}': {e}")
            
 
+    @property
+    def image_object(self) -> Any:
+        """The loader's open handle (an ISlideHandle for the bundled loaders)."""
+        return self._loaded_image_object
+
+    @property
+    def openslide_object(self) -> Any:
+        """
+        An `openslide.OpenSlide` for the same file, for OpenSlide-only features. It is
+        opened on first access, not with the handler, and closed by `close`. With the
+        OpenSlide backend it is the handle the handler already reads from.
+        """
+        if not self._loaded_image_object:
+            raise ImageLoadingError("No image is currently loaded.")
+        if isinstance(self._loaded_image_object, OpenSlideSlide):
+            return self._loaded_image_object.openslide
+        if self._openslide_object is None:
+            self._openslide_loader = OpenSlideLoader()
+            self._openslide_object = self._openslide_loader.load_image(self._file_path)
+        return self._openslide_object.openslide
+
     def get_image_info(self) -> ImageInfo:
         if not self._image_info:
             # Should ideally be set during init, but as a safeguard
-            self._image_info = self._info_loader.get_image_info(self._file_path, self._info_loaded_image_object)
+            self._image_info = self._loader.get_image_info(self._file_path, self._loaded_image_object)
         return self._image_info
     
 
     def get_thumbnail(self, max_width: int = 500) -> Any:
         if not self._loaded_image_object:
             raise ImageLoadingError("No image is currently loaded.")
-        return self._info_loader.get_thumbnail(self._info_loaded_image_object, max_width)
+        if self._thumbnail_cache is None:
+            return self._loader.get_thumbnail(self._loaded_image_object, max_width)
+
+        thumbnail = self._thumbnail_cache.get(self._file_path, max_width)
+        if thumbnail is None:
+            thumbnail = self._thumbnail_cache.put(
+                self._file_path, max_width, self._loader.get_thumbnail(self._loaded_image_object, max_width)
+            )
+        return thumbnail
+
+
+    def get_tissue_mask(self, max_width: int = DEFAULT_TISSUE_MASK_WIDTH) -> TissueMask:
+        """Detect tissue on a thumbnail; the mask maps onto every level via level_dimensions."""
+        thumbnail = self.get_thumbnail(max_width=max_width)
+        image_info = self.get_image_info()
+        return self._tissue_detector.detect_tissue(thumbnail, image_info.width_l0, image_info.height_l0)
 
 
     def create_region(self,
@@ -91,6 +171,11 @@ class HistopathHandler:
         if not self._image_info:
             raise RuntimeError("Image information not available.")
 
+        if not (0 <= level < self._image_info.level_count):
+            raise InvalidRegionError(
+                f"Requested level {level} is out of bounds; the image has {self._image_info.level_count} level(s)."
+            )
+
         # Basic validation: ensure region is within L0 bounds
         if (left < 0 or top < 0 or
             left + width > self._image_info.width_l0 or
@@ -107,7 +192,8 @@ class HistopathHandler:
                       output_path: str,
                       output_format: str = DEFAULT_PATCH_OUTPUT_FORMAT,
                       quality: int = DEFAULT_JPEG_QUALITY,
-                      rotate: int = 0
+                      rotate: int = 0,
+                      effort: Optional[int] = None
                       ) -> Patch:
         if not self._loaded_image_object:
             raise ImageLoadingError("No image is currently loaded for extraction.")
@@ -120,15 +206,169 @@ class HistopathHandler:
             output_path,
             output_format,
             quality,
-            rotate
+            rotate,
+            effort
         )
     
+    def extract_patches(self,
+                        regions: Sequence[Region],
+                        level: Optional[int] = None,
+                        rotate: int = 0,
+                        stack: bool = True,
+                        workers: int = 1
+                        ) -> Union[np.ndarray, List[np.ndarray]]:
+        """
+        Extract patches into memory for training pipelines. Nothing is encoded or written
+        to disk; see `PatchExtractor.extract_patches` for the return layout.
+        `level`, when given, overrides the level stored on each region.
+        With `workers > 1` the regions are sharded over a process pool in which every worker
+        opens the slide once; use `ParallelPatchExtractor` directly to keep the pool alive
+        across calls or to get per-region errors instead of an exception.
+        """
+        if not self._loaded_image_object:
+            raise ImageLoadingError("No image is currently loaded for extraction.")
+
+        if level is not None:
+            regions = [replace(region, level=level) for region in regions]
+
+        if workers > 1:
+            return self._extract_patches_parallel(regions, rotate, stack, workers)
+
+        return self._patch_extractor.extract_patches(
+            self._loaded_image_object,
+            regions,
+            rotate=rotate,
+            stack=stack
+        )
+
+    def extract_at_mpp(self,
+                       center_or_bbox: Union[Tuple[float, float], Tuple[float, float, float, float]],
+                       target_mpp: float,
+                       size_px: Optional[Union[int, Tuple[int, int]]] = None,
+                       rotate: int = 0,
+                       slide_mpp: Optional[float] = None
+                       ) -> np.ndarray:
+        """
+        Pixels at `target_mpp` µm/px as an (H, W, C) uint8 array, whatever the scanner's
+        native resolution. `center_or_bbox` is either a level-0 centre (x, y), giving a
+        `size_px` patch around it, or a level-0 box (left, top, width, height), resampled
+        to `size_px` or, without it, to the box's own size at `target_mpp`.
+
+        Pixels are read from the smallest stored level that is at least as fine as the
+        target and resampled once, so a 0.5 µm/px patch on a 0.25 µm/px scan decodes the
+        2x level, not level 0. Parts outside the slide are white. `slide_mpp` replaces
+        the level-0 MPP from the metadata, e.g. for images that do not record one.
+        """
+        if not self._loaded_image_object:
+            raise ImageLoadingError("No image is currently loaded for extraction.")
+        if target_mpp <= 0:
+            raise ValueError("target_mpp must be positive.")
+
+        mpp_x = slide_mpp or self._image_info.mpp_x
+        mpp_y = slide_mpp or self._image_info.mpp_y or mpp_x
+        if not mpp_x:
+            raise UnsupportedOperationError(
+                f"'{self._file_path}' has no MPP metadata; pass slide_mpp to extract at a physical resolution."
+            )
+
+        # Level-0 pixels per output pixel
+        scale_x, scale_y = target_mpp / mpp_x, target_mpp / mpp_y
+        if isinstance(size_px, int):
+            size_px = (size_px, size_px)
+
+        if len(center_or_bbox) == 2:
+            if size_px is None:
+                raise ValueError("size_px is required when extracting around a centre point.")
+            width_l0, height_l0 = size_px[0] * scale_x, size_px[1] * scale_y
+            left, top = center_or_bbox[0] - width_l0 / 2, center_or_bbox[1] - height_l0 / 2
+        elif len(center_or_bbox) == 4:
+            left, top, width_l0, height_l0 = center_or_bbox
+            if width_l0 <= 0 or height_l0 <= 0:
+                raise InvalidRegionError(f"Bounding box {tuple(center_or_bbox)} must have a positive size.")
+            if size_px is None:
+                size_px = (max(1, int(round(width_l0 / scale_x))), max(1, int(round(height_l0 / scale_y))))
+        else:
+            raise ValueError("center_or_bbox must be (x, y) or (left, top, width, height) in level-0 pixels.")
+
+        level = self._image_info.get_best_level_for_downsample(min(scale_x, scale_y), LEVEL_DOWNSAMPLE_TOLERANCE)
+        region = Region(
+            int(round(left)),
+            int(round(top)),
+            max(1, int(round(width_l0))),
+            max(1, int(round(height_l0))),
+            level
+        )
+        logger.debug("Extracting %s at %.3f µm/px (%dx%d) from level %d", region, target_mpp, size_px[0], size_px[1], level)
+        return self._patch_extractor.extract_region_resampled(
+            self._loaded_image_object,
+            region,
+            size_px[0],
+            size_px[1],
+            rotate=rotate
+        )
+
+    def _extract_patches_parallel(self,
+                                  regions: Sequence[Region],
+                                  rotate: int,
+                                  stack: bool,
+                                  workers: int) -> Union[np.ndarray, List[np.ndarray]]:
+        # Imported here: multiprocessing is only worth loading when a pool is used
+        from histopath_handler.image_extractors.parallel_patch_extractor import ParallelPatchExtractor
+        with ParallelPatchExtractor(self._file_path, workers=workers) as extractor:
+            results = extractor.extract_patches(regions, rotate=rotate)
+
+        failed = [result for result in results if not result.ok]
+        if failed:
+            details = "; ".join(f"{result.region}: {result.error}" for result in failed[:5])
+            raise ExtractionError(f"Failed to extract {len(failed)} of {len(results)} patches: {details}")
+
+        patches = [result.data for result in results]
+        if not stack:
+            return patches
+        if not patches:
+            return np.empty((0, 0, 0, 0), dtype=np.uint8)
+
+        shapes = {patch.shape for patch in patches}
+        if len(shapes) > 1:
+            raise ExtractionError(
+                f"Patches have different shapes {sorted(shapes)}. Use stack=False for regions of different sizes."
+            )
+        return np.stack(patches)
+
+
+    def iter_patches(self,
+                     level: int,
+                     patch_size: Union[int, Tuple[int, int]],
+                     stride: Optional[Union[int, Tuple[int, int]]] = None,
+                     drop_partial: bool = True,
+                     tissue_mask: Optional[TissueMask] = None,
+                     min_tissue_fraction: float = DEFAULT_MIN_TISSUE_FRACTION
+                     ) -> Iterator[Tuple[Region, np.ndarray]]:
+        """
+        Yield (Region, ndarray) for every grid position of a stored level, decoding the
+        level strip by strip. Sizes are in level pixels; regions are in level-0 coordinates.
+        Pass `tissue_mask` (see `get_tissue_mask`) to skip background positions.
+        """
+        if not self._loaded_image_object:
+            raise ImageLoadingError("No image is currently loaded for extraction.")
+
+        return self._patch_extractor.iter_patches(
+            self._loaded_image_object,
+            level,
+            patch_size,
+            stride=stride,
+            drop_partial=drop_partial,
+            tissue_mask=tissue_mask,
+            min_tissue_fraction=min_tissue_fraction
+        )
+
     def extract_region(self,
                        region: Region,
                        output_path: str,
                        output_format: str = DEFAULT_PATCH_OUTPUT_FORMAT,
                        quality: int = DEFAULT_JPEG_QUALITY,
-                       rotate: int = 0
+                       rotate: int = 0,
+                       effort: Optional[int] = None
                        ) -> Patch:
         
         if not self._loaded_image_object:
@@ -140,7 +380,50 @@ class HistopathHandler:
             output_path,
             output_format,
             quality,
-            rotate
+            rotate,
+            effort
+        )
+    
+
+    def _get_pyramid_source(self, tissue_mask: Optional[TissueMask]) -> Any:
+        # Glass outside the mask is replaced lazily, so it is never decoded and encodes as flat tiles
+        if tissue_mask is None:
+            return self._loaded_image_object
+        return apply_tissue_mask(self._loaded_image_object, tissue_mask)
+
+
+    def _get_checkpoint_key(self, tissue_mask: Optional[TissueMask]) -> Dict[str, Any]:
+        # A checkpoint is only resumed against the same source file and tissue mask
+        stat = os.stat(self._file_path)
+        mask_digest = None
+        if tissue_mask is not None:
+            mask_digest = hashlib.sha1(np.ascontiguousarray(tissue_mask.mask).tobytes()).hexdigest()
+        return {
+            "source": os.path.abspath(self._file_path),
+            "source_size": stat.st_size,
+            "source_mtime_ns": stat.st_mtime_ns,
+            "tissue_mask": mask_digest
+        }
+
+
+    def extract_region_buffer(self,
+                              region: Region,
+                              output_format: str = DEFAULT_PATCH_OUTPUT_FORMAT,
+                              quality: int = DEFAULT_JPEG_QUALITY,
+                              rotate: int = 0,
+                              effort: Optional[int] = None
+                              ) -> bytes:
+        """Same as `extract_region`, but returns the encoded bytes instead of writing a file."""
+        if not self._loaded_image_object:
+            raise ImageLoadingError("No image is currently loaded for extraction.")
+
+        return self._region_extractor.extract_region_buffer(
+            self._loaded_image_object,
+            region,
+            output_format,
+            quality,
+            rotate,
+            effort
         )
     
 
@@ -154,12 +437,28 @@ class HistopathHandler:
                                container: str = 'fs', # 'fs' for filesystem, 'zip' for single zip file
                                compression_method: int = DEFAULT_VIPS_COMPRESSION_METHOD,
                                background: Optional[Tuple[float, ...]] = None,
-                               centre: bool = False
+                               centre: bool = False,
+                               tissue_mask: Optional[TissueMask] = None,
+                               checkpoint: bool = False,
+                               effort: Optional[int] = None,
+                               target_tile_bytes: Optional[int] = None,
+                               cancel_event: Optional[threading.Event] = None
                                ) -> str:
+        """
+        Build a DeepZoom pyramid under `output_dir/<name>/`. With `checkpoint=True` the
+        tiles are rendered row by row and progress is kept next to the output, so a rerun
+        after a crash only renders the missing rows ('fs' container only).
+        `effort` applies to WebP, AVIF and JPEG-XL tiles; with `target_tile_bytes` the
+        quality is chosen by `choose_tile_quality` instead of taken from `quality`.
+        Setting `cancel_event` from another thread stops the build with OperationCancelledError.
+        """
 
         if not self._loaded_image_object:
             raise ImageLoadingError("No image is currently loaded to build a DeepZoom pyramid.")
 
+        suffix = apply_suffix_effort(suffix, effort)
+        suffix, quality = self._apply_tile_budget(suffix, quality, target_tile_bytes, tile_size)
+
         filename = get_basename_without_extension(self._image_info.get_filename())
 
         output_dir = os.path.join(output_dir, filename)
@@ -169,8 +468,28 @@ class HistopathHandler:
             os.makedirs(output_dir, exist_ok=True)
 
         output_path = os.path.join(output_dir, filename)
+        if checkpoint:
+            # The renderer masks each level it resamples from, as the HPZ builder does, so
+            # reduced levels keep reading from the closest stored slide level
+            return self._resumable_deepzoom_builder.build_deepzoom_pyramid(
+                self._loaded_image_object,
+                output_path,
+                tile_size,
+                overlap,
+                suffix,
+                quality,
+                angle,
+                container,
+                compression_method,
+                background,
+                centre,
+                tissue_mask=tissue_mask,
+                checkpoint_key=self._get_checkpoint_key(tissue_mask),
+                cancel_event=cancel_event
+            )
+
         return self._deepzoom_builder.build_deepzoom_pyramid(
-            self._loaded_image_object,
+            self._get_pyramid_source(tissue_mask),
             output_path,
             tile_size,
             overlap,
@@ -180,7 +499,90 @@ class HistopathHandler:
             container,
             compression_method,
             background,
-            centre
+            centre,
+            cancel_event=cancel_event
+        )
+
+
+    def choose_tile_quality(self,
+                            suffix: str,
+                            target_tile_bytes: int,
+                            effort: Optional[int] = None,
+                            tile_size: int = DEFAULT_TILE_SIZE,
+                            samples: int = DEFAULT_TILE_BUDGET_SAMPLES
+                            ) -> int:
+        """
+        Pick the highest quality whose mean tile size for `suffix` stays within
+        `target_tile_bytes`, measured on up to `samples` full-resolution tiles spread
+        over the slide on a regular grid. Mostly-glass slides give optimistic sizes;
+        pass a larger `samples` when the tissue is sparse.
+        """
+        if not self._loaded_image_object:
+            raise ImageLoadingError("No image is currently loaded to sample tiles from.")
+
+        width, height = self._image_info.width_l0, self._image_info.height_l0
+        tile_width, tile_height = min(tile_size, width), min(tile_size, height)
+        grid = max(1, int(samples ** 0.5))
+        positions = {
+            ((width - tile_width) * (i + 1) // (grid + 1), (height - tile_height) * (j + 1) // (grid + 1))
+            for j in range(grid) for i in range(grid)
+        }
+        # Materialize once so the bisection only measures encoding
+        tiles = [
+            self._read_level_area(0, left, top, tile_width, tile_height).copy_memory()
+            for left, top in sorted(positions)
+        ]
+
+        quality, mean_bytes = choose_quality_for_budget(tiles, suffix, target_tile_bytes, effort)
+        if mean_bytes > target_tile_bytes:
+            logger.warning("%s tiles average %.0f bytes even at quality %d, above the %d byte budget",
+                           suffix, mean_bytes, quality, target_tile_bytes)
+        else:
+            logger.info("Chose quality %d for %s tiles: %.0f bytes on average over %d sample(s)",
+                        quality, suffix, mean_bytes, len(tiles))
+        return quality
+
+    def _apply_tile_budget(self,
+                           suffix: str,
+                           quality: int,
+                           target_tile_bytes: Optional[int],
+                           tile_size: int) -> Tuple[str, int]:
+        if target_tile_bytes is None:
+            return suffix, quality
+        # A Q written in the suffix would override the chosen quality when tiles are saved
+        suffix = remove_suffix_option(suffix, 'Q')
+        return suffix, self.choose_tile_quality(suffix, target_tile_bytes, tile_size=tile_size)
+
+    def _read_level_area(self, level: int, left: int, top: int, width: int, height: int) -> Any:
+        image_object = self._loaded_image_object
+        if isinstance(image_object, ISlideHandle):
+            return image_object.read_level_area(level, left, top, width, height)
+        return image_object.extract_area(left, top, width, height)
+
+
+    def get_deepzoom_tile_source(self,
+                                 tile_size: int = DEFAULT_TILE_SIZE,
+                                 overlap: int = DEFAULT_TILE_OVERLAP,
+                                 suffix: str = DEFAULT_DEEPZOOM_TILE_SUFFIX,
+                                 quality: int = DEFAULT_JPEG_QUALITY,
+                                 tissue_mask: Optional[TissueMask] = None,
+                                 effort: Optional[int] = None,
+                                 target_tile_bytes: Optional[int] = None
+                                 ) -> DeepZoomTileSource:
+        """Serve DeepZoom tiles on demand instead of building the whole pyramid up front."""
+        if not self._loaded_image_object:
+            raise ImageLoadingError("No image is currently loaded to serve DeepZoom tiles.")
+
+        suffix = apply_suffix_effort(suffix, effort)
+        suffix, quality = self._apply_tile_budget(suffix, quality, target_tile_bytes, tile_size)
+
+        return DeepZoomTileSource(
+            self._loaded_image_object,
+            tile_size=tile_size,
+            overlap=overlap,
+            suffix=suffix,
+            quality=quality,
+            tissue_mask=tissue_mask
         )
 
 
@@ -194,75 +596,143 @@ class HistopathHandler:
                           background: Optional[Tuple[float, ...]] = None,
                           centre: bool = False,
                           meta_data: Optional[Dict[str, Any]] = None,
-                          thumbnail = True
+                          thumbnail = True,
+                          tissue_mask: Optional[TissueMask] = None,
+                          checkpoint: bool = False,
+                          effort: Optional[int] = None,
+                          target_tile_bytes: Optional[int] = None,
+                          cancel_event: Optional[threading.Event] = None
                           ) -> str:
-        
+        """
+        Build `output_dir/<name>.hpz`. With `checkpoint=True` finished tile rows are kept in
+        `<name>.hpz.checkpoint/` until the archive is complete, and a rerun with the same
+        parameters resumes from them instead of starting over. `effort`,
+        `target_tile_bytes` and `cancel_event` work as in `build_deepzoom_pyramid`.
+        """
 
         if not self._loaded_image_object:
             raise ImageLoadingError("No image is currently loaded to build a DeepZoom pyramid.")
 
+        suffix = apply_suffix_effort(suffix, effort)
+        suffix, quality = self._apply_tile_budget(suffix, quality, target_tile_bytes, tile_size)
+
         filename = get_basename_without_extension(self._image_info.get_filename())
 
-        dzi_dir = os.path.join(output_dir, filename)
-        # Ensure dzi_dir exists
-        if not os.path.exists(dzi_dir):
-            os.makedirs(dzi_dir, exist_ok=True)
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir, exist_ok=True)
+
+        thumbnail_data = None
+        if thumbnail:
+            thumbnail_data = self.get_thumbnail(max_width=400).write_to_buffer(".jpg")
+
+        if meta_data is None:
+            meta_data = {}
+            meta_data["from_name"] = filename
+        else:
+            if "from_name" not in meta_data:
+                meta_data["from_name"] = filename
 
-        dzi_output_path = os.path.join(dzi_dir, filename)
-        # Build the DeepZoom pyramid first
-        self._deepzoom_builder.build_deepzoom_pyramid(
+        # Tiles, DZI, thumbnail and meta.json go straight into the archive in one pass.
+        # `centre` only applies to the google layout and is ignored for DeepZoom tiles.
+        output_path = os.path.join(output_dir, f"{filename}{HPZ_FILE_EXTENSION}")
+        return self._hpz_builder.build_hpz_archive(
             image_object=self._loaded_image_object,
-            output_path=dzi_output_path,
+            output_path=output_path,
+            basename=filename,
             tile_size=tile_size,
             overlap=overlap,
             suffix=suffix,
             quality=quality,
             angle=angle,
-            container="fs",  # Always use filesystem for HPZ
-            compression_method=DEFAULT_VIPS_COMPRESSION_METHOD,
             background=background,
-            centre=centre
+            meta_data=meta_data,
+            thumbnail=thumbnail_data,
+            tissue_mask=tissue_mask,
+            checkpoint_dir=f"{output_path}{CHECKPOINT_DIR_SUFFIX}" if checkpoint else None,
+            checkpoint_key=self._get_checkpoint_key(tissue_mask) if checkpoint else None,
+            cancel_event=cancel_event
         )
-            
 
-        ## Create thumbnail if needed
+
+    def pack_hpz_archive(self,
+                         deepzoom_base_path: str,
+                         output_hpz_path: str,
+                         meta_data: Optional[Dict[str, Any]] = None,
+                         thumbnail = True,
+                         tile_compression: int = HPZ_ZIP_STORED
+                         ) -> str:
+        """Pack an already built DeepZoom folder of this slide into an HPZ archive."""
+        if not self._loaded_image_object:
+            raise ImageLoadingError("No image is currently loaded to pack an HPZ archive.")
+
+        meta_data = dict(meta_data) if meta_data else {}
+        meta_data.setdefault("from_name", get_basename_without_extension(self._image_info.get_filename()))
+
+        thumbnail_data = None
         if thumbnail:
-            thumb_path = os.path.join(dzi_dir, f"{filename}_thumb.jpg")
-            self.get_thumbnail(max_width=400).write_to_file(thumb_path)
-            
-        if meta_data is None:
-            meta_data = {}
-            meta_data["from_name"] = filename
-        else:
-            if "from_name" not in meta_data:
-                meta_data["from_name"] = filename
+            thumbnail_data = self.get_thumbnail(max_width=400).write_to_buffer(".jpg")
 
-        # Write metadata JSON to a temporary file
-        meta_json_temp_path = os.path.join(dzi_dir, "meta.json")
-        write_json_file(meta_json_temp_path, meta_data)
+        output_dir = os.path.dirname(output_hpz_path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir, exist_ok=True)
+
+        return self._hpz_builder.pack_deepzoom_directory(
+            deepzoom_base_path,
+            output_hpz_path,
+            meta_data=meta_data,
+            thumbnail=thumbnail_data,
+            tile_compression=tile_compression
+        )
+
+
+    def build_tiff_pyramid(self,
+                           output_dir: str,
+                           tile_size: int = DEFAULT_TIFF_TILE_SIZE,
+                           compression: str = DEFAULT_TIFF_COMPRESSION,
+                           quality: int = DEFAULT_JPEG_QUALITY,
+                           bigtiff: Optional[bool] = None,
+                           ome: bool = False,
+                           tissue_mask: Optional[TissueMask] = None,
+                           cancel_event: Optional[threading.Event] = None
+                           ) -> str:
+        """
+        Convert the image into `output_dir/<name>.tif` (`.ome.tif` with `ome=True`), a
+        tiled multi-resolution TIFF that later loads with every level stored. The slide's
+        MPP is kept; BigTIFF is used for large images unless `bigtiff` says otherwise.
+        """
+        if not self._loaded_image_object:
+            raise ImageLoadingError("No image is currently loaded to build a TIFF pyramid.")
+
+        filename = get_basename_without_extension(self._image_info.get_filename())
+
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir, exist_ok=True)
+
+        extension = OME_TIFF_FILE_EXTENSION if ome else TIFF_PYRAMID_FILE_EXTENSION
+        return self._tiff_builder.build_tiff_pyramid(
+            self._get_pyramid_source(tissue_mask),
+            os.path.join(output_dir, f"{filename}{extension}"),
+            tile_size=tile_size,
+            compression=compression,
+            quality=quality,
+            bigtiff=bigtiff,
+            ome=ome,
+            mpp_x=self._image_info.mpp_x,
+            mpp_y=self._image_info.mpp_y,
+            name=filename,
+            cancel_event=cancel_event
+        )
 
-        
-        # Zip the DeepZoom directory into a single HPZ archive
-        # This will include the DZI XML, tiles, and metadata JSON and thumbnail if created
-        
-        try:
-            zip_directory(dzi_dir, os.path.join(output_dir, f"{filename}{HPZ_FILE_EXTENSION}"))
-        except Exception as e:
-            raise ExtractionError(f"Failed to create HPZ archive: {e}")
-        finally:
-            if (dzi_dir and os.path.exists(dzi_dir)):
-                shutil.rmtree(dzi_dir)
-        
 
     def close(self):
         if self._loaded_image_object: 
             self._loader.close_image(self._loaded_image_object)
             self._loaded_image_object = None
-            if self._info_loaded_image_object:
-                self._info_loader.close_image(self._info_loaded_image_object)
-                self._info_loaded_image_object = None            
+            if self._openslide_object is not None:
+                self._openslide_loader.close_image(self._openslide_object)
+                self._openslide_object = None
             self._image_info = None
-            print(f"[{self._file_path}] Image closed and resources released.")
+            logger.debug("[%s] Image closed and resources released.", self._file_path)
 
 
     def __enter__(self):
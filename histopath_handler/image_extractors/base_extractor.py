@@ -1,17 +1,39 @@
+from __future__ import annotations
 from abc import ABC
-import pyvips 
 import os
-from typing import Any, Tuple
-import numpy as np
+import math
+from typing import Any, Dict, List, Optional, Tuple
 
-from histopath_handler._core.interfaces import IImageExtractor
+from histopath_handler._core.interfaces import IImageExtractor, ISlideHandle
 from histopath_handler._core.models import Region, Patch
 from histopath_handler._core.exceptions import ExtractionError, InvalidRegionError
-from histopath_handler._core.constants import ROTATION_ANGLES
-from histopath_handler._core.utils import calculate_scaled_coords, calculate_scaled_dimensions
+from histopath_handler._core.constants import (
+    ROTATION_ANGLES,
+    METRIC_STAGE_DECODE,
+    METRIC_STAGE_ROTATE,
+    METRIC_STAGE_ENCODE,
+    METRIC_STAGE_WRITE,
+    TILE_CACHE_MAX_REGION_TILES
+)
+from histopath_handler._core.metrics import measure_stage, metrics_enabled
+from histopath_handler._core.codecs import get_save_options
+from histopath_handler._core.utils import calculate_scaled_coords, calculate_scaled_dimensions, LazyModule
+from .tile_cache import TileCache
+
+pyvips = LazyModule("pyvips")
+np = LazyModule("numpy")
+
 
 class BaseImageExtractor(IImageExtractor, ABC):
 
+    def __init__(self, tile_cache: Optional[TileCache] = None):
+        # Optional decoded-tile cache shared by every region read of this extractor
+        self._tile_cache = tile_cache
+
+    @property
+    def tile_cache(self) -> Optional[TileCache]:
+        return self._tile_cache
+
     def _validate_region(self, image_object: Any, region: Region) -> None:
         
         if not hasattr(image_object, 'width') or not hasattr(image_object, 'height'):
@@ -31,6 +53,207 @@ class BaseImageExtractor(IImageExtractor, ABC):
             )
         
 
+    def _get_scaled_region(self, image_object: Any, region: Region) -> Region:
+        if isinstance(image_object, ISlideHandle):
+            return image_object.get_scaled_region(region)
+        return region.get_scaled_region_at_level(region.level)
+
+    def _use_tile_cache(self, image_object: Any, region: Region) -> bool:
+        # Small, repeated reads gain from the cache; large crops would only be copied
+        # through NumPy and flush it
+        if self._tile_cache is None:
+            return False
+        tile_size = self._tile_cache.tile_size
+        scaled_region = self._get_scaled_region(image_object, region)
+        columns = (scaled_region.left + scaled_region.width - 1) // tile_size - scaled_region.left // tile_size + 1
+        rows = (scaled_region.top + scaled_region.height - 1) // tile_size - scaled_region.top // tile_size + 1
+        return columns * rows <= TILE_CACHE_MAX_REGION_TILES
+
+    def _read_region(self, image_object: Any, region: Region) -> pyvips.Image:
+        if self._use_tile_cache(image_object, region):
+            pixels = self._read_region_from_tiles(image_object, region)
+            height, width, bands = pixels.shape
+            return pyvips.Image.new_from_memory(pixels.data, width, height, bands, 'uchar')
+
+        # Slide handles read the stored level; a bare pyvips.Image only has level 0
+        if isinstance(image_object, ISlideHandle):
+            return image_object.read_region(region)
+
+        scaled_region = region.get_scaled_region_at_level(region.level)
+        return image_object.extract_area(
+            scaled_region.left, scaled_region.top, scaled_region.width, scaled_region.height
+        )
+
+    def _read_region_array(self, image_object: Any, region: Region) -> np.ndarray:
+        with measure_stage(METRIC_STAGE_DECODE, getattr(image_object, 'file_path', None)) as metric:
+            if self._use_tile_cache(image_object, region):
+                pixels = self._read_region_from_tiles(image_object, region)
+            else:
+                pixels = self._vips_to_numpy(self._read_region(image_object, region))
+            metric.pixels = pixels.shape[0] * pixels.shape[1]
+            metric.bytes = pixels.nbytes
+        return pixels
+
+    def _decode_region(self, image_object: Any, region: Region, rotate: int = 0) -> pyvips.Image:
+        """
+        Read and rotate a region. libvips is lazy, so normally the pixels are only decoded
+        by the encoder; with a metrics hook installed they are decoded and rotated here
+        instead, so that decode, rotate and encode are timed separately.
+        """
+        if not metrics_enabled():
+            return self._apply_rotation(self._read_region(image_object, region), rotate)
+
+        file_path = getattr(image_object, 'file_path', None)
+        with measure_stage(METRIC_STAGE_DECODE, file_path) as metric:
+            vips_region = self._read_region(image_object, region).copy_memory()
+            metric.pixels = vips_region.width * vips_region.height
+            metric.bytes = metric.pixels * vips_region.bands
+        if rotate:
+            with measure_stage(METRIC_STAGE_ROTATE, file_path) as metric:
+                vips_region = self._apply_rotation(vips_region, rotate).copy_memory()
+                metric.pixels = vips_region.width * vips_region.height
+        return vips_region
+
+    def _read_region_from_tiles(self, image_object: Any, region: Region) -> np.ndarray:
+        """Assemble a region from cached tiles, decoding only the tiles that are missing."""
+        tile_cache = self._tile_cache
+        tile_size = tile_cache.tile_size
+        scaled_region = self._get_scaled_region(image_object, region)
+        level_width, level_height = self._get_level_dimensions(image_object, region.level)
+        file_key = getattr(image_object, 'file_path', None) or id(image_object)
+
+        left, top = scaled_region.left, scaled_region.top
+        right, bottom = left + scaled_region.width, top + scaled_region.height
+        if left < 0 or top < 0 or right > level_width or bottom > level_height:
+            raise InvalidRegionError(
+                f"Requested region {scaled_region} is out of bounds for image "
+                f"dimensions {level_width}x{level_height} at level {region.level}."
+            )
+
+        pixels = None
+        for tile_y in range(top // tile_size, (bottom - 1) // tile_size + 1):
+            for tile_x in range(left // tile_size, (right - 1) // tile_size + 1):
+                key = (file_key, region.level, tile_x, tile_y)
+                tile = tile_cache.get(key)
+                if tile is None:
+                    tile_left, tile_top = tile_x * tile_size, tile_y * tile_size
+                    tile = self._vips_to_numpy(self._read_level_area(
+                        image_object,
+                        region.level,
+                        tile_left,
+                        tile_top,
+                        min(tile_size, level_width - tile_left),
+                        min(tile_size, level_height - tile_top)
+                    ))
+                    tile_cache.put(key, tile)
+
+                if pixels is None:
+                    pixels = np.empty((scaled_region.height, scaled_region.width, tile.shape[2]), dtype=np.uint8)
+
+                # Overlap of this tile with the region, in level coordinates
+                x0, y0 = max(left, tile_x * tile_size), max(top, tile_y * tile_size)
+                x1, y1 = min(right, tile_x * tile_size + tile.shape[1]), min(bottom, tile_y * tile_size + tile.shape[0])
+                pixels[y0 - top:y1 - top, x0 - left:x1 - left] = tile[
+                    y0 - tile_y * tile_size:y1 - tile_y * tile_size,
+                    x0 - tile_x * tile_size:x1 - tile_x * tile_size
+                ]
+        return pixels
+
+    def _vips_to_numpy(self, vips_image: pyvips.Image) -> np.ndarray:
+        """Wrap the decoded pixels as an (H, W, C) uint8 array without an encode/decode round trip."""
+        if vips_image.format != 'uchar':
+            vips_image = vips_image.cast('uchar')
+
+        buffer = vips_image.write_to_memory()
+        return np.frombuffer(buffer, dtype=np.uint8).reshape(
+            vips_image.height, vips_image.width, vips_image.bands
+        )
+
+    def _get_level_dimensions(self, image_object: Any, level: int) -> Tuple[int, int]:
+        if isinstance(image_object, ISlideHandle):
+            if not (0 <= level < image_object.level_count):
+                raise InvalidRegionError(
+                    f"Level {level} is out of bounds; the slide stores {image_object.level_count} level(s)."
+                )
+            return image_object.level_dimensions[level]
+        if level != 0:
+            raise InvalidRegionError(f"Level {level} is not available; the image only stores level 0.")
+        return image_object.width, image_object.height
+
+    def _read_level_area(self, image_object: Any, level: int, left: int, top: int, width: int, height: int) -> pyvips.Image:
+        # Slide handles may read areas without a whole-level image (see OpenSlideSlide)
+        if isinstance(image_object, ISlideHandle):
+            return image_object.read_level_area(level, left, top, width, height)
+        return self._get_level_image(image_object, level)[0].extract_area(left, top, width, height)
+
+    def _get_level_image(self, image_object: Any, level: int) -> Tuple[pyvips.Image, float]:
+        """Return the stored image for `level` with its downsample relative to level 0."""
+        if isinstance(image_object, ISlideHandle):
+            return image_object.get_level_image(level), image_object.level_downsamples[level]
+        if level != 0:
+            raise InvalidRegionError(f"Level {level} is not available; the image only stores level 0.")
+        return image_object, 1.0
+
+    def extract_region_array(self, image_object: Any, region: Region, rotate: int = 0) -> np.ndarray:
+        try:
+            if rotate == 0:
+                return self._read_region_array(image_object, region)
+            return self._vips_to_numpy(self._decode_region(image_object, region, rotate))
+        except InvalidRegionError:
+            raise
+        except Exception as e:
+            raise ExtractionError(f"Failed to extract {region} into memory: {e}")
+
+    def extract_region_resampled(self,
+                                 image_object: Any,
+                                 region: Region,
+                                 output_width: int,
+                                 output_height: int,
+                                 rotate: int = 0) -> np.ndarray:
+        """
+        Read the level-0 area of `region` from its stored level `region.level` and resample
+        it once to `output_width` x `output_height` (Lanczos, antialiased when shrinking).
+        The area may extend past the image; the part outside is white.
+        """
+        if output_width <= 0 or output_height <= 0:
+            raise ValueError("Output size must be positive.")
+        try:
+            level_width, level_height = self._get_level_dimensions(image_object, region.level)
+            downsample = image_object.level_downsamples[region.level] if isinstance(image_object, ISlideHandle) else 1.0
+
+            # The region in level pixels, then the whole pixels that cover it
+            fx0, fy0 = region.left / downsample, region.top / downsample
+            fx1, fy1 = (region.left + region.width) / downsample, (region.top + region.height) / downsample
+            x0, y0, x1, y1 = math.floor(fx0), math.floor(fy0), math.ceil(fx1), math.ceil(fy1)
+            cx0, cy0, cx1, cy1 = max(x0, 0), max(y0, 0), min(x1, level_width), min(y1, level_height)
+            if cx0 >= cx1 or cy0 >= cy1:
+                raise InvalidRegionError(f"Requested region {region} lies outside the image.")
+
+            with measure_stage(METRIC_STAGE_DECODE, getattr(image_object, 'file_path', None)) as metric:
+                area = self._read_level_area(image_object, region.level, cx0, cy0, cx1 - cx0, cy1 - cy0)
+                if (cx0, cy0, cx1, cy1) != (x0, y0, x1, y1):
+                    area = area.embed(cx0 - x0, cy0 - y0, x1 - x0, y1 - y0,
+                                      extend="background", background=[255] * area.bands)
+
+                hscale, vscale = output_width / (fx1 - fx0), output_height / (fy1 - fy0)
+                if hscale != 1.0 or vscale != 1.0:
+                    area = area.resize(hscale, vscale=vscale)
+                left, top = int(round((fx0 - x0) * hscale)), int(round((fy0 - y0) * vscale))
+                # resize rounds its output size, so the crop may come up a pixel short
+                if area.width < left + output_width or area.height < top + output_height:
+                    area = area.embed(0, 0, max(area.width, left + output_width), max(area.height, top + output_height),
+                                      extend="copy")
+                area = self._apply_rotation(area.crop(left, top, output_width, output_height), rotate)
+
+                pixels = self._vips_to_numpy(area)
+                metric.pixels = (cx1 - cx0) * (cy1 - cy0)
+                metric.bytes = pixels.nbytes
+            return pixels
+        except InvalidRegionError:
+            raise
+        except Exception as e:
+            raise ExtractionError(f"Failed to extract {region} resampled to {output_width}x{output_height}: {e}")
+
     def _apply_rotation(self, vips_image: pyvips.Image, rotate: int) -> pyvips.Image:
         if rotate not in ROTATION_ANGLES:
             raise ValueError(f"Invalid rotation angle: {rotate}. Must be one of {ROTATION_ANGLES}.")
@@ -45,28 +268,54 @@ class BaseImageExtractor(IImageExtractor, ABC):
         return vips_image
     
 
+    def _get_save_options(self, output_format: str, quality: int, effort: Optional[int] = None) -> Dict[str, Any]:
+        # jpg, png, tif, webp, avif and jxl; see _core/codecs.py
+        return get_save_options(output_format, quality, effort)
+
     def _save_vips_image(self,
                          vips_image: pyvips.Image,
                          output_path: str,
                          output_format: str,
-                         quality: int) -> str:
-        save_options = {}
+                         quality: int,
+                         effort: Optional[int] = None) -> str:
+        save_options = self._get_save_options(output_format, quality, effort)
         output_path_with_ext = f"{os.path.splitext(output_path)[0]}.{output_format.lower()}"
 
-        if output_format.lower() == 'jpg':
-            save_options['Q'] = quality
-
-        elif output_format.lower() == 'png':
-            pass
-        elif output_format.lower() == 'tiff' or output_format.lower() == 'tif':
-            ## Tıff specific options can be added here
-            pass
-        else:
-            raise ValueError(f"Unsupported output format: {output_format}. Supported formats are: jpg, png, tiff.")
-        
         try:
-            vips_image.write_to_file(output_path_with_ext, **save_options)
+            if not metrics_enabled():
+                vips_image.write_to_file(output_path_with_ext, **save_options)
+                return output_path_with_ext
+
+            # Encode to memory first so encoding and the filesystem write are timed apart
+            with measure_stage(METRIC_STAGE_ENCODE, output_path_with_ext) as metric:
+                data = vips_image.write_to_buffer(f".{output_format.lower()}", **save_options)
+                metric.pixels = vips_image.width * vips_image.height
+                metric.bytes = len(data)
+            with measure_stage(METRIC_STAGE_WRITE, output_path_with_ext) as metric:
+                with open(output_path_with_ext, 'wb') as file:
+                    file.write(data)
+                metric.bytes = len(data)
             return output_path_with_ext
         except Exception as e:
             raise ExtractionError(f"Failed to save image to {output_path_with_ext}: {str(e)}")
-        
\ No newline at end of file
+
+    def extract_region_buffer(self,
+                              image_object: Any,
+                              region: Region,
+                              output_format: str,
+                              quality: int = 90,
+                              rotate: int = 0,
+                              effort: Optional[int] = None) -> bytes:
+        """Encode a region in memory, e.g. to answer an HTTP request without a temporary file."""
+        save_options = self._get_save_options(output_format, quality, effort)
+        try:
+            vips_region = self._decode_region(image_object, region, rotate)
+            with measure_stage(METRIC_STAGE_ENCODE, getattr(image_object, 'file_path', None)) as metric:
+                data = vips_region.write_to_buffer(f".{output_format.lower()}", **save_options)
+                metric.pixels = vips_region.width * vips_region.height
+                metric.bytes = len(data)
+            return data
+        except InvalidRegionError:
+            raise
+        except Exception as e:
+            raise ExtractionError(f"Failed to encode {region} as {output_format}: {e}")
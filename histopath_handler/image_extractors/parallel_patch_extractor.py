@@ -0,0 +1,109 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+from histopath_handler._core.models import Region, PatchExtractionResult
+from histopath_handler._core.exceptions import ExtractionError
+from histopath_handler._core.constants import DEFAULT_PARALLEL_CHUNK_SIZE
+
+
+# Slide handle owned by the current worker process, opened once by the pool initializer
+_worker_handler = None
+
+
+def _init_worker(file_path: str):
+    global _worker_handler
+    # Imported here: the handler module imports this one
+    from histopath_handler.histopath_handler import HistopathHandler
+    _worker_handler = HistopathHandler(file_path)
+
+
+def _extract_chunk(regions: List[Region], rotate: int) -> List[Tuple[Any, Optional[str]]]:
+    results = []
+    for region in regions:
+        try:
+            patch = _worker_handler.extract_patches([region], rotate=rotate, stack=False)[0]
+            # Detach from the libvips buffer so only the pixels are pickled back
+            results.append((patch.copy(), None))
+        except Exception as e:
+            results.append((None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+class ParallelPatchExtractor:
+    """
+    Shards patch extraction across a process pool. Each worker opens the slide once in
+    its initializer and keeps the handle for the lifetime of the pool, so slide handles
+    never need to be pickled. Results come back in request order with per-region errors.
+
+    Workers open the file with the default loader for its format. The pool uses the
+    'spawn' start method by default because forking after libvips has started its
+    thread pool can deadlock.
+    """
+
+    def __init__(self,
+                 file_path: str,
+                 workers: Optional[int] = None,
+                 chunk_size: int = DEFAULT_PARALLEL_CHUNK_SIZE,
+                 mp_context: str = "spawn"):
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Image file not found at: {file_path}")
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive.")
+
+        self._file_path = file_path
+        self._workers = workers if workers else os.cpu_count() or 1
+        self._chunk_size = chunk_size
+        self._mp_context = multiprocessing.get_context(mp_context)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._workers,
+                mp_context=self._mp_context,
+                initializer=_init_worker,
+                initargs=(self._file_path,)
+            )
+        return self._executor
+
+    def iter_results(self,
+                     regions: Sequence[Region],
+                     level: Optional[int] = None,
+                     rotate: int = 0) -> Iterator[PatchExtractionResult]:
+        """Yield one result per region, in order, as worker chunks complete."""
+        if level is not None:
+            regions = [replace(region, level=level) for region in regions]
+
+        chunks = [list(regions[start:start + self._chunk_size])
+                  for start in range(0, len(regions), self._chunk_size)]
+
+        try:
+            chunk_results = self._get_executor().map(_extract_chunk, chunks, [rotate] * len(chunks))
+            for chunk, results in zip(chunks, chunk_results):
+                for region, (data, error) in zip(chunk, results):
+                    yield PatchExtractionResult(region=region, data=data, error=error)
+        except ExtractionError:
+            raise
+        except Exception as e:
+            # A worker failing to open the slide breaks the whole pool
+            raise ExtractionError(f"Parallel patch extraction failed for '{self._file_path}': {e}")
+
+    def extract_patches(self,
+                        regions: Sequence[Region],
+                        level: Optional[int] = None,
+                        rotate: int = 0) -> List[PatchExtractionResult]:
+        return list(self.iter_results(regions, level=level, rotate=rotate))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
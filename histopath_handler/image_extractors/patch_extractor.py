@@ -1,13 +1,27 @@
-import pyvips
+from __future__ import annotations
 import os
-from typing import Any
+import logging
+from typing import Any, Iterator, List, Optional, Sequence, Tuple, Union
 
 from histopath_handler._core.interfaces import IImageExtractor
-from histopath_handler._core.models import Region, Patch
+from histopath_handler._core.models import Region, Patch, TissueMask
 from histopath_handler._core.exceptions import ExtractionError, InvalidRegionError
-from histopath_handler._core.constants import DEFAULT_JPEG_QUALITY, DEFAULT_PATCH_OUTPUT_FORMAT
+from histopath_handler._core.constants import (
+    DEFAULT_JPEG_QUALITY,
+    DEFAULT_PATCH_OUTPUT_FORMAT,
+    DEFAULT_GRID_STRIP_MAX_WIDTH,
+    DEFAULT_MIN_TISSUE_FRACTION,
+    METRIC_STAGE_DECODE
+)
+from histopath_handler._core.metrics import measure_stage
+from histopath_handler._core.utils import LazyModule
 from .base_extractor import BaseImageExtractor
 
+pyvips = LazyModule("pyvips")
+np = LazyModule("numpy")
+
+logger = logging.getLogger(__name__)
+
 
 class PatchExtractor(BaseImageExtractor, IImageExtractor):
     """
@@ -22,20 +36,15 @@ class PatchExtractor(BaseImageExtractor, IImageExtractor):
                        output_path:str,
                        output_format:str = DEFAULT_PATCH_OUTPUT_FORMAT,
                        quality: int = DEFAULT_JPEG_QUALITY,
-                       rotate: int = 0) -> Patch:
+                       rotate: int = 0,
+                       effort: Optional[int] = None) -> Patch:
         
-        print(f"Extracting patch {region} at level {region.level} to {output_path}.{output_format}...")
-
-        scaled_region = region.get_scaled_region_at_level(region.level)
+        logger.debug("Extracting patch %s at level %d to %s.%s", region, region.level, output_path, output_format)
 
         try:
-            extracted_vips_patch = image_object.extract_area(
-                scaled_region.left, scaled_region.top, scaled_region.width, scaled_region.height
-            )
-
-            rotated_vips_patch = self._apply_rotation(extracted_vips_patch, rotate)
+            rotated_vips_patch = self._decode_region(image_object, region, rotate)
 
-            saved_file_path = self._save_vips_image(rotated_vips_patch, output_path, output_format, quality)
+            saved_file_path = self._save_vips_image(rotated_vips_patch, output_path, output_format, quality, effort)
 
             return Patch(
                 data = saved_file_path,
@@ -51,4 +60,134 @@ class PatchExtractor(BaseImageExtractor, IImageExtractor):
             raise ExtractionError(f"Invalid region: {e}")
         except Exception as e:
             raise ExtractionError(f"Failed to extract patch: {e}")
-        
+
+    def extract_patches(self,
+                        image_object: Any,
+                        regions: Sequence[Region],
+                        rotate: int = 0,
+                        stack: bool = True) -> Union[np.ndarray, List[np.ndarray]]:
+        """
+        Decode `regions` straight into memory, skipping encoding and filesystem writes.
+        Returns an (N, H, W, C) uint8 array, or with `stack=False` a list of (H, W, C)
+        arrays that wrap the libvips output buffers without copying.
+        """
+        patches: List[np.ndarray] = []
+        batch = None
+
+        for index, region in enumerate(regions):
+            try:
+                patch = self.extract_region_array(image_object, region, rotate)
+            except InvalidRegionError as e:
+                raise ExtractionError(f"Invalid region: {e}")
+
+            if not stack:
+                patches.append(patch)
+                continue
+
+            if batch is None:
+                batch = np.empty((len(regions),) + patch.shape, dtype=np.uint8)
+            elif patch.shape != batch.shape[1:]:
+                raise ExtractionError(
+                    f"Patch {index} ({region}) has shape {patch.shape}, expected {batch.shape[1:]}. "
+                    f"Use stack=False for regions of different sizes."
+                )
+            batch[index] = patch
+
+        if not stack:
+            return patches
+        if batch is None:
+            return np.empty((0, 0, 0, 0), dtype=np.uint8)
+        return batch
+
+    def iter_patches(self,
+                     image_object: Any,
+                     level: int,
+                     patch_size: Union[int, Tuple[int, int]],
+                     stride: Optional[Union[int, Tuple[int, int]]] = None,
+                     drop_partial: bool = True,
+                     strip_max_width: int = DEFAULT_GRID_STRIP_MAX_WIDTH,
+                     tissue_mask: Optional[TissueMask] = None,
+                     min_tissue_fraction: float = DEFAULT_MIN_TISSUE_FRACTION
+                     ) -> Iterator[Tuple[Region, np.ndarray]]:
+        """
+        Lazily tile a stored level in row-major order, yielding (Region, (H, W, C) array).
+
+        Each row of patches is decoded once as a horizontal strip (split into windows of
+        at most `strip_max_width` level pixels) and patches are sliced out of it, so memory
+        stays bounded by one window. Yielded arrays are read-only views into that window;
+        copy them if they must outlive the next iteration.
+
+        `patch_size` and `stride` are in level pixels; yielded regions are in level-0
+        coordinates. With `drop_partial=False` edge patches are padded with white.
+        With a `tissue_mask`, positions below `min_tissue_fraction` are skipped before
+        decoding, and windows without any tissue patch are never read.
+        """
+        patch_width, patch_height = (patch_size, patch_size) if isinstance(patch_size, int) else patch_size
+        if stride is None:
+            stride = (patch_width, patch_height)
+        stride_x, stride_y = (stride, stride) if isinstance(stride, int) else stride
+        if min(patch_width, patch_height, stride_x, stride_y) <= 0:
+            raise ValueError("Patch size and stride must be positive.")
+
+        level_image, downsample = self._get_level_image(image_object, level)
+        level_width, level_height = level_image.width, level_image.height
+
+        def grid_starts(extent: int, patch: int, step: int) -> List[int]:
+            last = extent - patch if drop_partial else extent - 1
+            return list(range(0, last + 1, step)) if last >= 0 else []
+
+        xs = grid_starts(level_width, patch_width, stride_x)
+        ys = grid_starts(level_height, patch_height, stride_y)
+
+        for y in ys:
+            strip_height = min(patch_height, level_height - y)
+
+            row_xs = xs
+            if tissue_mask is not None:
+                row_xs = [
+                    x for x in xs
+                    if tissue_mask.get_tissue_fraction_at_level(
+                        x, y, patch_width, patch_height, (level_width, level_height)
+                    ) >= min_tissue_fraction
+                ]
+
+            # Group adjacent patch columns into windows no wider than strip_max_width;
+            # a gap left by skipped background starts a new window so it is not decoded
+            windows: List[List[int]] = []
+            for x in row_xs:
+                if (windows and
+                        x <= windows[-1][-1] + max(stride_x, patch_width) and
+                        x + patch_width - windows[-1][0] <= max(strip_max_width, patch_width)):
+                    windows[-1].append(x)
+                else:
+                    windows.append([x])
+
+            for window in windows:
+                window_left = window[0]
+                window_width = min(window[-1] + patch_width, level_width) - window_left
+                try:
+                    with measure_stage(METRIC_STAGE_DECODE, getattr(image_object, 'file_path', None)) as metric:
+                        strip = self._vips_to_numpy(
+                            level_image.extract_area(window_left, y, window_width, strip_height)
+                        )
+                        metric.pixels = window_width * strip_height
+                        metric.bytes = strip.nbytes
+                except Exception as e:
+                    raise ExtractionError(f"Failed to decode strip at y={y} on level {level}: {e}")
+
+                for x in window:
+                    patch = strip[:, x - window_left:x - window_left + patch_width]
+                    if patch.shape[0] != patch_height or patch.shape[1] != patch_width:
+                        padded = np.full((patch_height, patch_width, strip.shape[2]), 255, dtype=np.uint8)
+                        padded[:patch.shape[0], :patch.shape[1]] = patch
+                        patch = padded
+
+                    left, top = int(round(x * downsample)), int(round(y * downsample))
+                    region = Region(
+                        left=left,
+                        top=top,
+                        width=int(round(min(patch_width, level_width - x) * downsample)),
+                        height=int(round(strip_height * downsample)),
+                        level=level
+                    )
+                    yield region, patch
@@ -1,13 +1,19 @@
-import pyvips
+from __future__ import annotations
 import os
-from typing import Any
+import logging
+from typing import Any, Optional
 
 from histopath_handler._core.interfaces import IImageExtractor
 from histopath_handler._core.models import Region, Patch
 from histopath_handler._core.exceptions import ExtractionError, InvalidRegionError
 from histopath_handler._core.constants import DEFAULT_JPEG_QUALITY, DEFAULT_PATCH_OUTPUT_FORMAT
+from histopath_handler._core.utils import LazyModule
 from .base_extractor import BaseImageExtractor
 
+pyvips = LazyModule("pyvips")
+
+logger = logging.getLogger(__name__)
+
 
 class RegionExtractor(BaseImageExtractor):
     """
@@ -20,24 +26,19 @@ class RegionExtractor(BaseImageExtractor):
                        output_path: str,
                        output_format: str = DEFAULT_PATCH_OUTPUT_FORMAT,
                        quality: int = DEFAULT_JPEG_QUALITY,
-                       rotate: int = 0
+                       rotate: int = 0,
+                       effort: Optional[int] = None
                        ) -> Patch:
         
-        print(f"Extracting region {region} at level {region.level} to {output_path}.{output_format}...")
-
-        scaled_region = region.get_scaled_region_at_level(region.level)
+        logger.debug("Extracting region %s at level %d to %s.%s", region, region.level, output_path, output_format)
 
         try:
 
-            extract_vips_region = image_object.extract_area(
-                scaled_region.left, scaled_region.top, scaled_region.width, scaled_region.height
-            )
-
-            ## Apply rotation if needed
-            rotated_vips_region = self._apply_rotation(extract_vips_region, rotate)
+            ## Read the region and apply rotation if needed
+            rotated_vips_region = self._decode_region(image_object, region, rotate)
 
             # Save the region image
-            saved_file_path = self._save_vips_image(rotated_vips_region, output_path, output_format, quality)
+            saved_file_path = self._save_vips_image(rotated_vips_region, output_path, output_format, quality, effort)
             
             return Patch(data=saved_file_path, 
                          region=region, 
@@ -0,0 +1,91 @@
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+
+from histopath_handler._core.constants import DEFAULT_TILE_CACHE_MAX_BYTES, DEFAULT_TILE_CACHE_TILE_SIZE
+from histopath_handler._core.utils import LazyModule
+
+np = LazyModule("numpy")
+
+
+TileKey = Tuple[Hashable, int, int, int] # (file, level, tile_x, tile_y)
+
+
+class TileCache:
+    """
+    Byte-budgeted LRU cache of decoded tiles keyed by (file, level, tile_x, tile_y).
+    Tiles are `tile_size` squares on the grid of their level (smaller on the right and
+    bottom edges). One cache may be shared by several handlers and threads. The
+    extractors only go through it for reads of up to TILE_CACHE_MAX_REGION_TILES tiles.
+    """
+
+    def __init__(self,
+                 max_bytes: int = DEFAULT_TILE_CACHE_MAX_BYTES,
+                 tile_size: int = DEFAULT_TILE_CACHE_TILE_SIZE):
+        if max_bytes <= 0 or tile_size <= 0:
+            raise ValueError("max_bytes and tile_size must be positive.")
+
+        self.max_bytes = max_bytes
+        self.tile_size = tile_size
+        self._tiles: "OrderedDict[TileKey, np.ndarray]" = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: TileKey) -> Optional[np.ndarray]:
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is None:
+                self.misses += 1
+                return None
+            self._tiles.move_to_end(key)
+            self.hits += 1
+            return tile
+
+    def put(self, key: TileKey, tile: np.ndarray):
+        # A tile larger than the whole budget would only evict everything else
+        if tile.nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._tiles.pop(key, None)
+            if previous is not None:
+                self._current_bytes -= previous.nbytes
+
+            self._tiles[key] = tile
+            self._current_bytes += tile.nbytes
+
+            while self._current_bytes > self.max_bytes:
+                _, evicted = self._tiles.popitem(last=False)
+                self._current_bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+            self._current_bytes = 0
+
+    @property
+    def current_bytes(self) -> int:
+        return self._current_bytes
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / requests if requests else 0.0,
+                "evictions": self.evictions,
+                "tiles": len(self._tiles),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def __len__(self) -> int:
+        return len(self._tiles)
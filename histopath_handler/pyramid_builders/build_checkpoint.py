@@ -0,0 +1,134 @@
+import os
+import json
+import shutil
+from typing import Any, Dict, List, Optional, Tuple
+
+from histopath_handler._core.constants import (
+    CHECKPOINT_MANIFEST_FILENAME,
+    CHECKPOINT_JOURNAL_FILENAME,
+    CHECKPOINT_FORMAT_VERSION
+)
+
+
+class BuildCheckpoint:
+    """
+    On-disk progress of a pyramid build, kept in its own directory:
+
+        manifest.json   build parameters; a checkpoint is only reused when they match
+        journal.jsonl   one line per finished (level, row) strip, appended and fsynced
+        rows/L_R.bin    optional encoded tiles of a strip, concatenated in column order
+
+    A strip counts as done only once its journal line is on disk, so a build killed
+    mid-strip re-renders just that strip. A torn last journal line is ignored.
+    """
+
+    def __init__(self, checkpoint_dir: str, params: Dict[str, Any]):
+        self.checkpoint_dir = checkpoint_dir
+        self.params = {"version": CHECKPOINT_FORMAT_VERSION, **params}
+        self._manifest_path = os.path.join(checkpoint_dir, CHECKPOINT_MANIFEST_FILENAME)
+        self._journal_path = os.path.join(checkpoint_dir, CHECKPOINT_JOURNAL_FILENAME)
+        self._rows_dir = os.path.join(checkpoint_dir, "rows")
+        # (level, row) -> encoded tile sizes, empty when the tiles live elsewhere
+        self._rows: Dict[Tuple[int, int], List[int]] = {}
+        self._journal = None
+
+    def open(self) -> int:
+        """Load a matching checkpoint or start a fresh one; returns the number of strips already done."""
+        if self._load_manifest() == self.params:
+            self._load_journal()
+        else:
+            self.remove()
+            os.makedirs(self._rows_dir, exist_ok=True)
+            self._write_file(self._manifest_path, json.dumps(self.params, indent=4, sort_keys=True).encode("utf-8"))
+        self._journal = open(self._journal_path, 'a', encoding="utf-8")
+        if self._journal.tell() > 0 and not self._ends_with_newline():
+            # Terminate a torn line so the next entry starts on its own line
+            self._journal.write("\n")
+        return len(self._rows)
+
+    def _ends_with_newline(self) -> bool:
+        with open(self._journal_path, 'rb') as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b"\n"
+
+    def _load_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._manifest_path, 'r', encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _load_journal(self):
+        if not os.path.exists(self._journal_path):
+            return
+        with open(self._journal_path, 'r', encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                    key = (int(entry["level"]), int(entry["row"]))
+                    sizes = [int(size) for size in entry.get("sizes", [])]
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if sizes and self._get_blob_size(key) != sum(sizes):
+                    continue
+                self._rows[key] = sizes
+
+    def _get_blob_path(self, key: Tuple[int, int]) -> str:
+        return os.path.join(self._rows_dir, f"{key[0]}_{key[1]}.bin")
+
+    def _get_blob_size(self, key: Tuple[int, int]) -> int:
+        try:
+            return os.path.getsize(self._get_blob_path(key))
+        except OSError:
+            return -1
+
+    @staticmethod
+    def _write_file(path: str, data: bytes):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+
+    def is_row_done(self, level: int, row: int) -> bool:
+        return (level, row) in self._rows
+
+    def load_row(self, level: int, row: int) -> Optional[List[bytes]]:
+        """Stored tiles of a finished strip in column order, or None if the strip kept no tiles."""
+        sizes = self._rows.get((level, row))
+        if not sizes:
+            return None
+        with open(self._get_blob_path((level, row)), 'rb') as file:
+            return [file.read(size) for size in sizes]
+
+    def record_row(self, level: int, row: int, tiles: Optional[List[bytes]] = None):
+        """Mark a strip done, storing its encoded tiles when the output cannot be resumed in place."""
+        sizes = []
+        if tiles is not None:
+            self._write_file(self._get_blob_path((level, row)), b"".join(tiles))
+            sizes = [len(tile) for tile in tiles]
+
+        self._journal.write(json.dumps({"level": level, "row": row, "sizes": sizes}) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._rows[(level, row)] = sizes
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def remove(self):
+        """Drop the checkpoint, e.g. once the output it was building is complete."""
+        self.close()
+        self._rows.clear()
+        if os.path.isdir(self.checkpoint_dir):
+            shutil.rmtree(self.checkpoint_dir)
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
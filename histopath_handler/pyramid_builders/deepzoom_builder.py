@@ -1,21 +1,32 @@
-import pyvips
+from __future__ import annotations
 import os
+import logging
+import threading
 from typing import Any, Tuple, Optional
 
-from histopath_handler._core.interfaces import IPyramidBuilder
+from histopath_handler._core.interfaces import IPyramidBuilder, ISlideHandle
 from histopath_handler._core.exceptions import ExtractionError, UnsupportedOperationError
 from histopath_handler._core.constants import (
     DEFAULT_TILE_SIZE,
     DEFAULT_TILE_OVERLAP,
     DEFAULT_JPEG_QUALITY,
     DEFAULT_VIPS_COMPRESSION_METHOD,
-    DEFAULT_DEEPZOOM_TILE_SUFFIX
+    DEFAULT_DEEPZOOM_TILE_SUFFIX,
+    METRIC_STAGE_PYRAMID
 )
+from histopath_handler._core.metrics import measure_stage
+from histopath_handler._core.utils import LazyModule, stop_on_cancel, raise_if_cancelled
+from .deepzoom_layout import build_tile_suffix
+
+pyvips = LazyModule("pyvips")
+
+logger = logging.getLogger(__name__)
+
 
 class DeepZoomBuilder(IPyramidBuilder):
 
     def build_deepzoom_pyramid(self,
-                               image_object: pyvips.Image, # Expects a pyvips.Image object
+                               image_object: Any, # pyvips.Image or an ISlideHandle
                                output_path: str,     # e.g., "output/my_image" or "output/my_image.zip"
                                tile_size: int = DEFAULT_TILE_SIZE,
                                overlap: int = DEFAULT_TILE_OVERLAP,
@@ -25,12 +36,19 @@ class DeepZoomBuilder(IPyramidBuilder):
                                container: str = 'fs',     # 'fs' for filesystem, 'zip' for single zip file
                                compression_method: int = DEFAULT_VIPS_COMPRESSION_METHOD,
                                background: Optional[Tuple[float, ...]] = None,
-                               centre: bool = False
+                               centre: bool = False,
+                               cancel_event: Optional[threading.Event] = None
                                ) -> str:
         
 
-        print(f"Building DeepZoom pyramid to: {output_path} (container: {container})...")
+        logger.info("Building DeepZoom pyramid to: %s (container: %s)", output_path, container)
+
 
+        # dzsave builds its own pyramid from full resolution
+        if isinstance(image_object, ISlideHandle):
+            image_object = image_object.get_level_image(0)
+        # Setting cancel_event stops dzsave at its next progress update
+        image_object = stop_on_cancel(image_object, cancel_event)
 
         try:
             dzsave_options = {
@@ -42,21 +60,20 @@ class DeepZoomBuilder(IPyramidBuilder):
                  'container': container,
              }
 
-            if suffix.lower() == '.jpg' or suffix.lower() == '.jpeg':
-                dzsave_options['suffix'] = f'.jpg[Q={quality}]'
-            else:
-                dzsave_options['suffix'] = suffix
+            dzsave_options['suffix'] = build_tile_suffix(suffix, quality)
 
             
             if background is not None:
                 dzsave_options['background'] = list(background)
 
-            print(output_path)
-            image_object.dzsave(output_path, **dzsave_options)
+            with measure_stage(METRIC_STAGE_PYRAMID, output_path) as metric:
+                image_object.dzsave(output_path, **dzsave_options)
+                metric.pixels = image_object.width * image_object.height
 
         except UnsupportedOperationError as e:
             raise ExtractionError(f"Unsupported operation for DeepZoom pyramid: {str(e)}") from e        
         except pyvips.Error as e:
+            raise_if_cancelled(cancel_event, "DeepZoom pyramid build")
             raise ExtractionError(f"Failed to build DeepZoom pyramid: {str(e)}") from e
         except Exception as e:
             raise ExtractionError(f"An unexpected error occurred while building DeepZoom pyramid: {str(e)}") from e
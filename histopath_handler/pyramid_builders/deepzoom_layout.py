@@ -0,0 +1,123 @@
+import math
+from typing import List, Tuple
+
+from histopath_handler._core.constants import DEFAULT_TILE_SIZE, DEFAULT_TILE_OVERLAP, DEFAULT_DEEPZOOM_TILE_SUFFIX
+from histopath_handler._core.codecs import build_save_suffix, split_suffix
+
+
+DZI_XML_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<Image xmlns="http://schemas.microsoft.com/deepzoom/2008"
+  Format="{format}"
+  Overlap="{overlap}"
+  TileSize="{tile_size}"
+  >
+  <Size
+    Height="{height}"
+    Width="{width}"
+  />
+</Image>
+"""
+
+
+def build_tile_suffix(suffix: str, quality: int) -> str:
+    """Turn a tile suffix such as '.jpg' or '.webp[effort=6]' into a libvips save string with its options."""
+    return build_save_suffix(suffix, quality)
+
+
+class DeepZoomLayout:
+    """
+    Geometry of a DeepZoom pyramid as written by `dzsave(layout='dz')`.
+    Level 0 is 1x1 and the last level is full resolution; every level halves the one
+    above it rounding up. Tiles are `tile_size` squares extended by `overlap` pixels on
+    every side that has a neighbour.
+    """
+
+    def __init__(self,
+                 width: int,
+                 height: int,
+                 tile_size: int = DEFAULT_TILE_SIZE,
+                 overlap: int = DEFAULT_TILE_OVERLAP,
+                 suffix: str = DEFAULT_DEEPZOOM_TILE_SUFFIX):
+        if width <= 0 or height <= 0:
+            raise ValueError("Image dimensions must be positive.")
+        if tile_size <= 0 or overlap < 0:
+            raise ValueError("tile_size must be positive and overlap non-negative.")
+
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.overlap = overlap
+        # File suffix only; save options such as '[effort=6]' belong to the encoder
+        self.suffix = split_suffix(suffix)[0]
+
+        dimensions = [(width, height)]
+        while dimensions[-1] != (1, 1):
+            level_width, level_height = dimensions[-1]
+            dimensions.append((max(1, math.ceil(level_width / 2)), max(1, math.ceil(level_height / 2))))
+        self.level_dimensions: List[Tuple[int, int]] = list(reversed(dimensions))
+
+    @property
+    def level_count(self) -> int:
+        return len(self.level_dimensions)
+
+    @property
+    def tile_format(self) -> str:
+        return self.suffix.lstrip('.')
+
+    def _check_level(self, level: int):
+        if not (0 <= level < self.level_count):
+            raise IndexError(f"DeepZoom level {level} is out of bounds (0-{self.level_count - 1}).")
+
+    def get_level_downsample(self, level: int) -> float:
+        """Downsample of a DeepZoom level relative to full resolution."""
+        self._check_level(level)
+        level_width, level_height = self.level_dimensions[level]
+        return max(self.width / level_width, self.height / level_height)
+
+    def get_tile_grid(self, level: int) -> Tuple[int, int]:
+        """Number of (columns, rows) of tiles on a level."""
+        self._check_level(level)
+        level_width, level_height = self.level_dimensions[level]
+        return math.ceil(level_width / self.tile_size), math.ceil(level_height / self.tile_size)
+
+    def _get_tile_span(self, index: int, count: int, extent: int) -> Tuple[int, int]:
+        start = index * self.tile_size - (self.overlap if index > 0 else 0)
+        end = min((index + 1) * self.tile_size + (self.overlap if index < count - 1 else 0), extent)
+        return start, end - start
+
+    def get_tile_bounds(self, level: int, col: int, row: int) -> Tuple[int, int, int, int]:
+        """Pixel box (left, top, width, height) of a tile on its level, overlap included."""
+        columns, rows = self.get_tile_grid(level)
+        if not (0 <= col < columns and 0 <= row < rows):
+            raise IndexError(f"Tile ({col}, {row}) is out of bounds for level {level} ({columns}x{rows} tiles).")
+
+        level_width, level_height = self.level_dimensions[level]
+        left, width = self._get_tile_span(col, columns, level_width)
+        top, height = self._get_tile_span(row, rows, level_height)
+        return left, top, width, height
+
+    def get_row_bounds(self, level: int, row: int) -> Tuple[int, int]:
+        """(top, height) of a row of tiles, overlap included."""
+        return self.get_tile_bounds(level, 0, row)[1::2]
+
+    def get_tile_count(self) -> int:
+        total = 0
+        for level in range(self.level_count):
+            columns, rows = self.get_tile_grid(level)
+            total += columns * rows
+        return total
+
+    def get_tile_name(self, basename: str, level: int, col: int, row: int) -> str:
+        return f"{basename}_files/{level}/{col}_{row}{self.suffix}"
+
+    def get_dzi_name(self, basename: str) -> str:
+        return f"{basename}.dzi"
+
+    def get_dzi_xml(self) -> str:
+        return DZI_XML_TEMPLATE.format(
+            format=self.tile_format,
+            overlap=self.overlap,
+            tile_size=self.tile_size,
+            height=self.height,
+            width=self.width
+        )
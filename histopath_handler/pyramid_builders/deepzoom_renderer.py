@@ -0,0 +1,174 @@
+from __future__ import annotations
+import threading
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Tuple
+
+from histopath_handler._core.interfaces import ISlideHandle
+from histopath_handler._core.models import TissueMask
+from histopath_handler._core.exceptions import ExtractionError
+from histopath_handler._core.constants import (
+    DEFAULT_TILE_SIZE,
+    DEFAULT_TILE_OVERLAP,
+    DEFAULT_JPEG_QUALITY,
+    DEFAULT_DEEPZOOM_TILE_SUFFIX,
+    ROTATION_ANGLES,
+    DEFAULT_GRID_STRIP_MAX_WIDTH,
+    METRIC_STAGE_DECODE,
+    METRIC_STAGE_ENCODE
+)
+from histopath_handler._core.metrics import measure_stage
+from histopath_handler.tissue_detectors.otsu_tissue_detector import apply_tissue_mask
+from histopath_handler._core.utils import LazyModule
+from histopath_handler._core.codecs import split_suffix
+from .deepzoom_layout import DeepZoomLayout, build_tile_suffix
+
+pyvips = LazyModule("pyvips")
+
+
+class DeepZoomRenderer:
+    """
+    Renders DeepZoom tiles without dzsave. Each DeepZoom level is resampled lazily from
+    the closest stored slide level at or above its resolution, so small levels never
+    touch level 0. Rows of tiles are decoded once as a strip and cut into tiles.
+
+    `centre` is not supported: dzsave only honours it for the google layout.
+    """
+
+    def __init__(self,
+                 image_object: Any,
+                 tile_size: int = DEFAULT_TILE_SIZE,
+                 overlap: int = DEFAULT_TILE_OVERLAP,
+                 suffix: str = DEFAULT_DEEPZOOM_TILE_SUFFIX,
+                 quality: int = DEFAULT_JPEG_QUALITY,
+                 angle: int = 0,
+                 background: Optional[Tuple[float, ...]] = None,
+                 tissue_mask: Optional[TissueMask] = None):
+        if angle not in ROTATION_ANGLES:
+            raise ValueError(f"Invalid rotation angle: {angle}. Must be one of {ROTATION_ANGLES}.")
+
+        self._image_object = image_object
+        self._angle = angle
+        self._background = list(background) if background is not None else [255, 255, 255]
+        self._tissue_mask = tissue_mask
+        self._save_suffix = build_tile_suffix(suffix, quality)
+        self._flatten = split_suffix(suffix)[0].lower() in ('.jpg', '.jpeg')
+
+        width, height = self._get_source_dimensions()
+        if angle in (90, 270):
+            width, height = height, width
+        self.layout = DeepZoomLayout(width, height, tile_size, overlap, suffix)
+
+        self._level_images: Dict[int, pyvips.Image] = {}
+        self._level_lock = threading.Lock()
+
+    def _get_source_dimensions(self) -> Tuple[int, int]:
+        if isinstance(self._image_object, ISlideHandle):
+            return self._image_object.level_dimensions[0]
+        return self._image_object.width, self._image_object.height
+
+    def _get_native_image(self, downsample: float) -> pyvips.Image:
+        if isinstance(self._image_object, ISlideHandle):
+            level = self._image_object.get_best_level_for_downsample(downsample)
+            return self._image_object.get_level_image(level)
+        return self._image_object
+
+    def get_level_image(self, level: int) -> pyvips.Image:
+        """Lazy full image of a DeepZoom level, already rotated and masked."""
+        level_image = self._level_images.get(level)
+        if level_image is not None:
+            return level_image
+
+        target_width, target_height = self.layout.level_dimensions[level]
+        if self._angle in (90, 270):
+            target_width, target_height = target_height, target_width
+
+        native = self._get_native_image(self.layout.get_level_downsample(level))
+        if self._tissue_mask is not None:
+            native = apply_tissue_mask(native, self._tissue_mask)
+        if self._flatten and native.hasalpha():
+            native = native.flatten(background=self._background[:native.bands - 1])
+
+        level_image = native
+        if (native.width, native.height) != (target_width, target_height):
+            level_image = native.resize(target_width / native.width, vscale=target_height / native.height)
+            # resize rounds its output size; pin it to the layout
+            if (level_image.width, level_image.height) != (target_width, target_height):
+                level_image = level_image.embed(0, 0, target_width, target_height, extend='copy')
+
+        if self._angle == 90:
+            level_image = level_image.rot90()
+        elif self._angle == 180:
+            level_image = level_image.rot180()
+        elif self._angle == 270:
+            level_image = level_image.rot270()
+
+        with self._level_lock:
+            self._level_images.setdefault(level, level_image)
+        return self._level_images[level]
+
+    def clear(self):
+        """Drop the cached level images, which keep the slide's file open."""
+        with self._level_lock:
+            self._level_images.clear()
+
+    @property
+    def save_suffix(self) -> str:
+        """libvips save string used for every tile, e.g. '.webp[Q=90,effort=4]'."""
+        return self._save_suffix
+
+    def encode_tile(self, tile_image: pyvips.Image) -> bytes:
+        with measure_stage(METRIC_STAGE_ENCODE) as metric:
+            data = tile_image.write_to_buffer(self._save_suffix)
+            metric.pixels = tile_image.width * tile_image.height
+            metric.bytes = len(data)
+        return data
+
+    def render_tile(self, level: int, col: int, row: int) -> bytes:
+        left, top, width, height = self.layout.get_tile_bounds(level, col, row)
+        try:
+            return self.encode_tile(self.get_level_image(level).crop(left, top, width, height))
+        except pyvips.Error as e:
+            raise ExtractionError(f"Failed to render DeepZoom tile {level}/{col}_{row}: {e}")
+
+    def render_row(self,
+                   level: int,
+                   row: int,
+                   executor: Optional[Executor] = None,
+                   strip_max_width: int = DEFAULT_GRID_STRIP_MAX_WIDTH) -> List[Tuple[int, bytes]]:
+        """
+        Render every tile of a row; returns [(col, data)] in column order. The row is decoded
+        as strips of whole tiles at most `strip_max_width` level pixels wide (at least one
+        tile), one strip in memory at a time, and each strip is cut into tiles.
+        """
+        top, height = self.layout.get_row_bounds(level, row)
+        columns, _ = self.layout.get_tile_grid(level)
+        bounds = [self.layout.get_tile_bounds(level, col, row) for col in range(columns)]
+
+        # Consecutive columns whose span (overlap included) fits in one strip
+        chunks: List[List[int]] = []
+        for col, (left, _, width, _) in enumerate(bounds):
+            if chunks and left + width - bounds[chunks[-1][0]][0] <= strip_max_width:
+                chunks[-1].append(col)
+            else:
+                chunks.append([col])
+
+        tiles: List[Tuple[int, bytes]] = []
+        for chunk in chunks:
+            strip_left = bounds[chunk[0]][0]
+            strip_width = bounds[chunk[-1]][0] + bounds[chunk[-1]][2] - strip_left
+            try:
+                with measure_stage(METRIC_STAGE_DECODE) as metric:
+                    strip = self.get_level_image(level).crop(strip_left, top, strip_width, height).copy_memory()
+                    metric.pixels = strip_width * height
+            except pyvips.Error as e:
+                raise ExtractionError(f"Failed to render DeepZoom level {level} row {row}: {e}")
+
+            def encode_column(col: int, strip=strip, strip_left=strip_left) -> Tuple[int, bytes]:
+                left, _, width, _ = bounds[col]
+                return col, self.encode_tile(strip.crop(left - strip_left, 0, width, height))
+
+            if executor is None:
+                tiles.extend(encode_column(col) for col in chunk)
+            else:
+                tiles.extend(executor.map(encode_column, chunk))
+        return tiles
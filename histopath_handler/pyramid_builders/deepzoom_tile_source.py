@@ -0,0 +1,76 @@
+from __future__ import annotations
+from typing import Any, List, Optional, Tuple
+
+from histopath_handler._core.models import TissueMask
+from histopath_handler._core.exceptions import ExtractionError
+from histopath_handler._core.constants import (
+    DEFAULT_TILE_SIZE,
+    DEFAULT_TILE_OVERLAP,
+    DEFAULT_JPEG_QUALITY,
+    DEFAULT_DEEPZOOM_TILE_SUFFIX
+)
+from histopath_handler._core.utils import LazyModule
+from .deepzoom_renderer import DeepZoomRenderer
+
+pyvips = LazyModule("pyvips")
+
+
+class DeepZoomTileSource:
+    """
+    On-demand DeepZoom tiles for an open slide. The DZI descriptor is computed from the
+    slide dimensions and single tiles are rendered when requested, with the same
+    `tile_size`/`overlap` layout as `dzsave`, so a viewer can open a slide without a
+    pre-built pyramid. Each tile is cropped from the best stored level and resized.
+
+    Safe to share between threads; keep one instance per slide and settings.
+    """
+
+    def __init__(self,
+                 image_object: Any,
+                 tile_size: int = DEFAULT_TILE_SIZE,
+                 overlap: int = DEFAULT_TILE_OVERLAP,
+                 suffix: str = DEFAULT_DEEPZOOM_TILE_SUFFIX,
+                 quality: int = DEFAULT_JPEG_QUALITY,
+                 tissue_mask: Optional[TissueMask] = None):
+        self._renderer = DeepZoomRenderer(
+            image_object,
+            tile_size=tile_size,
+            overlap=overlap,
+            suffix=suffix,
+            quality=quality,
+            tissue_mask=tissue_mask
+        )
+        self.layout = self._renderer.layout
+
+    @property
+    def level_count(self) -> int:
+        return self.layout.level_count
+
+    @property
+    def level_dimensions(self) -> List[Tuple[int, int]]:
+        return self.layout.level_dimensions
+
+    @property
+    def tile_format(self) -> str:
+        return self.layout.tile_format
+
+    def get_dzi(self) -> str:
+        return self.layout.get_dzi_xml()
+
+    def get_tile_grid(self, level: int) -> Tuple[int, int]:
+        return self.layout.get_tile_grid(level)
+
+    def get_tile_image(self, level: int, col: int, row: int) -> pyvips.Image:
+        left, top, width, height = self.layout.get_tile_bounds(level, col, row)
+        try:
+            return self._renderer.get_level_image(level).crop(left, top, width, height)
+        except pyvips.Error as e:
+            raise ExtractionError(f"Failed to render DeepZoom tile {level}/{col}_{row}: {e}")
+
+    def get_tile(self, level: int, col: int, row: int) -> bytes:
+        """Encoded tile bytes, identical in size and position to dzsave's {level}/{col}_{row} tile."""
+        return self._renderer.render_tile(level, col, row)
+
+    def close(self):
+        """Release the cached level images; the slide itself is closed by its owner."""
+        self._renderer.clear()
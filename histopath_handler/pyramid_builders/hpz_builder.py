@@ -0,0 +1,230 @@
+from __future__ import annotations
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from histopath_handler._core.models import TissueMask
+from histopath_handler._core.exceptions import ExtractionError, OperationCancelledError
+from histopath_handler._core.constants import (
+    DEFAULT_TILE_SIZE,
+    DEFAULT_TILE_OVERLAP,
+    DEFAULT_JPEG_QUALITY,
+    DEFAULT_DEEPZOOM_TILE_SUFFIX,
+    HPZ_META_JSON_FILENAME,
+    HPZ_ZIP_STORED,
+    METRIC_STAGE_ZIP
+)
+from histopath_handler._core.metrics import measure_stage
+from histopath_handler._core.utils import LazyModule, raise_if_cancelled
+from .deepzoom_renderer import DeepZoomRenderer
+from .build_checkpoint import BuildCheckpoint
+
+zipfile = LazyModule("zipfile")
+
+logger = logging.getLogger(__name__)
+
+
+class HpzArchiveWriter:
+    """
+    Writes HPZ members straight into the zip. Tiles and other already-compressed images
+    are stored; only small text members (DZI descriptor, meta.json) are deflated.
+    The archive is written under a temporary name and renamed into place on close.
+    """
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self._temp_path = f"{output_path}.tmp"
+        self._zip = zipfile.ZipFile(self._temp_path, 'w', allowZip64=True)
+        self._date_time = time.localtime()[:6]
+
+    def write_member(self, arcname: str, data: bytes, compress: bool = False, compress_type: Optional[int] = None):
+        info = zipfile.ZipInfo(arcname, date_time=self._date_time)
+        if compress_type is None:
+            compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        info.compress_type = compress_type
+        info.external_attr = 0o644 << 16
+        with measure_stage(METRIC_STAGE_ZIP, self.output_path) as metric:
+            self._zip.writestr(info, data)
+            metric.bytes = len(data)
+
+    def write_text(self, arcname: str, text: str):
+        self.write_member(arcname, text.encode("utf-8"), compress=True)
+
+    def close(self):
+        self._zip.close()
+        os.replace(self._temp_path, self.output_path)
+
+    def abort(self):
+        self._zip.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+
+class HpzBuilder:
+    """
+    Builds an HPZ archive (DZI descriptor, DeepZoom tiles, meta.json and an optional
+    thumbnail) in a single pass, without an intermediate DeepZoom directory.
+    Tiles of each row are encoded concurrently on `workers` threads and written in order.
+
+    With a `checkpoint_dir`, every finished row is also kept in a `BuildCheckpoint`. A
+    rerun with the same parameters reuses those rows, renders only the missing ones and
+    repacks the archive; the checkpoint is removed once the archive is complete.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self._workers = workers if workers else os.cpu_count() or 1
+
+    def build_hpz_archive(self,
+                          image_object: Any,
+                          output_path: str,
+                          basename: str,
+                          tile_size: int = DEFAULT_TILE_SIZE,
+                          overlap: int = DEFAULT_TILE_OVERLAP,
+                          suffix: str = DEFAULT_DEEPZOOM_TILE_SUFFIX,
+                          quality: int = DEFAULT_JPEG_QUALITY,
+                          angle: int = 0,
+                          background: Optional[Tuple[float, ...]] = None,
+                          meta_data: Optional[Dict[str, Any]] = None,
+                          thumbnail: Optional[bytes] = None,
+                          tissue_mask: Optional[TissueMask] = None,
+                          checkpoint_dir: Optional[str] = None,
+                          checkpoint_key: Optional[Dict[str, Any]] = None,
+                          cancel_event: Optional[threading.Event] = None
+                          ) -> str:
+
+        renderer = DeepZoomRenderer(
+            image_object,
+            tile_size=tile_size,
+            overlap=overlap,
+            suffix=suffix,
+            quality=quality,
+            angle=angle,
+            background=background,
+            tissue_mask=tissue_mask
+        )
+        layout = renderer.layout
+
+        checkpoint = None
+        if checkpoint_dir is not None:
+            # checkpoint_key identifies the source (path, size, mtime, tissue mask) for the caller
+            checkpoint = BuildCheckpoint(checkpoint_dir, {
+                "basename": basename,
+                "width": layout.width,
+                "height": layout.height,
+                "tile_size": tile_size,
+                "overlap": overlap,
+                "suffix": renderer.save_suffix, # includes codec options such as effort
+                "quality": quality,
+                "angle": angle,
+                "background": list(background) if background is not None else None,
+                **(checkpoint_key or {})
+            })
+
+        try:
+            if checkpoint is not None:
+                done = checkpoint.open()
+                if done:
+                    logger.info("Resuming HPZ build from %s: %d rows already rendered.", checkpoint_dir, done)
+            writer = HpzArchiveWriter(output_path)
+        except OSError as e:
+            if checkpoint is not None:
+                checkpoint.close()
+            raise ExtractionError(f"Failed to create HPZ archive {output_path}: {e}")
+
+        try:
+            writer.write_text(layout.get_dzi_name(basename), layout.get_dzi_xml())
+
+            with ThreadPoolExecutor(max_workers=self._workers) as executor:
+                for level in range(layout.level_count):
+                    _, rows = layout.get_tile_grid(level)
+                    for row in range(rows):
+                        # Checked between rows, so finished rows stay in the checkpoint
+                        raise_if_cancelled(cancel_event, "HPZ archive build")
+                        for col, data in enumerate(self._get_row_tiles(renderer, checkpoint, level, row, executor)):
+                            writer.write_member(layout.get_tile_name(basename, level, col, row), data)
+
+            if thumbnail is not None:
+                writer.write_member(f"{basename}_thumb.jpg", thumbnail)
+
+            writer.write_text(HPZ_META_JSON_FILENAME, json.dumps(meta_data or {}, indent=4))
+            writer.close()
+        except (ExtractionError, OperationCancelledError):
+            writer.abort()
+            raise
+        except Exception as e:
+            writer.abort()
+            raise ExtractionError(f"Failed to create HPZ archive: {e}") from e
+        finally:
+            # Keep the checkpoint of a failed build so the next run can resume it
+            if checkpoint is not None:
+                checkpoint.close()
+
+        if checkpoint is not None:
+            checkpoint.remove()
+        return output_path
+
+    def _get_row_tiles(self,
+                       renderer: DeepZoomRenderer,
+                       checkpoint: Optional[BuildCheckpoint],
+                       level: int,
+                       row: int,
+                       executor: ThreadPoolExecutor) -> List[bytes]:
+        if checkpoint is not None and checkpoint.is_row_done(level, row):
+            tiles = checkpoint.load_row(level, row)
+            if tiles is not None:
+                return tiles
+
+        tiles = [data for _, data in renderer.render_row(level, row, executor)]
+        if checkpoint is not None:
+            checkpoint.record_row(level, row, tiles)
+        return tiles
+
+    def pack_deepzoom_directory(self,
+                                deepzoom_base_path: str,
+                                output_path: str,
+                                meta_data: Optional[Dict[str, Any]] = None,
+                                thumbnail: Optional[bytes] = None,
+                                tile_compression: int = HPZ_ZIP_STORED
+                                ) -> str:
+        """
+        Pack an existing `{base}.dzi` + `{base}_files/` tree (e.g. from `dzsave`) into an
+        HPZ archive. Tiles are stored by default: they are already compressed images.
+        """
+        dzi_path = f"{deepzoom_base_path}.dzi"
+        files_dir = f"{deepzoom_base_path}_files"
+        if not os.path.isfile(dzi_path) or not os.path.isdir(files_dir):
+            raise FileNotFoundError(f"DeepZoom output not found at: {dzi_path} / {files_dir}")
+
+        basename = os.path.basename(deepzoom_base_path)
+        try:
+            writer = HpzArchiveWriter(output_path)
+        except OSError as e:
+            raise ExtractionError(f"Failed to create HPZ archive {output_path}: {e}")
+
+        try:
+            with open(dzi_path, 'r', encoding="utf-8") as file:
+                writer.write_text(f"{basename}.dzi", file.read())
+
+            # Levels in numeric order so the archive reads front to back like a built one
+            level_dirs = sorted((entry for entry in os.listdir(files_dir) if entry.isdigit()), key=int)
+            for level in level_dirs:
+                level_dir = os.path.join(files_dir, level)
+                for tile_name in sorted(os.listdir(level_dir)):
+                    with open(os.path.join(level_dir, tile_name), 'rb') as file:
+                        writer.write_member(f"{basename}_files/{level}/{tile_name}", file.read(),
+                                            compress_type=tile_compression)
+
+            if thumbnail is not None:
+                writer.write_member(f"{basename}_thumb.jpg", thumbnail)
+
+            writer.write_text(HPZ_META_JSON_FILENAME, json.dumps(meta_data or {}, indent=4))
+            writer.close()
+        except Exception as e:
+            writer.abort()
+            raise ExtractionError(f"Failed to pack HPZ archive from {deepzoom_base_path}: {e}") from e
+
+        return output_path
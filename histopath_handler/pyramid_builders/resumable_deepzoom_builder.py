@@ -0,0 +1,146 @@
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from histopath_handler._core.interfaces import IPyramidBuilder
+from histopath_handler._core.models import TissueMask
+from histopath_handler._core.exceptions import ExtractionError, UnsupportedOperationError, OperationCancelledError
+from histopath_handler._core.constants import (
+    DEFAULT_TILE_SIZE,
+    DEFAULT_TILE_OVERLAP,
+    DEFAULT_JPEG_QUALITY,
+    DEFAULT_VIPS_COMPRESSION_METHOD,
+    DEFAULT_DEEPZOOM_TILE_SUFFIX,
+    CHECKPOINT_DIR_SUFFIX,
+    METRIC_STAGE_WRITE
+)
+from histopath_handler._core.metrics import measure_stage
+from histopath_handler._core.utils import raise_if_cancelled
+from .deepzoom_renderer import DeepZoomRenderer
+from .build_checkpoint import BuildCheckpoint
+
+logger = logging.getLogger(__name__)
+
+
+class ResumableDeepZoomBuilder(IPyramidBuilder):
+    """
+    Writes the same `{output_path}.dzi` + `{output_path}_files/` tree as `DeepZoomBuilder`,
+    row by row, recording finished rows in a `BuildCheckpoint` at
+    `{output_path}.checkpoint`. Tiles already on disk are the checkpoint's payload, so a
+    rerun with the same parameters only renders the missing rows. The .dzi is written
+    last and the checkpoint removed, so a descriptor on disk means a complete pyramid.
+
+    Only the 'fs' container is supported; `compression_method` and `centre` are dzsave
+    options and are ignored.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self._workers = workers if workers else os.cpu_count() or 1
+
+    def build_deepzoom_pyramid(self,
+                               image_object: Any, # pyvips.Image or an ISlideHandle
+                               output_path: str,
+                               tile_size: int = DEFAULT_TILE_SIZE,
+                               overlap: int = DEFAULT_TILE_OVERLAP,
+                               suffix: str = DEFAULT_DEEPZOOM_TILE_SUFFIX,
+                               quality: int = DEFAULT_JPEG_QUALITY,
+                               angle: int = 0,
+                               container: str = 'fs',
+                               compression_method: int = DEFAULT_VIPS_COMPRESSION_METHOD,
+                               background: Optional[Tuple[float, ...]] = None,
+                               centre: bool = False,
+                               tissue_mask: Optional[TissueMask] = None,
+                               checkpoint_key: Optional[Dict[str, Any]] = None,
+                               cancel_event: Optional[threading.Event] = None
+                               ) -> str:
+
+        if container != 'fs':
+            raise UnsupportedOperationError(f"Resumable DeepZoom builds only support the 'fs' container, not '{container}'.")
+
+        renderer = DeepZoomRenderer(
+            image_object,
+            tile_size=tile_size,
+            overlap=overlap,
+            suffix=suffix,
+            quality=quality,
+            angle=angle,
+            background=background,
+            tissue_mask=tissue_mask
+        )
+        layout = renderer.layout
+        output_dir, basename = os.path.split(output_path)
+
+        checkpoint_dir = f"{output_path}{CHECKPOINT_DIR_SUFFIX}"
+        checkpoint = BuildCheckpoint(checkpoint_dir, {
+            "basename": basename,
+            "width": layout.width,
+            "height": layout.height,
+            "tile_size": tile_size,
+            "overlap": overlap,
+            "suffix": renderer.save_suffix, # includes codec options such as effort
+            "quality": quality,
+            "angle": angle,
+            "background": list(background) if background is not None else None,
+            **(checkpoint_key or {})
+        })
+
+        logger.info("Building DeepZoom pyramid to: %s (resumable)", output_path)
+        try:
+            done = checkpoint.open()
+            if done:
+                logger.info("Resuming DeepZoom build from %s: %d rows already rendered.", checkpoint_dir, done)
+
+            with ThreadPoolExecutor(max_workers=self._workers) as executor:
+                for level in range(layout.level_count):
+                    os.makedirs(os.path.join(output_dir, f"{basename}_files", str(level)), exist_ok=True)
+                    _, rows = layout.get_tile_grid(level)
+                    for row in range(rows):
+                        if checkpoint.is_row_done(level, row):
+                            continue
+                        # Checked between rows; a rerun resumes after the last finished row
+                        raise_if_cancelled(cancel_event, "DeepZoom pyramid build")
+                        tiles = renderer.render_row(level, row, executor)
+                        tile_paths = [os.path.join(output_dir, layout.get_tile_name(basename, level, col, row))
+                                      for col, _ in tiles]
+                        list(executor.map(self._write_tile, tile_paths, [data for _, data in tiles]))
+                        # Tiles must be durable before the journal line, the row's commit point
+                        self._sync_row(tile_paths)
+                        checkpoint.record_row(level, row)
+
+            with open(os.path.join(output_dir, layout.get_dzi_name(basename)), 'w', encoding="utf-8") as file:
+                file.write(layout.get_dzi_xml())
+        except (ExtractionError, OperationCancelledError):
+            raise
+        except Exception as e:
+            raise ExtractionError(f"Failed to build DeepZoom pyramid: {e}") from e
+        finally:
+            checkpoint.close()
+
+        checkpoint.remove()
+        return output_path
+
+    @staticmethod
+    def _write_tile(path: str, data: bytes):
+        with measure_stage(METRIC_STAGE_WRITE, path) as metric:
+            with open(path, 'wb') as file:
+                file.write(data)
+            metric.bytes = len(data)
+
+    @staticmethod
+    def _sync_row(tile_paths: List[str]):
+        # One pass per row once every tile is written, so writeback of the whole row is
+        # already under way when the first fsync waits; the directory holds the new names
+        for path in tile_paths:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        if tile_paths and hasattr(os, "O_DIRECTORY"):
+            fd = os.open(os.path.dirname(tile_paths[0]), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
@@ -0,0 +1,147 @@
+from __future__ import annotations
+import os
+import logging
+import threading
+from typing import Any, Optional
+from xml.sax.saxutils import quoteattr
+
+from histopath_handler._core.interfaces import ISlideHandle
+from histopath_handler._core.exceptions import ExtractionError
+from histopath_handler._core.constants import (
+    DEFAULT_TIFF_TILE_SIZE,
+    DEFAULT_TIFF_COMPRESSION,
+    DEFAULT_JPEG_QUALITY,
+    TIFF_COMPRESSIONS,
+    TIFF_QUALITY_COMPRESSIONS,
+    TIFF_BIGTIFF_MIN_BYTES,
+    METRIC_STAGE_PYRAMID
+)
+from histopath_handler._core.metrics import measure_stage
+from histopath_handler._core.utils import LazyModule, stop_on_cancel, raise_if_cancelled
+
+pyvips = LazyModule("pyvips")
+
+logger = logging.getLogger(__name__)
+
+
+OME_XML_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<OME xmlns="http://www.openmicroscopy.org/Schemas/OME/2016-06"
+     xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+     xsi:schemaLocation="http://www.openmicroscopy.org/Schemas/OME/2016-06 http://www.openmicroscopy.org/Schemas/OME/2016-06/ome.xsd">
+  <Image ID="Image:0" Name={name}>
+    <Pixels DimensionOrder="XYCZT" ID="Pixels:0" Interleaved="true" SizeC="{bands}" SizeT="1" SizeX="{width}" SizeY="{height}" SizeZ="1" Type="uint8"{physical_size}>
+      <Channel ID="Channel:0:0" SamplesPerPixel="{bands}"><LightPath/></Channel>
+      <TiffData IFD="0" PlaneCount="1"/>
+    </Pixels>
+  </Image>
+</OME>"""
+
+
+class TiledTiffPyramidBuilder:
+    """
+    Writes an image as a tiled, multi-resolution TIFF in one libvips pass: level 0 plus
+    halvings down to a single tile, each stored as tiles of `tile_size`. Flat TIFF, PNG
+    and JPEG inputs have no stored levels, so converting them once makes every later
+    reduced-resolution read cheap. With `ome=True` the reduced levels are written as
+    SubIFDs under an OME-XML description (OME-TIFF), as Bio-Formats and QuPath expect.
+
+    The file is written next to `output_path` and moved into place when complete.
+    """
+
+    def build_tiff_pyramid(self,
+                           image_object: Any, # pyvips.Image or an ISlideHandle
+                           output_path: str,
+                           tile_size: int = DEFAULT_TIFF_TILE_SIZE,
+                           compression: str = DEFAULT_TIFF_COMPRESSION,
+                           quality: int = DEFAULT_JPEG_QUALITY,
+                           bigtiff: Optional[bool] = None, # None: decide from the uncompressed size
+                           ome: bool = False,
+                           mpp_x: Optional[float] = None,
+                           mpp_y: Optional[float] = None,
+                           name: Optional[str] = None,
+                           cancel_event: Optional[threading.Event] = None
+                           ) -> str:
+
+        if compression not in TIFF_COMPRESSIONS:
+            raise ValueError(f"Unsupported TIFF compression: {compression}. "
+                             f"Supported compressions are: {', '.join(TIFF_COMPRESSIONS)}.")
+        if tile_size <= 0 or tile_size % 16:
+            raise ValueError(f"Invalid TIFF tile size: {tile_size}. Must be a positive multiple of 16.")
+
+        # The pyramid is rebuilt from full resolution, like dzsave does
+        if isinstance(image_object, ISlideHandle):
+            image_object = image_object.get_level_image(0)
+
+        if bigtiff is None:
+            bigtiff = image_object.width * image_object.height * image_object.bands >= TIFF_BIGTIFF_MIN_BYTES
+
+        logger.info("Building %s pyramid to: %s (%s, %d px tiles%s)", "OME-TIFF" if ome else "tiled TIFF",
+                    output_path, compression, tile_size, ", BigTIFF" if bigtiff else "")
+
+        temp_path = f"{output_path}.tmp{os.path.splitext(output_path)[1]}"
+        try:
+            image = self._prepare_image(image_object, compression)
+
+            tiffsave_options = {
+                'tile': True,
+                'tile_width': tile_size,
+                'tile_height': tile_size,
+                'pyramid': True,
+                'compression': compression,
+                'bigtiff': bigtiff,
+                'subifd': ome,
+            }
+            if compression in TIFF_QUALITY_COMPRESSIONS:
+                tiffsave_options['Q'] = quality
+            if mpp_x and mpp_y:
+                # libvips resolution is in pixels per millimetre
+                tiffsave_options['xres'] = 1000.0 / mpp_x
+                tiffsave_options['yres'] = 1000.0 / mpp_y
+                tiffsave_options['resunit'] = 'cm'
+            if ome:
+                image = image.copy()
+                image.set_type(pyvips.GValue.gstr_type, "image-description",
+                               self._get_ome_xml(image, mpp_x, mpp_y, name))
+            # Setting cancel_event stops tiffsave at its next progress update
+            image = stop_on_cancel(image, cancel_event)
+
+            with measure_stage(METRIC_STAGE_PYRAMID, output_path) as metric:
+                image.tiffsave(temp_path, **tiffsave_options)
+                metric.pixels = image.width * image.height
+                metric.bytes = os.path.getsize(temp_path)
+            os.replace(temp_path, output_path)
+            return output_path
+
+        except pyvips.Error as e:
+            raise_if_cancelled(cancel_event, "Tiled TIFF pyramid build")
+            raise ExtractionError(f"Failed to build tiled TIFF pyramid: {str(e)}") from e
+        except Exception as e:
+            raise ExtractionError(f"An unexpected error occurred while building tiled TIFF pyramid: {str(e)}") from e
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _prepare_image(self, image: pyvips.Image, compression: str) -> pyvips.Image:
+        if image.format != 'uchar':
+            image = image.cast('uchar')
+        # JPEG in TIFF has no alpha channel
+        if compression == "jpeg" and image.hasalpha():
+            image = image.flatten(background=[255] * (image.bands - 1))
+        return image
+
+    def _get_ome_xml(self,
+                     image: pyvips.Image,
+                     mpp_x: Optional[float],
+                     mpp_y: Optional[float],
+                     name: Optional[str]) -> str:
+        physical_size = ""
+        if mpp_x and mpp_y:
+            physical_size = (f' PhysicalSizeX="{mpp_x}" PhysicalSizeXUnit="µm"'
+                             f' PhysicalSizeY="{mpp_y}" PhysicalSizeYUnit="µm"')
+        return OME_XML_TEMPLATE.format(
+            name=quoteattr(name or "Image"),
+            bands=image.bands,
+            width=image.width,
+            height=image.height,
+            physical_size=physical_size
+        )
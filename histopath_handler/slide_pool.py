@@ -0,0 +1,175 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from histopath_handler.histopath_handler import HistopathHandler
+from histopath_handler._core.constants import DEFAULT_SLIDE_POOL_MAX_OPEN
+
+
+class _PoolEntry:
+    def __init__(self):
+        self.handler: Optional[HistopathHandler] = None
+        self.refcount = 0
+        self.error: Optional[BaseException] = None
+        self.ready = threading.Event()
+
+
+class SlidePool:
+    """
+    Thread-safe LRU pool of open `HistopathHandler`s, one per slide path.
+
+    `acquire` returns a shared handler and pins it; `release` unpins it. Only unpinned
+    handlers are evicted (via `HistopathHandler.close`) once more than `max_open` slides
+    are open, so the pool can temporarily exceed `max_open` while every handler is in use.
+    Concurrent first requests for the same slide wait for a single open.
+
+    `on_close(path, handler)` is called just before the pool closes a handler, so state
+    built on top of it (tile sources, caches) can be dropped with it.
+    """
+
+    def __init__(self,
+                 max_open: int = DEFAULT_SLIDE_POOL_MAX_OPEN,
+                 handler_factory: Callable[[str], HistopathHandler] = HistopathHandler,
+                 on_close: Optional[Callable[[str, HistopathHandler], None]] = None):
+        if max_open <= 0:
+            raise ValueError("max_open must be positive.")
+
+        self._max_open = max_open
+        self._handler_factory = handler_factory
+        self._on_close = on_close
+        self._entries: "OrderedDict[str, _PoolEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.realpath(file_path)
+
+    def acquire(self, file_path: str) -> HistopathHandler:
+        key = self._key(file_path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            is_opener = entry is None
+            if is_opener:
+                entry = _PoolEntry()
+                self._entries[key] = entry
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            entry.refcount += 1
+
+        if is_opener:
+            # Open outside the pool lock so slow storage does not block other slides
+            try:
+                entry.handler = self._handler_factory(file_path)
+            except BaseException as e:
+                entry.error = e
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+                entry.ready.set()
+                raise
+            entry.ready.set()
+            self._close_handlers(self._evict_idle())
+        else:
+            entry.ready.wait()
+            if entry.error is not None:
+                raise entry.error
+
+        return entry.handler
+
+    def release(self, file_path: str):
+        key = self._key(file_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.refcount == 0:
+                raise ValueError(f"Slide '{file_path}' is not acquired from this pool.")
+            entry.refcount -= 1
+            evicted = self._evict_idle_locked()
+        self._close_handlers(evicted)
+
+    @contextmanager
+    def open(self, file_path: str) -> Iterator[HistopathHandler]:
+        handler = self.acquire(file_path)
+        try:
+            yield handler
+        finally:
+            self.release(file_path)
+
+    def _evict_idle(self) -> List[Tuple[str, HistopathHandler]]:
+        with self._lock:
+            return self._evict_idle_locked()
+
+    def _evict_idle_locked(self) -> List[Tuple[str, HistopathHandler]]:
+        evicted = []
+        if len(self._entries) <= self._max_open:
+            return evicted
+
+        for key in list(self._entries.keys()):
+            if len(self._entries) <= self._max_open:
+                break
+            entry = self._entries[key]
+            if entry.refcount == 0 and entry.handler is not None:
+                del self._entries[key]
+                evicted.append((key, entry.handler))
+                self.evictions += 1
+        return evicted
+
+    def _close_handlers(self, handlers: List[Tuple[str, HistopathHandler]]):
+        for key, handler in handlers:
+            if self._on_close is not None:
+                self._on_close(key, handler)
+            handler.close()
+
+    def clear(self):
+        """Close every idle handler. Pinned handlers stay open until released."""
+        with self._lock:
+            idle = [key for key, entry in self._entries.items()
+                    if entry.refcount == 0 and entry.handler is not None]
+            handlers = [(key, self._entries.pop(key).handler) for key in idle]
+        self._close_handlers(handlers)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "open": len(self._entries),
+                "in_use": sum(1 for entry in self._entries.values() if entry.refcount > 0),
+                "max_open": self._max_open,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+_default_pool: Optional[SlidePool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_slide_pool() -> SlidePool:
+    """Return the process-wide pool, creating it on first use."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = SlidePool()
+        return _default_pool
+
+
+def configure_default_slide_pool(max_open: int = DEFAULT_SLIDE_POOL_MAX_OPEN) -> SlidePool:
+    """Replace the process-wide pool, closing the idle handlers of the previous one."""
+    global _default_pool
+    with _default_pool_lock:
+        previous, _default_pool = _default_pool, SlidePool(max_open=max_open)
+    if previous is not None:
+        previous.clear()
+    return _default_pool
@@ -0,0 +1,514 @@
+import os
+import re
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from histopath_handler._core.models import Region
+from histopath_handler._core.exceptions import HistopathFileHandlerError, InvalidRegionError
+from histopath_handler._core.codecs import split_suffix
+from histopath_handler._core.constants import (
+    DEFAULT_TILE_SIZE,
+    DEFAULT_TILE_OVERLAP,
+    DEFAULT_JPEG_QUALITY,
+    DEFAULT_DEEPZOOM_TILE_SUFFIX,
+    DEFAULT_SLIDE_POOL_MAX_OPEN,
+    HPZ_FILE_EXTENSION,
+    DEFAULT_SERVER_HOST,
+    DEFAULT_SERVER_PORT,
+    DEFAULT_SERVER_CACHE_MAX_AGE,
+    MAX_SERVER_THUMBNAIL_WIDTH,
+    MAX_SERVER_REGION_PIXELS,
+    SLIDE_FILE_EXTENSIONS
+)
+from histopath_handler.file_loaders.hpz_reader import HpzReader
+from histopath_handler.file_loaders.thumbnail_cache import ThumbnailCache
+from histopath_handler.pyramid_builders.deepzoom_tile_source import DeepZoomTileSource
+from histopath_handler.slide_pool import SlidePool
+
+
+CONTENT_TYPES = {
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "tif": "image/tiff",
+    "tiff": "image/tiff",
+    "webp": "image/webp",
+    "avif": "image/avif",
+    "jxl": "image/jxl",
+    "dzi": "application/xml",
+    "json": "application/json",
+}
+
+HTTP_REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+TILE_PATH = re.compile(r"^/slides/(?P<name>.+)_files/(?P<level>\d+)/(?P<col>\d+)_(?P<row>\d+)\.(?P<format>\w+)$")
+DZI_PATH = re.compile(r"^/slides/(?P<name>.+)\.dzi$")
+THUMBNAIL_PATH = re.compile(r"^/slides/(?P<name>.+)/thumbnail\.(?P<format>jpg|png)$")
+REGION_PATH = re.compile(r"^/slides/(?P<name>.+)/region\.(?P<format>jpg|png|tif|webp|avif|jxl)$")
+
+logger = logging.getLogger(__name__)
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class _HpzEntry:
+    """An open archive, the (size, mtime_ns) it was opened at and the requests reading it."""
+
+    def __init__(self, version: Tuple[int, int], reader: HpzReader):
+        self.version = version
+        self.reader = reader
+        self.users = 0
+        self.superseded = False
+
+
+class TileServer:
+    """
+    Local asyncio HTTP server for a directory of slides and .hpz archives.
+
+    Routes (GET/HEAD):
+        /slides                                      JSON catalog
+        /slides/{name}.dzi                           DeepZoom descriptor
+        /slides/{name}_files/{level}/{col}_{row}.jpg DeepZoom tile
+        /slides/{name}/thumbnail.jpg?max_width=500   thumbnail
+        /slides/{name}/region.png?left=&top=&width=&height=&level=0
+
+    `.hpz` archives are served from their stored tiles; slides are rendered on demand
+    through a shared `SlidePool`. Rendering runs on a thread pool, identical in-flight
+    requests share one render, and responses carry ETag/Cache-Control headers.
+    """
+
+    def __init__(self,
+                 root_dir: str,
+                 host: str = DEFAULT_SERVER_HOST,
+                 port: int = DEFAULT_SERVER_PORT,
+                 workers: Optional[int] = None,
+                 tile_size: int = DEFAULT_TILE_SIZE,
+                 overlap: int = DEFAULT_TILE_OVERLAP,
+                 suffix: str = DEFAULT_DEEPZOOM_TILE_SUFFIX,
+                 quality: int = DEFAULT_JPEG_QUALITY,
+                 effort: Optional[int] = None,
+                 max_open_slides: int = DEFAULT_SLIDE_POOL_MAX_OPEN,
+                 cache_max_age: int = DEFAULT_SERVER_CACHE_MAX_AGE,
+                 thumbnail_cache: Optional[ThumbnailCache] = None):
+        if not os.path.isdir(root_dir):
+            raise FileNotFoundError(f"Slide directory not found at: {root_dir}")
+
+        self.root_dir = root_dir
+        self.host = host
+        self.port = port
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.suffix = suffix
+        self.quality = quality
+        self.effort = effort
+        self.cache_max_age = cache_max_age
+        # Keeps slide thumbnails across restarts; a hit does not open the slide
+        self._thumbnail_cache = thumbnail_cache
+
+        self._executor = ThreadPoolExecutor(max_workers=workers if workers else os.cpu_count() or 1)
+        # Tile sources live as long as their pooled handler, so max_open bounds both
+        self._slide_pool = SlidePool(max_open=max_open_slides, on_close=self._drop_tile_sources)
+        self._tile_sources: Dict[str, Tuple[Any, DeepZoomTileSource]] = {}
+        # Current reader of each archive; reopened when the file changes
+        self._hpz_readers: Dict[str, _HpzEntry] = {}
+        self._sources_lock = threading.Lock()
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    # --- catalog ---
+
+    def _scan_slides(self) -> Dict[str, str]:
+        """Map slide names (file stems) to paths; a prebuilt .hpz wins over its source slide."""
+        slides: Dict[str, str] = {}
+        for entry in sorted(os.listdir(self.root_dir)):
+            path = os.path.join(self.root_dir, entry)
+            stem, ext = os.path.splitext(entry)
+            if not os.path.isfile(path):
+                continue
+            if ext.lower() == HPZ_FILE_EXTENSION:
+                slides[stem] = path
+            elif ext.lower() in SLIDE_FILE_EXTENSIONS and stem not in slides:
+                slides[stem] = path
+        return slides
+
+    def _resolve(self, name: str) -> str:
+        name = unquote(name)
+        if "/" in name or "\\" in name or name.startswith("."):
+            raise HttpError(404, f"Unknown slide '{name}'.")
+
+        hpz_path = os.path.join(self.root_dir, f"{name}{HPZ_FILE_EXTENSION}")
+        if os.path.isfile(hpz_path):
+            return hpz_path
+        for ext in SLIDE_FILE_EXTENSIONS:
+            path = os.path.join(self.root_dir, f"{name}{ext}")
+            if os.path.isfile(path):
+                return path
+        raise HttpError(404, f"Unknown slide '{name}'.")
+
+    @staticmethod
+    def _is_hpz(path: str) -> bool:
+        return path.lower().endswith(HPZ_FILE_EXTENSION)
+
+    # --- blocking work, run on the executor ---
+
+    @staticmethod
+    def _stat_key(path: str) -> Tuple[int, int]:
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _acquire_version(self, path: str) -> Tuple[Tuple[int, int], Optional[_HpzEntry]]:
+        """
+        (size, mtime_ns) of the file a request is served from, plus for archives the pinned
+        reader of that version; the ETag and the body both come from this one lookup.
+        Release the entry with `_release_hpz_entry` once the body is rendered.
+        """
+        version = self._stat_key(path)
+        if not self._is_hpz(path):
+            return version, None
+
+        with self._sources_lock:
+            entry = self._hpz_readers.get(path)
+            if entry is not None and entry.version == version:
+                entry.users += 1
+                return version, entry
+
+        # Opened outside the lock so other requests are not held up
+        reader = HpzReader(path)
+        superseded = None
+        with self._sources_lock:
+            entry = self._hpz_readers.get(path)
+            if entry is not None and entry.version == version:
+                entry.users += 1
+            else:
+                # A replaced archive (written, then renamed over) gets a new reader; the old
+                # one is closed once the requests still reading from it are done
+                if entry is not None:
+                    entry.superseded = True
+                    if entry.users == 0:
+                        superseded = entry
+                entry = _HpzEntry(version, reader)
+                entry.users = 1
+                self._hpz_readers[path] = entry
+                reader = None
+        if reader is not None:
+            reader.close()
+        if superseded is not None:
+            superseded.reader.close()
+        return version, entry
+
+    def _release_hpz_entry(self, entry: _HpzEntry):
+        with self._sources_lock:
+            entry.users -= 1
+            close = entry.superseded and entry.users == 0
+        if close:
+            entry.reader.close()
+
+    def _get_tile_source(self, handler: Any, path: str) -> DeepZoomTileSource:
+        # The pool may have reopened the slide since the source was built
+        with self._sources_lock:
+            cached = self._tile_sources.get(path)
+            if cached is not None and cached[0] is handler:
+                return cached[1]
+            source = handler.get_deepzoom_tile_source(
+                self.tile_size, self.overlap, self.suffix, self.quality, effort=self.effort
+            )
+            self._tile_sources[path] = (handler, source)
+        if cached is not None:
+            cached[1].close()
+        return source
+
+    def _drop_tile_sources(self, key: str, handler: Any):
+        # Called by the pool before it closes `handler`
+        with self._sources_lock:
+            paths = [path for path, (owner, _) in self._tile_sources.items() if owner is handler]
+            dropped = [self._tile_sources.pop(path)[1] for path in paths]
+        for source in dropped:
+            source.close()
+
+    def _render_dzi(self, path: str, reader: Optional[HpzReader]) -> bytes:
+        if reader is not None:
+            return reader.get_dzi().encode("utf-8")
+        with self._slide_pool.open(path) as handler:
+            return self._get_tile_source(handler, path).get_dzi().encode("utf-8")
+
+    @staticmethod
+    def _check_tile_format(requested: str, available: str):
+        # Tiles are served as stored or configured, never transcoded; jpg and jpeg are one format
+        if CONTENT_TYPES.get(requested.lower()) != CONTENT_TYPES.get(available.lstrip('.').lower()):
+            raise HttpError(404, f"Tiles of this slide are '{available.lstrip('.')}', not '{requested}'.")
+
+    def _render_tile(self,
+                     path: str,
+                     reader: Optional[HpzReader],
+                     level: int,
+                     col: int,
+                     row: int,
+                     tile_format: str) -> bytes:
+        if reader is not None:
+            self._check_tile_format(tile_format, reader.layout.suffix)
+            return reader.get_tile(level, col, row)
+        self._check_tile_format(tile_format, split_suffix(self.suffix)[0])
+        with self._slide_pool.open(path) as handler:
+            return self._get_tile_source(handler, path).get_tile(level, col, row)
+
+    def _render_thumbnail(self, path: str, reader: Optional[HpzReader], max_width: int, output_format: str) -> bytes:
+        if reader is not None:
+            thumbnail = reader.get_thumbnail()
+            if thumbnail is None or output_format != "jpg":
+                raise HttpError(404, "Archive has no thumbnail in the requested format.")
+            return thumbnail
+        if self._thumbnail_cache:
+            thumbnail = self._thumbnail_cache.get(path, max_width)
+            if thumbnail is not None:
+                return thumbnail.write_to_buffer(f".{output_format}")
+        with self._slide_pool.open(path) as handler:
+            thumbnail = handler.get_thumbnail(max_width=max_width)
+            if self._thumbnail_cache:
+                thumbnail = self._thumbnail_cache.put(path, max_width, thumbnail)
+            return thumbnail.write_to_buffer(f".{output_format}")
+
+    def _render_region(self, path: str, reader: Optional[HpzReader], region: Region, output_format: str) -> bytes:
+        if reader is not None:
+            raise HttpError(404, "Region crops are only available for slides, not .hpz archives.")
+        with self._slide_pool.open(path) as handler:
+            return handler.extract_region_buffer(handler.create_region(
+                region.left, region.top, region.width, region.height, region.level
+            ), output_format, self.quality, effort=self.effort)
+
+    def _coalesce(self, key: Tuple, render: Callable[..., bytes], *args) -> asyncio.Future:
+        """Run `render` once for concurrent identical requests; later callers get the same future."""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self._executor, render, *args)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return future
+
+    # --- HTTP ---
+
+    @staticmethod
+    def _etag(path: str, version: Tuple[int, int], resource: str) -> str:
+        size, mtime_ns = version
+        digest = hashlib.sha1(f"{path}:{size}:{mtime_ns}:{resource}".encode("utf-8"))
+        return f'"{digest.hexdigest()}"'
+
+    def _route(self, target: str) -> Tuple[Optional[str], str, Optional[Tuple], Callable[..., bytes], tuple]:
+        """
+        Resolve a request target to (slide path, content type, coalescing key, render, args).
+        Slide renders are called as render(slide path, archive reader or None, *args).
+        Nothing is rendered here so conditional requests can be answered first.
+        """
+        url = urlsplit(target)
+        path, query = url.path, parse_qs(url.query)
+
+        if path in ("/slides", "/slides/"):
+            return None, CONTENT_TYPES["json"], None, self._render_catalog, ()
+
+        match = TILE_PATH.match(path)
+        if match:
+            slide_path = self._resolve(match["name"])
+            level, col, row = int(match["level"]), int(match["col"]), int(match["row"])
+            content_type = CONTENT_TYPES.get(match["format"].lower(), "application/octet-stream")
+            return (slide_path, content_type, ("tile", slide_path, level, col, row, match["format"].lower()),
+                    self._render_tile, (level, col, row, match["format"]))
+
+        match = DZI_PATH.match(path)
+        if match:
+            slide_path = self._resolve(match["name"])
+            return slide_path, CONTENT_TYPES["dzi"], ("dzi", slide_path), self._render_dzi, ()
+
+        match = THUMBNAIL_PATH.match(path)
+        if match:
+            slide_path = self._resolve(match["name"])
+            max_width = min(self._int_param(query, "max_width", 500), MAX_SERVER_THUMBNAIL_WIDTH)
+            return (slide_path, CONTENT_TYPES[match["format"]], ("thumbnail", slide_path, max_width, match["format"]),
+                    self._render_thumbnail, (max_width, match["format"]))
+
+        match = REGION_PATH.match(path)
+        if match:
+            slide_path = self._resolve(match["name"])
+            region = Region(
+                left=self._int_param(query, "left"),
+                top=self._int_param(query, "top"),
+                width=self._int_param(query, "width"),
+                height=self._int_param(query, "height"),
+                level=self._int_param(query, "level", 0)
+            )
+            if region.width * region.height > MAX_SERVER_REGION_PIXELS:
+                raise HttpError(400, f"Region is larger than {MAX_SERVER_REGION_PIXELS} level-0 pixels.")
+            return (slide_path, CONTENT_TYPES[match["format"]], ("region", slide_path, str(region), match["format"]),
+                    self._render_region, (region, match["format"]))
+
+        raise HttpError(404, f"No route for {path}.")
+
+    def _render_catalog(self) -> bytes:
+        catalog = [{"name": name, "type": "hpz" if self._is_hpz(slide_path) else "slide"}
+                   for name, slide_path in self._scan_slides().items()]
+        return json.dumps(catalog).encode("utf-8")
+
+    @staticmethod
+    def _int_param(query: Dict[str, list], name: str, default: Optional[int] = None) -> int:
+        values = query.get(name)
+        if not values:
+            if default is None:
+                raise HttpError(400, f"Missing query parameter '{name}'.")
+            return default
+        try:
+            return int(values[0])
+        except ValueError:
+            raise HttpError(400, f"Query parameter '{name}' must be an integer.")
+
+    def _build_response(self,
+                        status: int,
+                        body: bytes,
+                        content_type: str,
+                        keep_alive: bool,
+                        etag: Optional[str] = None,
+                        include_body: bool = True) -> bytes:
+        headers = [
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, 'Unknown')}",
+            f"Date: {formatdate(usegmt=True)}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if etag is not None:
+            headers.append(f"ETag: {etag}")
+            headers.append(f"Cache-Control: public, max-age={self.cache_max_age}")
+        else:
+            headers.append("Cache-Control: no-cache")
+
+        head = ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1")
+        return head + body if include_body else head
+
+    async def _handle_request(self, method: str, target: str, headers: Dict[str, str], keep_alive: bool) -> bytes:
+        if method not in ("GET", "HEAD"):
+            return self._build_response(405, b"Method not allowed", "text/plain", keep_alive)
+
+        try:
+            slide_path, content_type, key, render, args = self._route(target)
+
+            loop = asyncio.get_running_loop()
+            if slide_path is None:
+                etag = None
+                body = await loop.run_in_executor(self._executor, render, *args)
+            else:
+                # stat, and for archives a possible reopen, stay off the event loop
+                version, entry = await loop.run_in_executor(self._executor, self._acquire_version, slide_path)
+                reader = entry.reader if entry is not None else None
+                future = None
+                try:
+                    etag = self._etag(slide_path, version, target)
+                    if headers.get("if-none-match") == etag:
+                        return self._build_response(304, b"", content_type, keep_alive, etag, include_body=False)
+                    future = self._coalesce(key + (version,), render, slide_path, reader, *args)
+                finally:
+                    if entry is not None:
+                        if future is None:
+                            self._release_hpz_entry(entry)
+                        else:
+                            # Released when the render finishes, even if this client has gone away
+                            future.add_done_callback(lambda _: self._release_hpz_entry(entry))
+                # Shield so one disconnecting client does not cancel the render for the others
+                body = await asyncio.shield(future)
+        except HttpError as e:
+            return self._build_response(e.status, str(e).encode("utf-8"), "text/plain", keep_alive)
+        except (KeyError, IndexError, FileNotFoundError) as e:
+            return self._build_response(404, str(e).encode("utf-8"), "text/plain", keep_alive)
+        except (InvalidRegionError, ValueError) as e:
+            return self._build_response(400, str(e).encode("utf-8"), "text/plain", keep_alive)
+        except HistopathFileHandlerError as e:
+            return self._build_response(500, str(e).encode("utf-8"), "text/plain", keep_alive)
+
+        return self._build_response(200, body, content_type, keep_alive, etag, include_body=method != "HEAD")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").strip().split(" ", 2)
+                except ValueError:
+                    writer.write(self._build_response(400, b"Malformed request line", "text/plain", False))
+                    break
+
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+                writer.write(await self._handle_request(method.upper(), target, headers, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        except Exception as e:
+            try:
+                writer.write(self._build_response(500, str(e).encode("utf-8"), "text/plain", False))
+                await writer.drain()
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    async def start(self) -> asyncio.AbstractServer:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        return self._server
+
+    async def serve_forever(self):
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        self._executor.shutdown(wait=False)
+        with self._sources_lock:
+            for entry in self._hpz_readers.values():
+                entry.reader.close()
+            self._hpz_readers.clear()
+            sources = [source for _, source in self._tile_sources.values()]
+            self._tile_sources.clear()
+        for source in sources:
+            source.close()
+        self._slide_pool.clear()
+
+
+def run_server(root_dir: str, **server_options):
+    """Blocking entry point used by `python -m histopath_handler <dir> serve`."""
+    server = TileServer(root_dir, **server_options)
+    logger.info("Serving slides from '%s' on http://%s:%s/slides", root_dir, server.host, server.port)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
@@ -0,0 +1,129 @@
+from __future__ import annotations
+from typing import Any, Tuple
+
+from histopath_handler._core.interfaces import ITissueDetector, ISlideHandle
+from histopath_handler._core.models import TissueMask
+from histopath_handler._core.exceptions import ExtractionError
+from histopath_handler._core.constants import (
+    DEFAULT_TISSUE_MIN_SATURATION,
+    DEFAULT_TISSUE_MORPHOLOGY_RADIUS
+)
+from histopath_handler._core.utils import LazyModule
+
+pyvips = LazyModule("pyvips")
+np = LazyModule("numpy")
+
+
+def _shifted_windows(mask: np.ndarray, radius: int, fill: bool):
+    height, width = mask.shape
+    padded = np.pad(mask, radius, mode='constant', constant_values=fill)
+    for dy in range(2 * radius + 1):
+        for dx in range(2 * radius + 1):
+            yield padded[dy:dy + height, dx:dx + width]
+
+
+def binary_dilate(mask: np.ndarray, radius: int) -> np.ndarray:
+    result = np.zeros_like(mask)
+    for window in _shifted_windows(mask, radius, False):
+        result |= window
+    return result
+
+
+def binary_erode(mask: np.ndarray, radius: int) -> np.ndarray:
+    result = np.ones_like(mask)
+    for window in _shifted_windows(mask, radius, True):
+        result &= window
+    return result
+
+
+class OtsuTissueDetector(ITissueDetector):
+    """
+    Separates tissue from glass on a thumbnail: Otsu threshold on HSV saturation,
+    followed by a morphological closing (fill holes) and opening (drop specks).
+    Everything runs vectorized on the thumbnail, never on the full slide.
+    """
+
+    def __init__(self,
+                 min_saturation: int = DEFAULT_TISSUE_MIN_SATURATION,
+                 morphology_radius: int = DEFAULT_TISSUE_MORPHOLOGY_RADIUS):
+        self.min_saturation = min_saturation
+        self.morphology_radius = morphology_radius
+
+    def detect_tissue(self, thumbnail: pyvips.Image, width_l0: int, height_l0: int) -> TissueMask:
+        try:
+            rgb = self._thumbnail_to_rgb(thumbnail)
+        except pyvips.Error as e:
+            raise ExtractionError(f"Failed to decode thumbnail for tissue detection: {e}")
+
+        saturation = self._saturation(rgb)
+        threshold = max(self._otsu_threshold(saturation), self.min_saturation)
+        mask = saturation > threshold
+
+        if self.morphology_radius > 0:
+            mask = binary_erode(binary_dilate(mask, self.morphology_radius), self.morphology_radius)
+            mask = binary_dilate(binary_erode(mask, self.morphology_radius), self.morphology_radius)
+
+        return TissueMask(mask=mask, width_l0=width_l0, height_l0=height_l0, threshold=float(threshold))
+
+    def _thumbnail_to_rgb(self, thumbnail: pyvips.Image) -> np.ndarray:
+        if thumbnail.hasalpha():
+            thumbnail = thumbnail.flatten(background=[255, 255, 255])
+        if thumbnail.bands == 1:
+            thumbnail = thumbnail.bandjoin([thumbnail, thumbnail])
+        if thumbnail.format != 'uchar':
+            thumbnail = thumbnail.cast('uchar')
+
+        pixels = np.frombuffer(thumbnail.write_to_memory(), dtype=np.uint8)
+        return pixels.reshape(thumbnail.height, thumbnail.width, thumbnail.bands)[:, :, :3]
+
+    def _saturation(self, rgb: np.ndarray) -> np.ndarray:
+        channel_max = rgb.max(axis=2).astype(np.float32)
+        channel_min = rgb.min(axis=2).astype(np.float32)
+        saturation = (channel_max - channel_min) * 255.0 / np.maximum(channel_max, 1.0)
+        return saturation.astype(np.uint8)
+
+    def _otsu_threshold(self, values: np.ndarray) -> int:
+        histogram = np.bincount(values.ravel(), minlength=256).astype(np.float64)
+        total = histogram.sum()
+        if total == 0:
+            return 0
+
+        levels = np.arange(256, dtype=np.float64)
+        weight_background = np.cumsum(histogram)
+        weight_foreground = total - weight_background
+        cumulative_mean = np.cumsum(histogram * levels)
+        mean_background = cumulative_mean / np.maximum(weight_background, 1)
+        mean_foreground = (cumulative_mean[-1] - cumulative_mean) / np.maximum(weight_foreground, 1)
+
+        between_class_variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        return int(np.argmax(between_class_variance))
+
+
+def apply_tissue_mask(image_object: Any,
+                      tissue_mask: TissueMask,
+                      background: Tuple[int, ...] = (255, 255, 255),
+                      margin: int = 1) -> pyvips.Image:
+    """
+    Replace glass with `background` on the full-resolution image, lazily.
+    libvips' ifthenelse only evaluates the image where the mask is set, so background
+    areas of a DeepZoom build are never decoded and encode as flat tiles.
+    `margin` dilates the mask by that many mask pixels to protect tissue edges.
+    """
+    if isinstance(image_object, ISlideHandle):
+        image_object = image_object.get_level_image(0)
+
+    mask = tissue_mask.mask
+    if margin > 0:
+        mask = binary_dilate(mask, margin)
+
+    mask_height, mask_width = mask.shape
+    mask_u8 = np.ascontiguousarray(mask, dtype=np.uint8) * 255
+    mask_image = pyvips.Image.new_from_memory(mask_u8.tobytes(), mask_width, mask_height, 1, 'uchar')
+    mask_image = mask_image.resize(image_object.width / mask_width,
+                                   vscale=image_object.height / mask_height,
+                                   kernel='nearest')
+    mask_image = mask_image.embed(0, 0, image_object.width, image_object.height, extend='copy')
+
+    background_values = list(background)[:image_object.bands]
+    background_values += [255] * (image_object.bands - len(background_values))
+    return mask_image.ifthenelse(image_object, background_values)
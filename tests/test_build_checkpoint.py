@@ -0,0 +1,168 @@
+"""BuildCheckpoint journal semantics and resuming a row-by-row DeepZoom build."""
+import os
+
+import pytest
+
+from histopath_handler._core.constants import CHECKPOINT_JOURNAL_FILENAME
+from histopath_handler._core.exceptions import ExtractionError
+from histopath_handler.pyramid_builders import resumable_deepzoom_builder
+from histopath_handler.pyramid_builders.build_checkpoint import BuildCheckpoint
+from histopath_handler.pyramid_builders.deepzoom_layout import DeepZoomLayout
+from histopath_handler.pyramid_builders.resumable_deepzoom_builder import ResumableDeepZoomBuilder
+
+PARAMS = {"basename": "slide", "width": 300, "height": 200, "tile_size": 128}
+
+
+@pytest.fixture
+def checkpoint_dir(tmp_path):
+    return str(tmp_path / "slide.checkpoint")
+
+
+def test_fresh_checkpoint_is_empty(checkpoint_dir):
+    with BuildCheckpoint(checkpoint_dir, PARAMS) as checkpoint:
+        assert not checkpoint.is_row_done(0, 0)
+    assert os.path.isdir(checkpoint_dir)
+
+
+def test_recorded_rows_survive_reopen(checkpoint_dir):
+    with BuildCheckpoint(checkpoint_dir, PARAMS) as checkpoint:
+        checkpoint.record_row(3, 0)
+        checkpoint.record_row(3, 1)
+
+    checkpoint = BuildCheckpoint(checkpoint_dir, PARAMS)
+    assert checkpoint.open() == 2
+    assert checkpoint.is_row_done(3, 1)
+    assert not checkpoint.is_row_done(3, 2)
+    checkpoint.close()
+
+
+def test_changed_params_start_over(checkpoint_dir):
+    with BuildCheckpoint(checkpoint_dir, PARAMS) as checkpoint:
+        checkpoint.record_row(0, 0)
+
+    checkpoint = BuildCheckpoint(checkpoint_dir, {**PARAMS, "tile_size": 256})
+    assert checkpoint.open() == 0
+    checkpoint.close()
+
+
+def test_torn_journal_line_is_ignored(checkpoint_dir):
+    with BuildCheckpoint(checkpoint_dir, PARAMS) as checkpoint:
+        checkpoint.record_row(1, 0)
+    # A build killed while appending leaves half a line behind
+    with open(os.path.join(checkpoint_dir, CHECKPOINT_JOURNAL_FILENAME), "a", encoding="utf-8") as journal:
+        journal.write('{"level": 1, "ro')
+
+    checkpoint = BuildCheckpoint(checkpoint_dir, PARAMS)
+    assert checkpoint.open() == 1
+    checkpoint.record_row(1, 1)
+    checkpoint.close()
+
+    checkpoint = BuildCheckpoint(checkpoint_dir, PARAMS)
+    assert checkpoint.open() == 2
+    assert checkpoint.is_row_done(1, 1)
+    checkpoint.close()
+
+
+def test_stored_tiles_round_trip(checkpoint_dir):
+    tiles = [b"first", b"", b"third tile"]
+    with BuildCheckpoint(checkpoint_dir, PARAMS) as checkpoint:
+        checkpoint.record_row(2, 4, tiles)
+        checkpoint.record_row(2, 5)
+
+    with BuildCheckpoint(checkpoint_dir, PARAMS) as checkpoint:
+        assert checkpoint.load_row(2, 4) == tiles
+        assert checkpoint.load_row(2, 5) is None
+
+
+def test_truncated_row_blob_is_not_done(checkpoint_dir):
+    with BuildCheckpoint(checkpoint_dir, PARAMS) as checkpoint:
+        checkpoint.record_row(2, 0, [b"a" * 10, b"b" * 10])
+    blob_path = os.path.join(checkpoint_dir, "rows", "2_0.bin")
+    with open(blob_path, "r+b") as blob:
+        blob.truncate(15)
+
+    checkpoint = BuildCheckpoint(checkpoint_dir, PARAMS)
+    assert checkpoint.open() == 0
+    checkpoint.close()
+
+
+def test_remove(checkpoint_dir):
+    with BuildCheckpoint(checkpoint_dir, PARAMS) as checkpoint:
+        checkpoint.record_row(0, 0)
+    checkpoint.remove()
+
+    assert not os.path.exists(checkpoint_dir)
+    assert not checkpoint.is_row_done(0, 0)
+
+
+class FakeRenderer:
+    """Stands in for DeepZoomRenderer: real layout, tiles named after their position."""
+
+    rendered = []
+    fail_at = None
+
+    def __init__(self, image_object, tile_size, overlap, suffix, quality, angle, background, tissue_mask):
+        self.layout = DeepZoomLayout(image_object[0], image_object[1], tile_size, overlap, suffix)
+        self.save_suffix = f"{suffix}[Q={quality}]"
+
+    def render_row(self, level, row, executor=None):
+        if (level, row) == FakeRenderer.fail_at:
+            raise RuntimeError("decoder crashed")
+        FakeRenderer.rendered.append((level, row))
+        columns, _ = self.layout.get_tile_grid(level)
+        return [(col, f"{level}/{col}_{row}".encode()) for col in range(columns)]
+
+
+@pytest.fixture
+def fake_renderer(monkeypatch):
+    FakeRenderer.rendered = []
+    FakeRenderer.fail_at = None
+    monkeypatch.setattr(resumable_deepzoom_builder, "DeepZoomRenderer", FakeRenderer)
+    return FakeRenderer
+
+
+def test_resume_after_failed_row(tmp_path, fake_renderer):
+    output_path = str(tmp_path / "slide")
+    builder = ResumableDeepZoomBuilder(workers=2)
+    layout = DeepZoomLayout(600, 400, 128, 1)
+    last_level = layout.level_count - 1
+    all_rows = [(level, row) for level in range(layout.level_count)
+                for row in range(layout.get_tile_grid(level)[1])]
+
+    fake_renderer.fail_at = (last_level, 2)
+    with pytest.raises(ExtractionError):
+        builder.build_deepzoom_pyramid((600, 400), output_path, tile_size=128, overlap=1)
+    done_before = list(fake_renderer.rendered)
+    assert not os.path.exists(f"{output_path}.dzi")
+    assert os.path.isdir(f"{output_path}.checkpoint")
+
+    fake_renderer.fail_at = None
+    fake_renderer.rendered = []
+    builder.build_deepzoom_pyramid((600, 400), output_path, tile_size=128, overlap=1)
+
+    # Only the failed row and the ones after it are rendered again
+    assert fake_renderer.rendered == [row for row in all_rows if row not in done_before]
+    assert (last_level, 2) in fake_renderer.rendered
+    assert os.path.exists(f"{output_path}.dzi")
+    assert not os.path.exists(f"{output_path}.checkpoint")
+
+    columns, rows = layout.get_tile_grid(last_level)
+    for row in range(rows):
+        for col in range(columns):
+            with open(os.path.join(tmp_path, layout.get_tile_name("slide", last_level, col, row)), "rb") as tile:
+                assert tile.read() == f"{last_level}/{col}_{row}".encode()
+
+
+def test_changed_settings_rebuild_everything(tmp_path, fake_renderer):
+    output_path = str(tmp_path / "slide")
+    builder = ResumableDeepZoomBuilder(workers=1)
+    layout = DeepZoomLayout(600, 400, 128, 1)
+
+    fake_renderer.fail_at = (layout.level_count - 1, 1)
+    with pytest.raises(ExtractionError):
+        builder.build_deepzoom_pyramid((600, 400), output_path, tile_size=128, overlap=1, quality=90)
+
+    fake_renderer.fail_at = None
+    fake_renderer.rendered = []
+    builder.build_deepzoom_pyramid((600, 400), output_path, tile_size=128, overlap=1, quality=80)
+    assert len(fake_renderer.rendered) == sum(layout.get_tile_grid(level)[1] for level in range(layout.level_count))
@@ -0,0 +1,116 @@
+"""HpzReader against small archives written with zipfile."""
+import json
+import zipfile
+
+import pytest
+
+from histopath_handler._core.constants import HPZ_META_JSON_FILENAME
+from histopath_handler._core.exceptions import ImageLoadingError
+from histopath_handler.file_loaders.hpz_reader import HpzReader
+from histopath_handler.pyramid_builders.deepzoom_layout import DeepZoomLayout
+
+LAYOUT = DeepZoomLayout(300, 200, tile_size=256, overlap=1, suffix=".jpeg")
+
+
+def _tile_bytes(level, col, row):
+    return f"tile {level}/{col}_{row}".encode() * 8
+
+
+def _write_archive(path, deflated=(), members=None, dzi=True):
+    with zipfile.ZipFile(path, "w") as archive:
+        if dzi:
+            archive.writestr("slide.dzi", LAYOUT.get_dzi_xml())
+        for level in range(LAYOUT.level_count):
+            columns, rows = LAYOUT.get_tile_grid(level)
+            for row in range(rows):
+                for col in range(columns):
+                    compression = zipfile.ZIP_DEFLATED if (level, col, row) in deflated else zipfile.ZIP_STORED
+                    archive.writestr(LAYOUT.get_tile_name("slide", level, col, row),
+                                     _tile_bytes(level, col, row), compress_type=compression)
+        for name, data in (members or {}).items():
+            archive.writestr(name, data)
+    return str(path)
+
+
+@pytest.fixture
+def archive_path(tmp_path):
+    last_level = LAYOUT.level_count - 1
+    return _write_archive(
+        tmp_path / "slide.hpz",
+        deflated={(last_level, 1, 0)},
+        members={
+            HPZ_META_JSON_FILENAME: json.dumps({"from_name": "slide"}),
+            "slide_thumb.jpg": b"thumbnail",
+        }
+    )
+
+
+def test_layout_and_members(archive_path):
+    with HpzReader(archive_path) as reader:
+        assert reader.basename == "slide"
+        assert reader.layout.level_dimensions == LAYOUT.level_dimensions
+        assert reader.layout.tile_size == 256 and reader.layout.overlap == 1
+        assert reader.tile_count == LAYOUT.get_tile_count()
+        assert reader.meta_data == {"from_name": "slide"}
+        assert reader.get_thumbnail() == b"thumbnail"
+        assert reader.get_member("missing.txt") is None
+
+
+def test_stored_and_deflated_tiles(archive_path):
+    last_level = LAYOUT.level_count - 1
+    with HpzReader(archive_path) as reader:
+        assert reader.get_tile(last_level, 0, 0) == _tile_bytes(last_level, 0, 0)
+        assert reader.get_tile(last_level, 1, 0) == _tile_bytes(last_level, 1, 0)
+        assert reader.get_tile(0, 0, 0) == _tile_bytes(0, 0, 0)
+
+
+def test_data_offsets_resolved_lazily(archive_path):
+    with HpzReader(archive_path) as reader:
+        assert reader._data_offsets == {}
+        reader.get_tile(0, 0, 0)
+        assert len(reader._data_offsets) == 1
+        reader.get_tile(0, 0, 0)
+        assert len(reader._data_offsets) == 1
+
+
+def test_missing_tile(archive_path):
+    with HpzReader(archive_path) as reader:
+        assert not reader.has_tile(0, 5, 5)
+        with pytest.raises(KeyError):
+            reader.get_tile(0, 5, 5)
+
+
+def test_tile_view_must_be_released_before_close(archive_path):
+    reader = HpzReader(archive_path)
+    view = reader.get_tile_view(0, 0, 0)
+    assert bytes(view) == _tile_bytes(0, 0, 0)
+    with pytest.raises(BufferError):
+        reader.close()
+    view.release()
+    reader.close()
+
+
+def test_corrupt_local_header_fails_on_access(tmp_path):
+    path = _write_archive(tmp_path / "slide.hpz")
+    with zipfile.ZipFile(path) as archive:
+        header_offset = archive.getinfo(LAYOUT.get_tile_name("slide", 0, 0, 0)).header_offset
+    with open(path, "r+b") as file:
+        file.seek(header_offset)
+        file.write(b"XXXX")
+
+    # Opening only reads the central directory
+    with HpzReader(path) as reader:
+        with pytest.raises(ImageLoadingError):
+            reader.get_tile(0, 0, 0)
+        assert reader.get_tile(1, 0, 0) == _tile_bytes(1, 0, 0)
+
+
+def test_archive_without_descriptor(tmp_path):
+    path = _write_archive(tmp_path / "slide.hpz", dzi=False)
+    with pytest.raises(ImageLoadingError):
+        HpzReader(path)
+
+
+def test_missing_archive(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        HpzReader(str(tmp_path / "missing.hpz"))
@@ -0,0 +1,143 @@
+"""MetadataCache: round trips and invalidation on file changes, without opening slides."""
+import os
+import sqlite3
+
+import pytest
+
+from histopath_handler._core.models import ImageInfo
+from histopath_handler.file_loaders.metadata_cache import MetadataCache
+
+
+def _make_info(path):
+    return ImageInfo(
+        file_path=str(path),
+        width_l0=4096,
+        height_l0=2048,
+        level_count=2,
+        level_dimensions=[(4096, 2048), (1024, 512)],
+        mpp_x=0.25,
+        mpp_y=0.25,
+        metadata={"vendor": "test"},
+        level_downsamples=[1.0, 4.0]
+    )
+
+
+@pytest.fixture
+def slide(tmp_path):
+    path = tmp_path / "slide.svs"
+    path.write_bytes(b"\0" * 128)
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with MetadataCache(str(tmp_path / "cache" / "meta.db")) as cache:
+        yield cache
+
+
+def test_round_trip(cache, slide):
+    info = _make_info(slide)
+    cache.put(info)
+
+    cached = cache.get(str(slide))
+    assert cached == info
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_hit_reports_requested_path(cache, slide, monkeypatch):
+    cache.put(_make_info(slide))
+    monkeypatch.chdir(slide.parent)
+
+    cached = cache.get(slide.name)
+    assert cached is not None
+    assert cached.file_path == slide.name
+
+
+def test_miss_for_unknown_file(cache, slide):
+    assert cache.get(str(slide)) is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_mtime_change_invalidates(cache, slide):
+    cache.put(_make_info(slide))
+    stat = os.stat(slide)
+    os.utime(slide, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert cache.get(str(slide)) is None
+    # The stale row is dropped on lookup
+    assert len(cache) == 0
+
+
+def test_size_change_invalidates(cache, slide):
+    cache.put(_make_info(slide))
+    stat = os.stat(slide)
+    with open(slide, "ab") as file:
+        file.write(b"\0")
+    os.utime(slide, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert cache.get(str(slide)) is None
+
+
+def test_deleted_file_misses(cache, slide):
+    cache.put(_make_info(slide))
+    slide.unlink()
+
+    assert cache.get(str(slide)) is None
+
+
+def test_get_many_mixes_hits_and_misses(cache, tmp_path):
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"slide_{index}.tiff"
+        path.write_bytes(b"\0" * (index + 1))
+        paths.append(str(path))
+    cache.put_many([_make_info(paths[0]), _make_info(paths[2])])
+
+    results = cache.get_many(paths + [paths[0]])
+    assert results[paths[0]] is not None
+    assert results[paths[1]] is None
+    assert results[paths[2]].file_path == paths[2]
+
+
+def test_invalidate(cache, slide):
+    cache.put(_make_info(slide))
+    cache.invalidate(str(slide))
+
+    assert cache.get(str(slide)) is None
+
+
+def test_prune_drops_changed_and_missing(cache, tmp_path, slide):
+    gone = tmp_path / "gone.svs"
+    gone.write_bytes(b"\0")
+    changed = tmp_path / "changed.svs"
+    changed.write_bytes(b"\0")
+    cache.put_many([_make_info(slide), _make_info(gone), _make_info(changed)])
+
+    gone.unlink()
+    changed.write_bytes(b"\0" * 64)
+
+    assert cache.prune() == 2
+    assert len(cache) == 1
+    assert cache.get(str(slide)) is not None
+
+
+def test_persists_across_instances(tmp_path, slide):
+    db_path = str(tmp_path / "meta.db")
+    with MetadataCache(db_path) as cache:
+        cache.put(_make_info(slide))
+    with MetadataCache(db_path) as cache:
+        assert cache.get(str(slide)) == _make_info(slide)
+
+
+def test_other_format_version_is_dropped(tmp_path, slide):
+    db_path = str(tmp_path / "meta.db")
+    with MetadataCache(db_path) as cache:
+        cache.put(_make_info(slide))
+
+    connection = sqlite3.connect(db_path)
+    connection.execute("PRAGMA user_version = 1")
+    connection.commit()
+    connection.close()
+
+    with MetadataCache(db_path) as cache:
+        assert len(cache) == 0
@@ -0,0 +1,165 @@
+"""SlidePool sharing, pinning and LRU eviction, with a fake handler instead of slides."""
+import os
+import threading
+import time
+
+import pytest
+
+from histopath_handler.slide_pool import SlidePool
+
+
+class FakeHandler:
+    opened = []
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.closed = False
+        FakeHandler.opened.append(file_path)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def reset_opened():
+    FakeHandler.opened = []
+
+
+def test_handler_is_shared(tmp_path):
+    pool = SlidePool(max_open=2, handler_factory=FakeHandler)
+    path = str(tmp_path / "a.svs")
+
+    with pool.open(path) as first, pool.open(path) as second:
+        assert first is second
+    assert FakeHandler.opened == [path]
+    assert pool.stats()["hits"] == 1 and pool.stats()["misses"] == 1
+
+
+def test_least_recently_used_idle_handler_is_evicted(tmp_path):
+    pool = SlidePool(max_open=2, handler_factory=FakeHandler)
+    a, b, c = (str(tmp_path / name) for name in ("a.svs", "b.svs", "c.svs"))
+
+    handler_a = pool.acquire(a)
+    pool.release(a)
+    handler_b = pool.acquire(b)
+    pool.release(b)
+    # Touch a so b becomes the least recently used
+    pool.acquire(a)
+    pool.release(a)
+    pool.acquire(c)
+    pool.release(c)
+
+    assert handler_b.closed
+    assert not handler_a.closed
+    assert len(pool) == 2
+    assert pool.stats()["evictions"] == 1
+
+
+def test_checked_out_handler_is_not_evicted(tmp_path):
+    pool = SlidePool(max_open=1, handler_factory=FakeHandler)
+    a, b = str(tmp_path / "a.svs"), str(tmp_path / "b.svs")
+
+    handler_a = pool.acquire(a)
+    with pool.open(b) as handler_b:
+        # Both are in use, so the pool is over its limit for now
+        assert len(pool) == 2
+        assert not handler_a.closed
+    # b was released while a is still pinned, so b goes
+    assert handler_b.closed
+    assert not handler_a.closed
+
+    pool.release(a)
+    assert len(pool) == 1
+    assert not handler_a.closed
+
+    pool.acquire(b)
+    pool.release(b)
+    assert handler_a.closed
+
+
+def test_concurrent_first_acquire_opens_once(tmp_path):
+    path = str(tmp_path / "a.svs")
+
+    def slow_factory(file_path):
+        time.sleep(0.05)
+        return FakeHandler(file_path)
+
+    pool = SlidePool(max_open=4, handler_factory=slow_factory)
+    handlers = []
+
+    def worker():
+        handlers.append(pool.acquire(path))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert FakeHandler.opened == [path]
+    assert all(handler is handlers[0] for handler in handlers)
+    assert pool.stats()["in_use"] == 1
+
+
+def test_failed_open_is_not_cached(tmp_path):
+    path = str(tmp_path / "a.svs")
+    attempts = []
+
+    def flaky_factory(file_path):
+        attempts.append(file_path)
+        if len(attempts) == 1:
+            raise OSError("storage unavailable")
+        return FakeHandler(file_path)
+
+    pool = SlidePool(max_open=2, handler_factory=flaky_factory)
+    with pytest.raises(OSError):
+        pool.acquire(path)
+    assert len(pool) == 0
+
+    with pool.open(path) as handler:
+        assert handler.file_path == path
+    assert len(attempts) == 2
+
+
+def test_release_without_acquire(tmp_path):
+    pool = SlidePool(max_open=1, handler_factory=FakeHandler)
+    with pytest.raises(ValueError):
+        pool.release(str(tmp_path / "a.svs"))
+
+
+def test_clear_keeps_pinned_handlers(tmp_path):
+    pool = SlidePool(max_open=4, handler_factory=FakeHandler)
+    a, b = str(tmp_path / "a.svs"), str(tmp_path / "b.svs")
+
+    handler_a = pool.acquire(a)
+    with pool.open(b) as handler_b:
+        pass
+    pool.clear()
+
+    assert handler_b.closed
+    assert not handler_a.closed
+    assert len(pool) == 1
+    pool.release(a)
+
+
+def test_on_close_runs_before_close(tmp_path):
+    seen = []
+
+    def on_close(key, handler):
+        seen.append((key, handler.closed))
+
+    pool = SlidePool(max_open=1, handler_factory=FakeHandler, on_close=on_close)
+    a, b = str(tmp_path / "a.svs"), str(tmp_path / "b.svs")
+    with pool.open(a):
+        pass
+    with pool.open(b):
+        pass
+    pool.clear()
+
+    # Keys are the pool's resolved paths
+    assert seen == [(os.path.realpath(a), False), (os.path.realpath(b), False)]
+
+
+def test_max_open_must_be_positive():
+    with pytest.raises(ValueError):
+        SlidePool(max_open=0, handler_factory=FakeHandler)
@@ -0,0 +1,44 @@
+"""Import-time budget for the CLI, which ingestion scripts run once per slide."""
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded only by the code paths that need them, never by `import`
+LAZY_MODULES = ("pyvips", "numpy", "openslide", "zipfile", "multiprocessing")
+
+# Wall time of `import histopath_handler.__main__`, best of STARTUP_RUNS cold interpreters
+STARTUP_BUDGET_SECONDS = 0.5
+STARTUP_RUNS = 3
+
+PROBE = f"""
+import sys, time
+start = time.perf_counter()
+import histopath_handler.__main__
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(",".join(name for name in {LAZY_MODULES!r} if name in sys.modules))
+"""
+
+
+def _run_probe():
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    elapsed, loaded = result.stdout.split("\n")[:2]
+    return float(elapsed), [name for name in loaded.split(",") if name]
+
+
+def test_cli_import_does_not_load_backends():
+    _, loaded = _run_probe()
+    assert loaded == [], f"importing the CLI loaded {', '.join(loaded)}"
+
+
+def test_cli_import_within_budget():
+    best = min(_run_probe()[0] for _ in range(STARTUP_RUNS))
+    assert best < STARTUP_BUDGET_SECONDS, f"CLI import took {best * 1000:.0f} ms"